@@ -1,10 +1,63 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { writeFile, unlink } from 'fs/promises';
 import { join } from 'path';
-import { exec } from 'child_process';
-import { promisify } from 'util';
+import { spawn } from 'child_process';
 
-const execAsync = promisify(exec);
+// Exécute predict.py en envoyant les octets de l'image sur stdin (argument '-') :
+// pas de fichier temporaire à écrire, relire puis supprimer
+function runPredictScript(
+  scriptPath: string,
+  modelPath: string,
+  image: Buffer,
+  options: { timeout: number; maxBuffer: number }
+): Promise<{ stdout: string; stderr: string }> {
+  return new Promise((resolve, reject) => {
+    const child = spawn('python3', [scriptPath, '-', modelPath]);
+    let stdout = '';
+    let stderr = '';
+    let killed = false;
+
+    const fail = (message: string) => {
+      const error: any = new Error(message);
+      error.stdout = stdout;
+      error.stderr = stderr;
+      error.killed = killed;
+      error.signal = killed ? 'SIGTERM' : null;
+      reject(error);
+    };
+
+    const timer = setTimeout(() => {
+      killed = true;
+      child.kill('SIGTERM');
+    }, options.timeout);
+
+    child.stdout.on('data', (chunk) => {
+      stdout += chunk;
+      if (stdout.length > options.maxBuffer) {
+        killed = true;
+        child.kill('SIGTERM');
+      }
+    });
+    child.stderr.on('data', (chunk) => {
+      stderr += chunk;
+    });
+    child.on('error', (error) => {
+      clearTimeout(timer);
+      fail(error.message);
+    });
+    child.on('close', (code) => {
+      clearTimeout(timer);
+      if (code === 0 && !killed) {
+        resolve({ stdout, stderr });
+      } else {
+        fail(killed ? 'Timeout du script Python' : `Le script Python s'est terminé avec le code ${code}`);
+      }
+    });
+
+    // Le script peut se terminer avant d'avoir tout lu (erreur de chargement) : ignorer EPIPE
+    child.stdin.on('error', () => {});
+    child.stdin.end(image);
+  });
+}
 
 export async function POST(request: NextRequest) {
   try {
@@ -18,21 +71,9 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Créer un dossier temporaire pour les images
-    const tempDir = join(process.cwd(), 'temp');
-    const tempFilePath = join(tempDir, `temp_${Date.now()}_${file.name}`);
-    
-    // Créer le dossier s'il n'existe pas
-    try {
-      await execAsync(`mkdir -p ${tempDir}`);
-    } catch (error) {
-      // Le dossier existe peut-être déjà
-    }
-
-    // Sauvegarder le fichier temporairement
+    // L'image reste en mémoire : elle est transmise au script Python sur stdin
     const bytes = await file.arrayBuffer();
     const buffer = Buffer.from(bytes);
-    await writeFile(tempFilePath, buffer);
 
     // Chemin vers le script Python
     const scriptPath = join(process.cwd(), 'scripts', 'predict.py');
@@ -43,8 +84,10 @@ export async function POST(request: NextRequest) {
     let stderr = '';
     
     try {
-      const result = await execAsync(
-        `python3 "${scriptPath}" "${tempFilePath}" "${modelPath}"`,
+      const result = await runPredictScript(
+        scriptPath,
+        modelPath,
+        buffer,
         { 
           timeout: 30000, // 30 secondes timeout
           maxBuffer: 10 * 1024 * 1024 // 10MB buffer
@@ -53,13 +96,6 @@ export async function POST(request: NextRequest) {
       stdout = result.stdout;
       stderr = result.stderr || '';
     } catch (execError: any) {
-      // Nettoyer le fichier temporaire même en cas d'erreur
-      try {
-        await unlink(tempFilePath);
-      } catch (unlinkError) {
-        // Ignorer les erreurs de suppression
-      }
-      
       console.error('Erreur lors de l\'exécution du script Python:', execError);
       
       // Extraire stdout si disponible (peut contenir l'erreur JSON)
@@ -89,13 +125,6 @@ export async function POST(request: NextRequest) {
       );
     }
 
-    // Nettoyer le fichier temporaire
-    try {
-      await unlink(tempFilePath);
-    } catch (error) {
-      console.error('Erreur lors de la suppression du fichier temporaire:', error);
-    }
-
     // Filtrer les warnings TensorFlow/urllib3 qui ne sont pas des erreurs
     const filteredStderr = stderr
       .split('\n')
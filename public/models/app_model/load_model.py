@@ -4,65 +4,473 @@ Script pour charger le modèle et faire des prédictions
 Usage dans votre application
 """
 
-import tensorflow as tf
 import numpy as np
 from PIL import Image
-from tensorflow.keras.models import load_model
-from tensorflow.keras.applications.mobilenet_v2 import preprocess_input
 import json
 import os
+import io
+import sys
+import time
+import hashlib
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# tensorflow n'est importé que pour le backend Keras : le backend TFLite peut tourner
+# avec le seul runtime LiteRT / tflite_runtime, sans charger TensorFlow
+
+def preprocess_input(x):
+    """
+    Preprocessing MobileNetV2 (identique à tensorflow.keras.applications.mobilenet_v2.preprocess_input) :
+    pixels ramenés de [0, 255] à [-1, 1]
+    """
+    x = np.asarray(x)
+    if not np.issubdtype(x.dtype, np.floating):
+        x = x.astype(np.float32)
+    else:
+        x = x.copy()
+    x /= 127.5
+    x -= 1.0
+    return x
+
+def _tflite_interpreter_class():
+    """
+    Classe Interpreter TFLite : LiteRT, puis tflite_runtime, puis tensorflow.lite en dernier recours
+    """
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+class PreprocessedImageCache:
+    """
+    Cache adressé par contenu (SHA-256 des octets du fichier) des radiographies décodées et redimensionnées
+    
+    Les images sont stockées en uint8 (hauteur, largeur, 3) dans un fichier .npy mappé en mémoire
+    de capacité fixe (max_bytes). Un index SQLite à côté associe chaque empreinte à un emplacement
+    et à la date du dernier accès : quand le fichier est plein, l'emplacement le moins récemment
+    utilisé est réattribué (LRU). Le cache peut être partagé entre plusieurs processus.
+    
+    Les probabilités peuvent aussi y être gardées, par version du modèle : une nouvelle version
+    (ou un autre backend) ne réutilise jamais les probabilités d'une autre.
+    """
+    
+    STORE_NAME = "images.npy"
+    INDEX_NAME = "index.sqlite"
+    
+    def __init__(self, cache_dir, image_shape, max_bytes=1 << 30):
+        """
+        Args:
+            cache_dir: Dossier du cache (créé si besoin)
+            image_shape: Shape d'une image chargée (hauteur, largeur, 3)
+            max_bytes: Taille maximale du fichier .npy (fixe le nombre d'images gardées)
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+        self.image_shape = tuple(image_shape)
+        self.capacity = max(1, int(max_bytes) // int(np.prod(self.image_shape)))
+        self.hits = 0
+        self.misses = 0
+        self.probability_hits = 0
+        self.probability_misses = 0
+        self.evictions = 0
+        
+        self.store_path = os.path.join(cache_dir, self.STORE_NAME)
+        self.index_path = os.path.join(cache_dir, self.INDEX_NAME)
+        shape = (self.capacity,) + self.image_shape
+        self._arrays = None
+        if os.path.exists(self.store_path):
+            arrays = np.load(self.store_path, mmap_mode='r+')
+            if arrays.shape == shape and arrays.dtype == np.uint8:
+                self._arrays = arrays
+        if self._arrays is None:
+            # Première utilisation, ou taille d'image / capacité changée : repartir d'un cache vide
+            for path in (self.store_path, self.index_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._arrays = np.lib.format.open_memmap(self.store_path, mode='w+', dtype=np.uint8, shape=shape)
+        
+        db = self._connect()
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS images ("
+                       "digest TEXT PRIMARY KEY, slot INTEGER NOT NULL UNIQUE, "
+                       "accessed REAL NOT NULL, ready INTEGER NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed)")
+            db.execute("CREATE TABLE IF NOT EXISTS probabilities ("
+                       "digest TEXT NOT NULL, model_version TEXT NOT NULL, probability REAL NOT NULL, "
+                       "PRIMARY KEY (digest, model_version))")
+        finally:
+            db.close()
+    
+    def _connect(self):
+        # Connexion en autocommit (transactions explicites), une par opération : utilisable depuis les threads
+        return sqlite3.connect(self.index_path, timeout=10, isolation_level=None)
+    
+    @staticmethod
+    def digest(data):
+        """
+        Empreinte SHA-256 (hex) des octets d'une image
+        """
+        return hashlib.sha256(data).hexdigest()
+    
+    def get(self, digest):
+        """
+        Retourne une copie de l'image en cache pour cette empreinte, ou None
+        """
+        db = self._connect()
+        try:
+            row = db.execute("SELECT slot FROM images WHERE digest = ? AND ready = 1", (digest,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            array = np.array(self._arrays[row[0]])
+            # L'emplacement a pu être réattribué pendant la copie : l'entrée n'existe alors plus
+            updated = db.execute("UPDATE images SET accessed = ? WHERE digest = ? AND slot = ? AND ready = 1",
+                                 (time.time(), digest, row[0])).rowcount
+        finally:
+            db.close()
+        if not updated:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return array
+    
+    def put(self, digest, array):
+        """
+        Met une image chargée en cache (l'entrée la moins récemment utilisée est évincée si le cache est plein)
+        """
+        if array.shape != self.image_shape:
+            raise ValueError(f"Shape {array.shape} incompatible avec le cache {self.image_shape}")
+        db = self._connect()
+        try:
+            # Réserver un emplacement (transaction exclusive entre processus), l'écrire, puis le publier
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if db.execute("SELECT 1 FROM images WHERE digest = ?", (digest,)).fetchone():
+                    db.execute("COMMIT")
+                    return
+                used = db.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                if used < self.capacity:
+                    # Les emplacements libérés sont toujours réattribués : 0..used-1 sont occupés
+                    slot = used
+                else:
+                    evicted, slot = db.execute("SELECT digest, slot FROM images "
+                                               "ORDER BY accessed LIMIT 1").fetchone()
+                    db.execute("DELETE FROM images WHERE digest = ?", (evicted,))
+                    db.execute("DELETE FROM probabilities WHERE digest = ?", (evicted,))
+                    self.evictions += 1
+                db.execute("INSERT INTO images (digest, slot, accessed, ready) VALUES (?, ?, ?, 0)",
+                           (digest, slot, time.time()))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._arrays[slot] = array
+            db.execute("UPDATE images SET ready = 1 WHERE digest = ? AND slot = ?", (digest, slot))
+        finally:
+            db.close()
+    
+    def get_probability(self, digest, model_version):
+        """
+        Probabilité en cache pour cette image et cette version du modèle, ou None
+        """
+        db = self._connect()
+        try:
+            row = db.execute("SELECT probability FROM probabilities WHERE digest = ? AND model_version = ?",
+                             (digest, model_version)).fetchone()
+            if row is not None:
+                db.execute("UPDATE images SET accessed = ? WHERE digest = ?", (time.time(), digest))
+        finally:
+            db.close()
+        if row is None:
+            self.probability_misses += 1
+            return None
+        self.probability_hits += 1
+        return row[0]
+    
+    def put_probability(self, digest, model_version, probability):
+        """
+        Garde la probabilité d'une image déjà en cache pour cette version du modèle
+        """
+        db = self._connect()
+        try:
+            db.execute("INSERT OR REPLACE INTO probabilities (digest, model_version, probability) "
+                       "SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM images WHERE digest = ?)",
+                       (digest, model_version, float(probability), digest))
+        finally:
+            db.close()
+    
+    def clear(self):
+        db = self._connect()
+        try:
+            db.execute("DELETE FROM images")
+            db.execute("DELETE FROM probabilities")
+        finally:
+            db.close()
+    
+    def stats(self):
+        """
+        Compteurs du cache
+        """
+        db = self._connect()
+        try:
+            entries = db.execute("SELECT COUNT(*) FROM images WHERE ready = 1").fetchone()[0]
+        finally:
+            db.close()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "probabilityHits": self.probability_hits,
+            "probabilityMisses": self.probability_misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "capacity": self.capacity,
+            "path": self.cache_dir,
+        }
+
+def file_version(path):
+    """
+    Version d'un fichier de modèle : SHA-256 (16 premiers caractères hex) de son contenu
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:16]
 
 class TuberculosisPredictor:
     """
     Classe pour charger et utiliser le modèle de détection de tuberculose
     """
     
-    def __init__(self, model_dir="app_model"):
+    # Extensions prises en compte quand predict_stream reçoit un dossier
+    IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+    
+    # Backends d'inférence disponibles
+    BACKENDS = ('keras', 'tflite')
+    
+    # Prétraitement rapide : les JPEG sont décodés en DCT réduite (1/2, 1/4 ou 1/8) en gardant
+    # au moins FAST_DRAFT_MARGIN fois la taille cible, puis une réduction par blocs suivie d'un
+    # bilinéaire remplace le bicubique quand il reste au moins FAST_BILINEAR_FACTOR à réduire
+    FAST_DRAFT_MARGIN = 2
+    FAST_BILINEAR_FACTOR = 4
+    
+    def __init__(self, model_dir="app_model", backend="keras", tflite_path=None, num_threads=None, warmup=True,
+                 cache_dir=None, cache_max_bytes=1 << 30, cache_probabilities=False, fast_preprocessing=False):
         """
         Initialise le prédicteur
         
         Args:
             model_dir: Dossier contenant les fichiers du modèle
+            backend: 'keras' (model.h5) ou 'tflite' (flatbuffer généré par scripts/export_tflite.py)
+            tflite_path: Fichier .tflite (défaut: model.tflite dans model_dir)
+            num_threads: Nombre de threads de l'interpréteur TFLite (défaut: choix du runtime)
+            warmup: Si True, une passe sur une image synthétique est faite au chargement
+                    (la première vraie requête n'a plus de surcoût de traçage / d'allocation)
+            cache_dir: Dossier du cache des images prétraitées (None = pas de cache, voir PreprocessedImageCache)
+            cache_max_bytes: Taille maximale du cache d'images
+            cache_probabilities: Si True, les probabilités sont aussi mises en cache pour cette version du modèle
+            fast_preprocessing: Si True, décodage JPEG à résolution réduite et rééchantillonnage moins coûteux
+                                (parité mesurée par scripts/preprocessing_parity.py)
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend inconnu: {backend} (attendu: {', '.join(self.BACKENDS)})")
         self.model_dir = model_dir
+        self.backend = backend
+        self.fast_preprocessing = fast_preprocessing
         
         # Charger les informations
         info_path = os.path.join(model_dir, "model_info.json")
         with open(info_path, 'r') as f:
             self.info = json.load(f)
         
-        # Charger le modèle
-        model_path = os.path.join(model_dir, "model.h5")
-        self.model = load_model(model_path, compile=False)
-        self.model.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
-        
         # Paramètres
         self.img_size = tuple(self.info['img_size'])
         self.threshold = self.info['threshold']
         self.classes = self.info['classes']
         
+        # Charger le modèle
+        if backend == 'tflite':
+            self.model = None
+            self._load_tflite(tflite_path or os.path.join(model_dir, "model.tflite"), num_threads)
+        else:
+            # Inférence seule : pas de compile (optimizer/loss inutiles), tf.function à signature fixe
+            from tensorflow.keras.models import load_model
+            model_path = os.path.join(model_dir, "model.h5")
+            self.model = load_model(model_path, compile=False)
+            self._infer = self._build_inference_function()
+        
+        # Cache des images prétraitées (et des probabilités, par backend + hash du fichier de modèle)
+        self.image_cache = None
+        self.model_version = None
+        if cache_dir:
+            self.image_cache = PreprocessedImageCache(cache_dir, (self.img_size[1], self.img_size[0], 3),
+                                                      cache_max_bytes)
+            if cache_probabilities:
+                model_file = self.tflite_path if backend == 'tflite' else model_path
+                self.model_version = f"{backend}-{file_version(model_file)}"
+        
+        if warmup:
+            self._run_model(np.zeros((1, self.img_size[1], self.img_size[0], 3), dtype=np.float32))
+        
         # Messages de debug vers stderr pour ne pas polluer stdout
-        import sys
-        print(f"✅ Modèle chargé depuis {model_dir}", file=sys.stderr)
+        print(f"✅ Modèle chargé depuis {model_dir} (backend {backend})", file=sys.stderr)
         print(f"   Threshold : {self.threshold}", file=sys.stderr)
         print(f"   Image size : {self.img_size}", file=sys.stderr)
     
+    def _load_tflite(self, tflite_path, num_threads=None):
+        """
+        Charge le flatbuffer TFLite dans un interpréteur
+        """
+        Interpreter = _tflite_interpreter_class()
+        self.interpreter = Interpreter(model_path=tflite_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.tflite_path = tflite_path
+        self._tflite_input = self.interpreter.get_input_details()[0]
+        self._tflite_output = self.interpreter.get_output_details()[0]
+    
+    def _run_tflite(self, x):
+        """
+        Une passe de l'interpréteur TFLite (entrée/sortie quantifiées gérées si besoin)
+        
+        Args:
+            x: Array float32 prétraité (N, hauteur, largeur, 3)
+            
+        Returns:
+            Array des N probabilités
+        """
+        # Le flatbuffer est exporté avec un batch de 1 : redimensionner l'entrée à la taille du paquet
+        if self._tflite_input['shape'][0] != len(x):
+            self.interpreter.resize_tensor_input(self._tflite_input['index'], list(x.shape))
+            self.interpreter.allocate_tensors()
+            self._tflite_input = self.interpreter.get_input_details()[0]
+            self._tflite_output = self.interpreter.get_output_details()[0]
+        
+        dtype = self._tflite_input['dtype']
+        scale, zero_point = self._tflite_input['quantization']
+        if scale:
+            info = np.iinfo(dtype)
+            x = np.clip(np.round(x / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(self._tflite_input['index'], np.ascontiguousarray(x, dtype=dtype))
+        self.interpreter.invoke()
+        
+        output = self.interpreter.get_tensor(self._tflite_output['index'])
+        scale, zero_point = self._tflite_output['quantization']
+        if scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output[:, 0]
+    
+    def _build_inference_function(self):
+        """
+        tf.function d'inférence tracée une seule fois pour l'entrée (batch, hauteur, largeur, 3)
+        
+        La dimension du batch est libre : aucune retrace quand la taille des paquets change,
+        et pas de pipeline de données reconstruit à chaque appel comme avec model.predict.
+        """
+        import tensorflow as tf
+        
+        model = self.model
+        input_shape = (None, self.img_size[1], self.img_size[0], 3)
+        
+        @tf.function(input_signature=[tf.TensorSpec(shape=input_shape, dtype=tf.float32)])
+        def infer(x):
+            return model(x, training=False)
+        
+        return infer
+    
+    def _run_model(self, x):
+        """
+        Probabilités de tuberculose pour un array prétraité (N, hauteur, largeur, 3)
+        """
+        if self.backend == 'tflite':
+            return self._run_tflite(x)
+        return self._infer(np.asarray(x, dtype=np.float32)).numpy()[:, 0]
+    
+    def load_image(self, image_path):
+        """
+        Charge une image en RGB redimensionnée à img_size
+        
+        Args:
+            image_path: Chemin vers l'image, ou octets de l'image (bytes, bytearray, memoryview)
+            
+        Returns:
+            Array uint8 de shape (hauteur, largeur, 3)
+        """
+        return self._read_image(image_path)[0]
+    
+    def _decode_image(self, source):
+        img = Image.open(source)
+        if self.fast_preprocessing:
+            return self._decode_image_fast(img)
+        img = img.convert('RGB')
+        img = img.resize(self.img_size)
+        return np.array(img)
+    
+    def _decode_image_fast(self, img):
+        """
+        Décodage rapide (fast_preprocessing) d'une image PIL ouverte
+        """
+        width, height = self.img_size
+        # Sans effet pour les formats autres que JPEG
+        img.draft('RGB', (width * self.FAST_DRAFT_MARGIN, height * self.FAST_DRAFT_MARGIN))
+        # Les radiographies en niveaux de gris sont redimensionnées avant la conversion RGB (3 fois moins de pixels)
+        if img.mode not in ('L', 'RGB'):
+            img = img.convert('RGB')
+        factor = min(img.width / width, img.height / height)
+        if factor >= self.FAST_BILINEAR_FACTOR:
+            img = img.resize(self.img_size, Image.BILINEAR, reducing_gap=2.0)
+        else:
+            img = img.resize(self.img_size, Image.BICUBIC)
+        return np.array(img.convert('RGB'))
+    
+    def _read_image(self, image_path):
+        """
+        Charge une image en passant par le cache d'images prétraitées s'il est activé
+        
+        Returns:
+            (array uint8 (hauteur, largeur, 3), empreinte SHA-256 des octets ou None sans cache)
+        """
+        # Image reçue en mémoire (upload, stdin) : décodée depuis un BytesIO, sans fichier temporaire
+        in_memory = isinstance(image_path, (bytes, bytearray, memoryview))
+        if self.image_cache is None:
+            return self._decode_image(io.BytesIO(image_path) if in_memory else image_path), None
+        if in_memory:
+            data = image_path
+        else:
+            with open(image_path, 'rb') as f:
+                data = f.read()
+        digest = self.image_cache.digest(data)
+        if self.fast_preprocessing:
+            # Les deux modes ne donnent pas exactement les mêmes pixels : entrées distinctes dans le cache
+            digest += '-fast'
+        img_array = self.image_cache.get(digest)
+        if img_array is None:
+            img_array = self._decode_image(io.BytesIO(data))
+            self.image_cache.put(digest, img_array)
+        return img_array, digest
+    
     def preprocess_image(self, image_path):
         """
         Prétraite une image pour la prédiction
         
         Args:
-            image_path: Chemin vers l'image
+            image_path: Chemin vers l'image, ou octets de l'image
             
         Returns:
             Image prétraitée (numpy array)
         """
         # Charger et redimensionner
-        img = Image.open(image_path).convert('RGB')
-        img = img.resize(self.img_size)
-        
-        # Convertir en array
-        img_array = np.array(img)
+        img_array = self.load_image(image_path)
         img_array = np.expand_dims(img_array, axis=0)
         
         # Preprocessing MobileNetV2
@@ -70,50 +478,162 @@ class TuberculosisPredictor:
         
         return img_array
     
+    def _decision(self, proba):
+        """
+        Classe prédite pour une probabilité de tuberculose (seuil optimal)
+        """
+        return "Tuberculosis" if proba >= self.threshold else "Normal"
+    
     def predict(self, image_path, return_probability=False):
         """
         Prédit si une image contient de la tuberculose
         
         Args:
-            image_path: Chemin vers l'image
+            image_path: Chemin vers l'image, ou octets de l'image (bytes, bytearray, memoryview)
             return_probability: Si True, retourne aussi la probabilité
             
         Returns:
             Si return_probability=False : "Normal" ou "Tuberculosis"
             Si return_probability=True : (prediction, probability)
         """
-        # Preprocessing
-        img_array = self.preprocess_image(image_path)
-        
-        # Prédiction
-        proba = self.model.predict(img_array, verbose=0)[0][0]
+        # Chargement (ou cache) puis prédiction
+        img_array, digest = self._read_image(image_path)
+        proba = self._predict_arrays(img_array[np.newaxis], [digest])[0]
         
         # Décision
-        if proba >= self.threshold:
-            prediction = "Tuberculosis"
-        else:
-            prediction = "Normal"
+        prediction = self._decision(proba)
         
         if return_probability:
             return prediction, float(proba)
         else:
             return prediction
     
-    def predict_batch(self, image_paths):
+    def predict_batch(self, image_paths, batch_size=32):
         """
-        Prédit pour plusieurs images
+        Prédit pour plusieurs images : les images prétraitées sont empilées par paquets
+        de batch_size et chaque paquet passe dans le modèle en une seule fois
         
         Args:
-            image_paths: Liste de chemins vers les images
+            image_paths: Liste de chemins vers les images (ou d'octets d'images)
+            batch_size: Nombre d'images par passe du modèle
             
         Returns:
-            Liste de tuples (prediction, probability)
+            Liste de tuples (prediction, probability), dans l'ordre de image_paths
         """
+        if batch_size < 1:
+            raise ValueError(f"batch_size doit être >= 1 (reçu {batch_size})")
+        image_paths = list(image_paths)
+        
         results = []
-        for img_path in image_paths:
-            pred, prob = self.predict(img_path, return_probability=True)
-            results.append((pred, prob))
+        for start in range(0, len(image_paths), batch_size):
+            loaded = [self._read_image(path) for path in image_paths[start:start + batch_size]]
+            probas = self._predict_arrays(np.stack([array for array, _ in loaded]), [digest for _, digest in loaded])
+            results.extend((self._decision(proba), float(proba)) for proba in probas)
         return results
+    
+    def _predict_arrays(self, batch, digests=None):
+        """
+        Une passe du modèle sur un paquet d'images chargées
+        
+        Args:
+            batch: Array uint8 (N, hauteur, largeur, 3) issu de load_image
+            digests: Empreintes des images (cache des probabilités), ou None
+            
+        Returns:
+            Array des N probabilités de tuberculose
+        """
+        if self.model_version is None or digests is None:
+            return self._run_model(preprocess_input(batch))
+        
+        # Seules les images sans probabilité en cache pour cette version passent dans le modèle
+        probas = np.empty(len(batch), dtype=np.float64)
+        missing = []
+        for i, digest in enumerate(digests):
+            cached = self.image_cache.get_probability(digest, self.model_version) if digest else None
+            if cached is None:
+                missing.append(i)
+            else:
+                probas[i] = cached
+        if missing:
+            computed = self._run_model(preprocess_input(batch[missing]))
+            for i, proba in zip(missing, computed):
+                probas[i] = proba
+                if digests[i]:
+                    self.image_cache.put_probability(digests[i], self.model_version, proba)
+        return probas
+    
+    @classmethod
+    def list_images(cls, directory):
+        """
+        Liste triée des images d'un dossier (extensions IMAGE_EXTENSIONS)
+        """
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.lower().endswith(cls.IMAGE_EXTENSIONS))
+    
+    def predict_stream(self, images, batch_size=32, num_workers=None, prefetch_batches=2):
+        """
+        Prédiction en flux pour le dépistage de masse : un pool de threads décode et redimensionne
+        les images pendant que le modèle traite les paquets déjà prêts
+        
+        Le nombre d'images décodées d'avance est borné (batch_size * prefetch_batches),
+        la mémoire reste constante quelle que soit la taille du dossier.
+        
+        Args:
+            images: Dossier d'images, ou itérable de chemins
+            batch_size: Nombre d'images par passe du modèle
+            num_workers: Nombre de threads de décodage (défaut: nombre de CPU)
+            prefetch_batches: Nombre de paquets décodés d'avance au maximum
+            
+        Yields:
+            (image_path, prediction, probability, error) dans l'ordre d'entrée ;
+            pour une image illisible, prediction et probability valent None et error contient le message
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size doit être >= 1 (reçu {batch_size})")
+        if isinstance(images, str) and os.path.isdir(images):
+            images = self.list_images(images)
+        images = iter(images)
+        max_pending = batch_size * max(prefetch_batches, 1)
+        
+        # File bornée des décodages en cours, dans l'ordre d'entrée
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=num_workers or os.cpu_count() or 1)
+        
+        def fill():
+            while len(pending) < max_pending:
+                path = next(images, None)
+                if path is None:
+                    return
+                pending.append((path, executor.submit(self._read_image, path)))
+        
+        try:
+            fill()
+            while pending:
+                batch = [pending.popleft() for _ in range(min(batch_size, len(pending)))]
+                # Relancer des décodages pendant que le modèle traite ce paquet
+                fill()
+                
+                decoded = []
+                for path, future in batch:
+                    try:
+                        decoded.append((path, future.result(), None))
+                    except Exception as e:
+                        decoded.append((path, None, str(e)))
+                
+                loaded = [result for _, result, error in decoded if error is None]
+                probas = iter(self._predict_arrays(np.stack([array for array, _ in loaded]),
+                                                   [digest for _, digest in loaded]) if loaded else ())
+                for path, _, error in decoded:
+                    if error is not None:
+                        yield path, None, None, error
+                    else:
+                        proba = float(next(probas))
+                        yield path, self._decision(proba), proba, None
+        finally:
+            # Générateur abandonné : annuler les décodages pas encore démarrés
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
 # ===============================
 # EXEMPLE D'UTILISATION
@@ -6,69 +6,178 @@ Script pour charger le modèle XGBoost cardiovasculaire et faire des prédiction
 import os
 import sys
 import numpy as np
-import pandas as pd
-import joblib
 import warnings
 import glob
 warnings.filterwarnings('ignore')
 
 # Configurer OpenMP pour XGBoost sur macOS AVANT d'importer xgboost
-libomp_paths = [
-    '/opt/homebrew/opt/libomp/lib/libomp.dylib',
-    '/usr/local/opt/libomp/lib/libomp.dylib',
-    '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
-    '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
-]
+# (le scan glob n'est fait que sur macOS, les chemins n'existent pas ailleurs)
+if sys.platform == 'darwin':
+    libomp_paths = [
+        '/opt/homebrew/opt/libomp/lib/libomp.dylib',
+        '/usr/local/opt/libomp/lib/libomp.dylib',
+        '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
+        '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
+    ]
 
-for pattern in libomp_paths:
-    matches = glob.glob(pattern)
-    if matches:
-        libomp_dir = os.path.dirname(matches[0])
-        if 'DYLD_LIBRARY_PATH' in os.environ:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
-        else:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
-        break
+    for pattern in libomp_paths:
+        matches = glob.glob(pattern)
+        if matches:
+            libomp_dir = os.path.dirname(matches[0])
+            if 'DYLD_LIBRARY_PATH' in os.environ:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
+            else:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
+            break
 
 # Définir OMP_NUM_THREADS pour éviter les problèmes
 os.environ['OMP_NUM_THREADS'] = '1'
 
-class CardiovascularPredictor:
+# Code commun aux prédicteurs XGBoost (public/models/xgb_predictor_base.py)
+_MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _MODELS_DIR not in sys.path:
+    sys.path.append(_MODELS_DIR)
+from xgb_predictor_base import XGBPredictorBase, is_dataframe
+
+class CardiovascularPredictor(XGBPredictorBase):
     """
     Classe pour charger et utiliser le modèle de prédiction cardiovasculaire
     """
     
-    def __init__(self, model_dir):
+    # Ordre des colonnes du dataset : id,gender,height,weight,ap_hi,ap_lo,cholesterol,gluc,smoke,alco,active,cardio,age_years
+    REQUIRED_COLS = ['gender', 'height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 
+                     'gluc', 'smoke', 'alco', 'active', 'age_years']
+    
+    # Ordre attendu après feature engineering (quand le transformer n'a pas feature_names_in_)
+    ENGINEERED_COLS = REQUIRED_COLS + ['bmi', 'age_squared', 'ap_hi_squared', 'bmi_squared', 'alco_inactive']
+    
+    # Artefacts dont le bundle est dérivé (leur empreinte est vérifiée au chargement du bundle)
+    BUNDLE_SOURCES = ['xgb_cardio_optimized.pkl', 'xgb_cardio_optimized.ubj', 'power_transformer_cardio.pkl',
+                      'robust_scaler_cardio.pkl', 'feature_selector_cardio.pkl', 'model_config_cardio.pkl']
+    
+    def __init__(self, model_dir, n_threads=None, use_bundle=True):
         """
         Initialise le prédicteur
         
         Args:
             model_dir: Dossier contenant les fichiers du modèle
+            n_threads: Nombre de threads XGBoost (défaut: variable LIVEDOC_XGB_NTHREAD, sinon 1)
+            use_bundle: Si False, ignore le bundle et charge les artefacts séparés
         """
         self.model_dir = model_dir
         
-        # Charger le modèle
-        model_path = os.path.join(model_dir, "xgb_cardio_optimized.pkl")
-        self.model = joblib.load(model_path)
+        # Durée de chargement de chaque artefact en ms (rapport --startup-profile des scripts)
+        self.load_timings = {}
+        
+        # Bundle mmap unique (scripts/build_model_bundles.py) s'il est présent et à jour,
+        # sinon artefacts séparés
+        if not (use_bundle and self._load_bundle(os.path.join(model_dir, self.BUNDLE_NAME), n_threads)):
+            self._load_artifacts(n_threads)
+        
+        # Messages de debug vers stderr
+        print(f"✅ Modèle cardiovasculaire chargé depuis {model_dir}", file=sys.stderr)
+        print(f"   Threshold : {self.threshold}", file=sys.stderr)
+        if self.model_version is not None:
+            print(f"   Bundle : {self.BUNDLE_NAME} (version {self.model_version})", file=sys.stderr)
+    
+    def _load_artifacts(self, n_threads=None):
+        """
+        Charge le modèle, les scalers, le feature selector et la config depuis les fichiers séparés
+        """
+        model_dir = self.model_dir
+        self.model_version = None
+        
+        # Charger le modèle (format natif UBJSON si disponible, sinon pickle joblib)
+        self.model = self._load_xgb_model(os.path.join(model_dir, "xgb_cardio_optimized.pkl"))
+        
+        # Booster natif pour l'inférence
+        self._init_booster(n_threads)
         
         # Charger les scalers
-        self.power_transformer = joblib.load(os.path.join(model_dir, "power_transformer_cardio.pkl"))
-        self.robust_scaler = joblib.load(os.path.join(model_dir, "robust_scaler_cardio.pkl"))
+        self.power_transformer = self._load_artifact("power_transformer_cardio.pkl")
+        self.robust_scaler = self._load_artifact("robust_scaler_cardio.pkl")
         
         # Charger le feature selector
-        self.feature_selector = joblib.load(os.path.join(model_dir, "feature_selector_cardio.pkl"))
+        self.feature_selector = self._load_artifact("feature_selector_cardio.pkl")
         
         # Charger la config
         config_path = os.path.join(model_dir, "model_config_cardio.pkl")
         if os.path.exists(config_path):
-            self.config = joblib.load(config_path)
+            self.config = self._load_artifact(os.path.basename(config_path))
             self.threshold = self.config.get('threshold', 0.5)
         else:
             self.threshold = 0.5
         
-        # Messages de debug vers stderr
-        print(f"✅ Modèle cardiovasculaire chargé depuis {model_dir}", file=sys.stderr)
-        print(f"   Threshold : {self.threshold}", file=sys.stderr)
+        # Plan de preprocessing NumPy (scaling + feature selection) compilé une seule fois
+        input_cols = list(getattr(self.power_transformer, 'feature_names_in_', self.ENGINEERED_COLS))
+        self._plan = self._compile_preprocessing_plan(input_cols)
+    
+    def _build_dataframe(self, records):
+        """
+        Construit le DataFrame d'entrée pour un ou plusieurs patients
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            DataFrame avec exactement les colonnes REQUIRED_COLS (valeurs manquantes à 0)
+        """
+        import pandas as pd
+        if is_dataframe(records):
+            return records.reindex(columns=self.REQUIRED_COLS).fillna(0)
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return pd.DataFrame(records, columns=self.REQUIRED_COLS)
+        
+        return pd.DataFrame([{col: record.get(col, 0) for col in self.REQUIRED_COLS}
+                             for record in records], columns=self.REQUIRED_COLS)
+    
+    def _build_array(self, records):
+        """
+        Construit la matrice float (N, 11) d'entrée, colonnes dans l'ordre REQUIRED_COLS, sans pandas
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+        """
+        if is_dataframe(records):
+            return self._build_dataframe(records).to_numpy(dtype=np.float64)
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return np.asarray(records, dtype=np.float64)
+        
+        return np.array([[record.get(col, 0) for col in self.REQUIRED_COLS] for record in records],
+                        dtype=np.float64).reshape(-1, len(self.REQUIRED_COLS))
+    
+    def _preprocess_array(self, raw):
+        """
+        Chemin rapide : feature engineering NumPy + plan compilé, sans DataFrame
+        
+        Args:
+            raw: Array (N, 11) dans l'ordre REQUIRED_COLS
+            
+        Returns:
+            Array numpy prêt pour la prédiction
+        """
+        features = dict(zip(self.REQUIRED_COLS, raw.T))
+        
+        # Mêmes features dérivées que _feature_engineering
+        features['bmi'] = features['weight'] / ((features['height'] / 100) ** 2)
+        features['age_squared'] = features['age_years'] ** 2
+        features['ap_hi_squared'] = features['ap_hi'] ** 2
+        features['bmi_squared'] = features['bmi'] ** 2
+        features['alco_inactive'] = features['alco'] * (1 - features['active'])
+        
+        # Les colonnes attendues par le transformer mais non calculées valent 0 (comme _preprocess)
+        zeros = np.zeros(raw.shape[0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            X = np.column_stack([features.get(col, zeros) for col in self._plan['input_cols']])
+        return self._apply_preprocessing_plan(X)
     
     def _feature_engineering(self, data):
         """
@@ -114,6 +223,7 @@ class CardiovascularPredictor:
         Returns:
             Array numpy prêt pour la prédiction
         """
+        import pandas as pd
         # Feature engineering d'abord
         X_engineered = self._feature_engineering(data)
         
@@ -181,19 +291,15 @@ class CardiovascularPredictor:
             Si return_probability=False : 0 ou 1
             Si return_probability=True : (prediction, probability)
         """
-        # Créer un DataFrame avec toutes les colonnes nécessaires
-        # Ordre des colonnes du dataset : id,gender,height,weight,ap_hi,ap_lo,cholesterol,gluc,smoke,alco,active,cardio,age_years
-        required_cols = ['gender', 'height', 'weight', 'ap_hi', 'ap_lo', 'cholesterol', 
-                        'gluc', 'smoke', 'alco', 'active', 'age_years']
-        
-        # Créer un DataFrame avec toutes les colonnes, remplir avec les valeurs du dict ou 0
-        data = pd.DataFrame([{col: data_dict.get(col, 0) for col in required_cols}])
-        
         # Preprocessing
-        X_processed = self._preprocess(data)
+        if self._plan is not None:
+            X_processed = self._preprocess_array(self._build_array([data_dict]))
+        else:
+            # Créer un DataFrame avec toutes les colonnes, remplir avec les valeurs du dict ou 0
+            X_processed = self._preprocess(self._build_dataframe([data_dict]))
         
         # Prédiction
-        proba = self.model.predict_proba(X_processed)[0][1]
+        proba = self._predict_proba(X_processed)[0]
         
         # Décision avec seuil optimal
         prediction = 1 if proba >= self.threshold else 0
@@ -202,4 +308,31 @@ class CardiovascularPredictor:
             return prediction, float(proba)
         else:
             return prediction
-
+    
+    def predict_batch(self, records):
+        """
+        Prédit pour plusieurs patients en une seule passe du pipeline
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D de shape (N, 11)
+                     (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            (predictions, probabilities) : arrays numpy de longueur N (int et float)
+        """
+        if len(records) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=float)
+        
+        # Preprocessing
+        if self._plan is not None:
+            X_processed = self._preprocess_array(self._build_array(records))
+        else:
+            X_processed = self._preprocess(self._build_dataframe(records))
+        
+        # Prédiction
+        probabilities = self._predict_proba(X_processed).astype(float)
+        
+        # Décision avec seuil optimal
+        predictions = (probabilities >= self.threshold).astype(int)
+        
+        return predictions, probabilities
@@ -6,80 +6,237 @@ Script pour charger le modèle XGBoost de diabète et faire des prédictions
 import os
 import sys
 import numpy as np
-import pandas as pd
-import joblib
 import warnings
 import glob
 warnings.filterwarnings('ignore')
 
 # Configurer OpenMP pour XGBoost sur macOS AVANT d'importer xgboost
-libomp_paths = [
-    '/opt/homebrew/opt/libomp/lib/libomp.dylib',
-    '/usr/local/opt/libomp/lib/libomp.dylib',
-    '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
-    '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
-]
+# (le scan glob n'est fait que sur macOS, les chemins n'existent pas ailleurs)
+if sys.platform == 'darwin':
+    libomp_paths = [
+        '/opt/homebrew/opt/libomp/lib/libomp.dylib',
+        '/usr/local/opt/libomp/lib/libomp.dylib',
+        '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
+        '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
+    ]
 
-for pattern in libomp_paths:
-    matches = glob.glob(pattern)
-    if matches:
-        libomp_dir = os.path.dirname(matches[0])
-        if 'DYLD_LIBRARY_PATH' in os.environ:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
-        else:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
-        break
+    for pattern in libomp_paths:
+        matches = glob.glob(pattern)
+        if matches:
+            libomp_dir = os.path.dirname(matches[0])
+            if 'DYLD_LIBRARY_PATH' in os.environ:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
+            else:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
+            break
 
 # Définir OMP_NUM_THREADS pour éviter les problèmes
 os.environ['OMP_NUM_THREADS'] = '1'
 
-class DiabetesPredictor:
+# Code commun aux prédicteurs XGBoost (public/models/xgb_predictor_base.py)
+_MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _MODELS_DIR not in sys.path:
+    sys.path.append(_MODELS_DIR)
+from xgb_predictor_base import XGBPredictorBase, is_dataframe, json_safe
+
+class DiabetesPredictor(XGBPredictorBase):
     """
     Classe pour charger et utiliser le modèle de prédiction du diabète
     """
     
-    def __init__(self, model_dir):
+    # Ordre exact du dataset: Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age
+    REQUIRED_COLS = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+                     'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
+    
+    # Colonnes après feature engineering, dans l'ordre de création (ordre vu par les transformers)
+    ENGINEERED_COLS = REQUIRED_COLS + [
+        'BMI_Age', 'Glucose_BMI', 'Glucose_Age', 'Insulin_Glucose', 'Pregnancies_Age', 'DiabetesPedigree_Age',
+        'BMI_squared', 'Glucose_squared', 'Age_squared', 'BMI_cubed',
+        'Glucose_Insulin_ratio', 'BMI_BP_ratio', 'Age_Pregnancies_ratio', 'Glucose_DiabetesPedigree',
+        'log_Insulin', 'log_BMI', 'log_Glucose',
+        'Age_group', 'BMI_category', 'Glucose_level', 'BP_category',
+        'risk_score',
+    ]
+    
+    # Le modèle XGBoost final attend 8 features
+    N_MODEL_FEATURES = 8
+    
+    # Artefacts dont le bundle est dérivé (leur empreinte est vérifiée au chargement du bundle)
+    BUNDLE_SOURCES = ['xgb_diabetes_best_optimized.pkl', 'xgb_diabetes_best_optimized.ubj',
+                      'power_transformer.pkl', 'robust_scaler.pkl', 'feature_selector_rfecv.pkl',
+                      'model_config_ultimate.pkl', 'optimal_threshold.pkl']
+    
+    def __init__(self, model_dir, n_threads=None, use_bundle=True):
         """
         Initialise le prédicteur
         
         Args:
             model_dir: Dossier contenant les fichiers du modèle
+            n_threads: Nombre de threads XGBoost (défaut: variable LIVEDOC_XGB_NTHREAD, sinon 1)
+            use_bundle: Si False, ignore le bundle et charge les artefacts séparés
         """
         self.model_dir = model_dir
         
-        # Charger le modèle
-        model_path = os.path.join(model_dir, "xgb_diabetes_best_optimized.pkl")
-        self.model = joblib.load(model_path)
+        # Durée de chargement de chaque artefact en ms (rapport --startup-profile des scripts)
+        self.load_timings = {}
+        
+        # Bundle mmap unique (scripts/build_model_bundles.py) s'il est présent et à jour,
+        # sinon artefacts séparés
+        if not (use_bundle and self._load_bundle(os.path.join(model_dir, self.BUNDLE_NAME), n_threads)):
+            self._load_artifacts(n_threads)
+        
+        # Messages de debug vers stderr
+        print(f"✅ Modèle diabète chargé depuis {model_dir}", file=sys.stderr)
+        print(f"   Threshold : {self.threshold}", file=sys.stderr)
+        if self.model_version is not None:
+            print(f"   Bundle : {self.BUNDLE_NAME} (version {self.model_version})", file=sys.stderr)
+        if hasattr(self.feature_selector, 'n_features_'):
+            print(f"   RFECV n_features_ : {self.feature_selector.n_features_}", file=sys.stderr)
+        if hasattr(self.feature_selector, 'feature_names_in_'):
+            print(f"   RFECV feature_names_in_ : {len(self.feature_selector.feature_names_in_)} features", file=sys.stderr)
+    
+    def _load_artifacts(self, n_threads=None):
+        """
+        Charge le modèle, les scalers, le feature selector et la config depuis les fichiers séparés
+        """
+        model_dir = self.model_dir
+        self.model_version = None
+        
+        # Charger le modèle (format natif UBJSON si disponible, sinon pickle joblib)
+        self.model = self._load_xgb_model(os.path.join(model_dir, "xgb_diabetes_best_optimized.pkl"))
+        
+        # Booster natif pour l'inférence
+        self._init_booster(n_threads)
         
         # Charger les scalers
-        self.power_transformer = joblib.load(os.path.join(model_dir, "power_transformer.pkl"))
-        self.robust_scaler = joblib.load(os.path.join(model_dir, "robust_scaler.pkl"))
+        self.power_transformer = self._load_artifact("power_transformer.pkl")
+        self.robust_scaler = self._load_artifact("robust_scaler.pkl")
         
         # Charger le feature selector
-        self.feature_selector = joblib.load(os.path.join(model_dir, "feature_selector_rfecv.pkl"))
+        self.feature_selector = self._load_artifact("feature_selector_rfecv.pkl")
         
         # Charger la config
         config_path = os.path.join(model_dir, "model_config_ultimate.pkl")
         if os.path.exists(config_path):
-            self.config = joblib.load(config_path)
+            self.config = self._load_artifact(os.path.basename(config_path))
             self.threshold = self.config.get('threshold', 0.5)
             self.selected_features = self.config.get('selected_features', [])
         else:
             # Fallback sur optimal_threshold.pkl
             threshold_path = os.path.join(model_dir, "optimal_threshold.pkl")
             if os.path.exists(threshold_path):
-                self.threshold = joblib.load(threshold_path)
+                self.threshold = self._load_artifact(os.path.basename(threshold_path))
             else:
                 self.threshold = 0.5
             self.selected_features = []
         
-        # Messages de debug vers stderr
-        print(f"✅ Modèle diabète chargé depuis {model_dir}", file=sys.stderr)
-        print(f"   Threshold : {self.threshold}", file=sys.stderr)
-        if hasattr(self.feature_selector, 'n_features_'):
-            print(f"   RFECV n_features_ : {self.feature_selector.n_features_}", file=sys.stderr)
-        if hasattr(self.feature_selector, 'feature_names_in_'):
-            print(f"   RFECV feature_names_in_ : {len(self.feature_selector.feature_names_in_)} features", file=sys.stderr)
+        # Plan de preprocessing NumPy (scaling + feature selection) compilé une seule fois
+        self._plan = self._compile_preprocessing_plan(self.ENGINEERED_COLS, max_features=self.N_MODEL_FEATURES)
+    
+    def _bundle_extras(self):
+        return {'selected_features': json_safe(self.selected_features)}
+    
+    def _restore_bundle_extras(self, manifest):
+        self.selected_features = manifest.get('selected_features', [])
+    
+    def _build_dataframe(self, records):
+        """
+        Construit le DataFrame d'entrée (colonnes dans l'ordre du dataset) pour un ou plusieurs patients
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            DataFrame avec exactement les colonnes REQUIRED_COLS (valeurs manquantes à 0)
+        """
+        import pandas as pd
+        if is_dataframe(records):
+            return records.reindex(columns=self.REQUIRED_COLS).fillna(0)
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return pd.DataFrame(records, columns=self.REQUIRED_COLS)
+        
+        return pd.DataFrame([{
+            col: record.get(col, 0) for col in self.REQUIRED_COLS
+        } for record in records], columns=self.REQUIRED_COLS)
+    
+    def _build_array(self, records):
+        """
+        Construit la matrice float (N, 8) d'entrée, colonnes dans l'ordre REQUIRED_COLS, sans pandas
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+        """
+        if is_dataframe(records):
+            return self._build_dataframe(records).to_numpy(dtype=np.float64)
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return np.asarray(records, dtype=np.float64)
+        
+        return np.array([[record.get(col, 0) for col in self.REQUIRED_COLS] for record in records],
+                        dtype=np.float64).reshape(-1, len(self.REQUIRED_COLS))
+    
+    @staticmethod
+    def _cut(values, bins):
+        """
+        Équivalent NumPy de pd.cut(values, bins, labels=range(...)).astype(int) (intervalles ]a, b])
+        """
+        valid = (values > bins[0]) & (values <= bins[-1])
+        if not valid.all():
+            # pd.cut renvoie NaN hors des bins et .astype(int) échoue
+            raise ValueError("Cannot convert float NaN to integer")
+        return (np.searchsorted(bins, values, side='left') - 1).astype(np.float64)
+    
+    def _feature_engineering_array(self, raw):
+        """
+        Feature engineering de _feature_engineering en NumPy pur
+        
+        Args:
+            raw: Array (N, 8) dans l'ordre REQUIRED_COLS
+            
+        Returns:
+            Array (N, 30) dans l'ordre ENGINEERED_COLS
+        """
+        Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age = raw.T
+        
+        return np.column_stack([
+            raw,
+            # Interactions médicalement pertinentes
+            BMI * Age, Glucose * BMI, Glucose * Age, Insulin * Glucose,
+            Pregnancies * Age, DiabetesPedigreeFunction * Age,
+            # Features polynomiales
+            BMI ** 2, Glucose ** 2, Age ** 2, BMI ** 3,
+            # Ratios métaboliques
+            Glucose / (Insulin + 1), BMI / (BloodPressure + 1), Age / (Pregnancies + 1),
+            Glucose * DiabetesPedigreeFunction,
+            # Transformations logarithmiques
+            np.log1p(Insulin), np.log1p(BMI), np.log1p(Glucose),
+            # Bins médicaux
+            self._cut(Age, [0, 30, 50, 100]),
+            self._cut(BMI, [0, 18.5, 25, 30, 100]),
+            self._cut(Glucose, [0, 100, 125, 200]),
+            self._cut(BloodPressure, [0, 80, 90, 200]),
+            # Score de risque composite
+            (Glucose/200 + BMI/40 + Age/100 + DiabetesPedigreeFunction*2) / 4,
+        ])
+    
+    def _preprocess_array(self, raw):
+        """
+        Chemin rapide : feature engineering + plan compilé, sans DataFrame
+        
+        Args:
+            raw: Array (N, 8) dans l'ordre REQUIRED_COLS
+            
+        Returns:
+            Array numpy (N, 8) prêt pour la prédiction
+        """
+        return self._apply_preprocessing_plan(self._feature_engineering_array(raw))
     
     def _feature_engineering(self, data):
         """
@@ -91,6 +248,7 @@ class DiabetesPredictor:
         Returns:
             DataFrame avec features supplémentaires
         """
+        import pandas as pd
         X = data.copy()
         
         # Interactions médicalement pertinentes
@@ -140,6 +298,7 @@ class DiabetesPredictor:
         Returns:
             Array numpy prêt pour la prédiction (8 features après sélection)
         """
+        import pandas as pd
         # Feature engineering
         X = self._feature_engineering(data)
         
@@ -211,7 +370,7 @@ class DiabetesPredictor:
             # Le modèle XGBoost attend 8 features, mais le RFECV peut avoir sélectionné plus
             # Si on a plus de 8 features, utiliser support_ pour sélectionner les 8 correctes
             needs_fallback = False
-            expected_features = 8  # Le modèle XGBoost final attend 8 features
+            expected_features = self.N_MODEL_FEATURES  # Le modèle XGBoost final attend 8 features
             
             if X_selected is None:
                 needs_fallback = True
@@ -309,31 +468,20 @@ class DiabetesPredictor:
             Si return_probability=False : 0 ou 1
             Si return_probability=True : (prediction, probability)
         """
-        # Créer un DataFrame avec les colonnes dans le bon ordre (comme dans le dataset original)
-        # Ordre exact du dataset: Pregnancies, Glucose, BloodPressure, SkinThickness, Insulin, BMI, DiabetesPedigreeFunction, Age
-        required_cols = ['Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
-                        'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age']
-        
-        # Créer le DataFrame avec les colonnes dans l'ordre exact
-        data = pd.DataFrame([{
-            col: data_dict.get(col, 0) for col in required_cols
-        }], columns=required_cols)
-        
-        # Vérifier que toutes les colonnes sont présentes
-        for col in required_cols:
-            if col not in data.columns:
-                raise ValueError(f"Colonne manquante: {col}")
-        
         # Preprocessing (feature engineering + scaling + feature selection)
         try:
-            X_processed = self._preprocess(data)
+            if self._plan is not None:
+                X_processed = self._preprocess_array(self._build_array([data_dict]))
+            else:
+                # Créer un DataFrame avec les colonnes dans le bon ordre (comme dans le dataset original)
+                X_processed = self._preprocess(self._build_dataframe([data_dict]))
         except Exception as e:
             error_msg = f"Erreur lors du preprocessing: {str(e)}"
             print(f"   ERREUR: {error_msg}", file=sys.stderr)
             raise ValueError(error_msg)
         
         # Vérifier la forme après preprocessing
-        if X_processed.shape[1] != 8:
+        if X_processed.shape[1] != self.N_MODEL_FEATURES:
             error_msg = (f"Shape mismatch après preprocessing: attendu 8 features, obtenu {X_processed.shape[1]}. "
                         f"Le feature selector RFECV devrait sélectionner 8 features. "
                         f"Vérifiez que le feature selector est correctement chargé et que l'ordre des colonnes correspond à l'entraînement.")
@@ -341,7 +489,7 @@ class DiabetesPredictor:
             raise ValueError(error_msg)
         
         # Prédiction
-        proba = self.model.predict_proba(X_processed)[0][1]
+        proba = self._predict_proba(X_processed)[0]
         
         # Décision avec seuil optimal
         prediction = 1 if proba >= self.threshold else 0
@@ -350,4 +498,37 @@ class DiabetesPredictor:
             return prediction, float(proba)
         else:
             return prediction
-
+    
+    def predict_batch(self, records):
+        """
+        Prédit pour plusieurs patients en une seule passe du pipeline
+        (feature engineering, scaling, feature selection et modèle appliqués une fois sur N lignes)
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D de shape (N, 8)
+                     (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            (predictions, probabilities) : arrays numpy de longueur N (int et float)
+        """
+        if len(records) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=float)
+        
+        # Preprocessing (feature engineering + scaling + feature selection)
+        try:
+            if self._plan is not None:
+                X_processed = self._preprocess_array(self._build_array(records))
+            else:
+                X_processed = self._preprocess(self._build_dataframe(records))
+        except Exception as e:
+            error_msg = f"Erreur lors du preprocessing: {str(e)}"
+            print(f"   ERREUR: {error_msg}", file=sys.stderr)
+            raise ValueError(error_msg)
+        
+        # Prédiction
+        probabilities = self._predict_proba(X_processed).astype(float)
+        
+        # Décision avec seuil optimal
+        predictions = (probabilities >= self.threshold).astype(int)
+        
+        return predictions, probabilities
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Rendu différé du rapport graphique de train_diabetes.py (figure 3x3 de l'évaluation sur le jeu de test)
+
+L'entraînement n'importe pas matplotlib : il écrit l'évaluation dans diabetes_evaluation.json
+(seuil, matrice de confusion, métriques, features sélectionnées) et diabetes_evaluation.npz
+(probabilités du test, courbes ROC et précision-rappel, balayage des seuils, importances).
+Ce script relit ces fichiers et trace la figure, hors du processus d'entraînement.
+
+Usage:
+    python3 render_diabetes_report.py [--input diabetes_evaluation] [--output diabetes_analysis_complete.png]
+                                      [--dpi 300]
+"""
+
+import sys
+import json
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+warnings.filterwarnings('ignore')
+
+def load_evaluation(prefix):
+    """
+    Charge l'évaluation écrite par train_diabetes.py
+
+    Args:
+        prefix: Chemin sans extension des fichiers .json et .npz
+
+    Returns:
+        (dictionnaire du JSON, dictionnaire des arrays du NPZ)
+    """
+    with open(prefix + '.json', 'r', encoding='utf-8') as f:
+        evaluation = json.load(f)
+    with np.load(prefix + '.npz', allow_pickle=False) as npz:
+        arrays = {name: npz[name] for name in npz.files}
+    return evaluation, arrays
+
+def render_report(evaluation, arrays, output_path, dpi=300):
+    """
+    Trace la figure d'analyse complète et l'enregistre en PNG
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+
+    cm = np.array(evaluation['confusion_matrix'])
+    tn, fp, fn, tp = cm.ravel()
+    best_threshold = evaluation['threshold']
+    best_idx = evaluation['best_index']
+    roc_auc = evaluation['metrics']['roc_auc']
+    pr_auc = evaluation['metrics']['pr_auc']
+    selected_features = evaluation['selected_features']
+
+    y_test = arrays['y_test']
+    y_proba = arrays['y_proba']
+    y_pred_final = (y_proba >= best_threshold).astype(int)
+    fpr, tpr = arrays['roc_fpr'], arrays['roc_tpr']
+    precision, recall = arrays['pr_precision'], arrays['pr_recall']
+    thresholds = arrays['sweep_thresholds']
+    f1_scores = arrays['sweep_f1']
+    recalls = arrays['sweep_recall']
+    precisions = arrays['sweep_precision']
+    feature_importances = arrays['feature_importances']
+
+    fig = plt.figure(figsize=(20, 16))
+
+    # 1. MATRICE DE CONFUSION - Style médical
+    ax1 = plt.subplot(3, 3, 1)
+    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False, 
+                square=True, linewidths=2, linecolor='black',
+                annot_kws={'size': 16, 'weight': 'bold'})
+    plt.title('Matrice de Confusion', fontsize=14, fontweight='bold', pad=15)
+    plt.ylabel('Vraie Classe', fontsize=12, fontweight='bold')
+    plt.xlabel('Classe Prédite', fontsize=12, fontweight='bold')
+    plt.xticks([0.5, 1.5], ['Pas Diabète (0)', 'Diabète (1)'], rotation=0)
+    plt.yticks([0.5, 1.5], ['Pas Diabète (0)', 'Diabète (1)'], rotation=0)
+
+    # Annotations détaillées
+    for i in range(2):
+        for j in range(2):
+            value = cm[i, j]
+            total = cm.sum()
+            percentage = (value / total) * 100
+            if i == 0 and j == 0:
+                label = f'TN\n{value}\n({percentage:.1f}%)'
+            elif i == 0 and j == 1:
+                label = f'FP\n{value}\n({percentage:.1f}%)'
+            elif i == 1 and j == 0:
+                label = f'FN\n{value}\n({percentage:.1f}%)'
+            else:
+                label = f'TP\n{value}\n({percentage:.1f}%)'
+            ax1.text(j+0.5, i+0.7, label, ha='center', va='center', 
+                    fontsize=11, color='darkred' if i != j else 'darkgreen')
+
+    # 2. MATRICE DE CONFUSION NORMALISÉE
+    ax2 = plt.subplot(3, 3, 2)
+    cm_normalized = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
+    sns.heatmap(cm_normalized, annot=True, fmt='.2%', cmap='RdYlGn', 
+                cbar_kws={'label': 'Pourcentage'}, square=True,
+                linewidths=2, linecolor='black')
+    plt.title('Matrice de Confusion Normalisée', fontsize=14, fontweight='bold', pad=15)
+    plt.ylabel('Vraie Classe', fontsize=12)
+    plt.xlabel('Classe Prédite', fontsize=12)
+    plt.xticks([0.5, 1.5], ['Pas Diabète', 'Diabète'], rotation=0)
+    plt.yticks([0.5, 1.5], ['Pas Diabète', 'Diabète'], rotation=0)
+
+    # 3. COURBE ROC
+    ax3 = plt.subplot(3, 3, 3)
+    plt.plot(fpr, tpr, color='darkorange', lw=3, 
+             label=f'ROC (AUC = {roc_auc:.4f})')
+    plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--', label='Hasard')
+    plt.xlim([0.0, 1.0])
+    plt.ylim([0.0, 1.05])
+    plt.xlabel('Taux de Faux Positifs (1 - Spécificité)', fontsize=11, fontweight='bold')
+    plt.ylabel('Taux de Vrais Positifs (Sensibilité)', fontsize=11, fontweight='bold')
+    plt.title('Courbe ROC', fontsize=14, fontweight='bold', pad=15)
+    plt.legend(loc="lower right", fontsize=10)
+    plt.grid(alpha=0.3)
+
+    # 4. COURBE PRECISION-RECALL
+    ax4 = plt.subplot(3, 3, 4)
+    plt.plot(recall, precision, color='green', lw=3,
+             label=f'PR (AUC = {pr_auc:.4f})')
+    plt.scatter(recalls[best_idx], precisions[best_idx], color='red', s=200, 
+               zorder=5, label=f'Seuil optimal ({best_threshold:.3f})')
+    plt.xlabel('Recall (Sensibilité)', fontsize=11, fontweight='bold')
+    plt.ylabel('Precision', fontsize=11, fontweight='bold')
+    plt.title('Courbe Precision-Recall', fontsize=14, fontweight='bold', pad=15)
+    plt.legend(loc="best", fontsize=10)
+    plt.grid(alpha=0.3)
+
+    # 5. ÉVOLUTION DES MÉTRIQUES SELON LE SEUIL
+    ax5 = plt.subplot(3, 3, 5)
+    plt.plot(thresholds, f1_scores, 'b-', lw=2, label='F1-Score')
+    plt.plot(thresholds, recalls, 'g-', lw=2, label='Recall')
+    plt.plot(thresholds, precisions, 'r-', lw=2, label='Precision')
+    plt.axvline(best_threshold, color='black', linestyle='--', lw=2, 
+               label=f'Seuil optimal ({best_threshold:.3f})')
+    plt.xlabel('Seuil de Décision', fontsize=11, fontweight='bold')
+    plt.ylabel('Score', fontsize=11, fontweight='bold')
+    plt.title('Impact du Seuil sur les Métriques', fontsize=14, fontweight='bold', pad=15)
+    plt.legend(loc="best", fontsize=10)
+    plt.grid(alpha=0.3)
+
+    # 6. IMPORTANCE DES FEATURES (Top 15)
+    ax6 = plt.subplot(3, 3, 6)
+    if len(feature_importances):
+        feature_names = [selected_features[i] if i < len(selected_features) 
+                        else f"Feature_{i}" for i in range(len(feature_importances))]
+        importance_df = pd.DataFrame({
+            'feature': feature_names,
+            'importance': feature_importances
+        }).sort_values('importance', ascending=False).head(15)
+
+        colors = plt.cm.viridis(np.linspace(0, 1, len(importance_df)))
+        plt.barh(range(len(importance_df)), importance_df['importance'], color=colors)
+        plt.yticks(range(len(importance_df)), importance_df['feature'])
+        plt.xlabel('Importance', fontsize=11, fontweight='bold')
+        plt.title('Top 15 Features Importantes', fontsize=14, fontweight='bold', pad=15)
+        plt.gca().invert_yaxis()
+        plt.grid(axis='x', alpha=0.3)
+
+    # 7. DISTRIBUTION DES PROBABILITÉS
+    ax7 = plt.subplot(3, 3, 7)
+    plt.hist(y_proba[y_test == 0], bins=50, alpha=0.6, label='Pas Diabète', 
+             color='blue', edgecolor='black')
+    plt.hist(y_proba[y_test == 1], bins=50, alpha=0.6, label='Diabète', 
+             color='red', edgecolor='black')
+    plt.axvline(best_threshold, color='green', linestyle='--', lw=3, 
+               label=f'Seuil ({best_threshold:.3f})')
+    plt.xlabel('Probabilité Prédite', fontsize=11, fontweight='bold')
+    plt.ylabel('Fréquence', fontsize=11, fontweight='bold')
+    plt.title('Distribution des Probabilités', fontsize=14, fontweight='bold', pad=15)
+    plt.legend(fontsize=10)
+    plt.grid(alpha=0.3)
+
+    # 8. MÉTRIQUES PAR CLASSE
+    ax8 = plt.subplot(3, 3, 8)
+    metrics_data = {
+        'Classe 0': [cm_normalized[0, 0], precisions[best_idx] if y_pred_final[y_test==0].sum()>0 else 0, 
+                     tn/(tn+fp)],
+        'Classe 1': [cm_normalized[1, 1], precisions[best_idx], recalls[best_idx]]
+    }
+    x = np.arange(3)
+    width = 0.35
+    labels = ['Recall', 'Precision', 'Spécificité/Sensibilité']
+
+    bars1 = plt.bar(x - width/2, metrics_data['Classe 0'], width, 
+                   label='Pas Diabète', color='skyblue', edgecolor='black')
+    bars2 = plt.bar(x + width/2, metrics_data['Classe 1'], width, 
+                   label='Diabète', color='salmon', edgecolor='black')
+
+    plt.ylabel('Score', fontsize=11, fontweight='bold')
+    plt.title('Comparaison des Métriques par Classe', fontsize=14, fontweight='bold', pad=15)
+    plt.xticks(x, labels, rotation=15, ha='right')
+    plt.legend(fontsize=10)
+    plt.ylim([0, 1])
+    plt.grid(axis='y', alpha=0.3)
+
+    # Annotations des valeurs
+    for bars in [bars1, bars2]:
+        for bar in bars:
+            height = bar.get_height()
+            plt.text(bar.get_x() + bar.get_width()/2., height,
+                    f'{height:.2f}', ha='center', va='bottom', fontsize=9)
+
+    # 9. RÉSUMÉ TEXTUEL
+    ax9 = plt.subplot(3, 3, 9)
+    ax9.axis('off')
+
+    summary_text = f"""
+╔═══════════════════════════════════════╗
+║     RÉSUMÉ DES PERFORMANCES           ║
+╚═══════════════════════════════════════╝
+
+🎯 MATRICE DE CONFUSION
+   TN (Vrais Négatifs):    {tn:3d}
+   FP (Faux Positifs):     {fp:3d}
+   FN (Faux Négatifs):     {fn:3d}
+   TP (Vrais Positifs):    {tp:3d}
+
+📊 MÉTRIQUES GLOBALES
+   Accuracy:               {(tn+tp)/(tn+fp+fn+tp):.1%}
+   ROC-AUC:                {roc_auc:.4f}
+   PR-AUC:                 {pr_auc:.4f}
+
+⚕️  MÉTRIQUES MÉDICALES
+   Sensibilité (Recall):   {tp/(tp+fn):.1%}
+   Spécificité:            {tn/(tn+fp):.1%}
+   PPV (Precision):        {tp/(tp+fp):.1%}
+   NPV:                    {tn/(tn+fn):.1%}
+
+🎚️  SEUIL DE DÉCISION
+   Seuil optimal:          {best_threshold:.4f}
+   F1-Score au seuil:      {f1_scores[best_idx]:.4f}
+
+⚠️  ANALYSE DES ERREURS
+   Taux FP:                {fp/(tn+fp):.1%}
+   Taux FN:                {fn/(tp+fn):.1%}
+"""
+
+    ax9.text(0.1, 0.95, summary_text, transform=ax9.transAxes,
+            fontsize=10, verticalalignment='top', fontfamily='monospace',
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
+
+    plt.tight_layout(pad=3.0)
+    plt.savefig(output_path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rendu du rapport graphique du modèle de diabète")
+    parser.add_argument('--input', default='diabetes_evaluation',
+                        help="Préfixe des fichiers d'évaluation (.json et .npz)")
+    parser.add_argument('--output', default='diabetes_analysis_complete.png', help="Image PNG de sortie")
+    parser.add_argument('--dpi', type=int, default=300, help="Résolution de l'image")
+    args = parser.parse_args()
+
+    try:
+        evaluation, arrays = load_evaluation(args.input)
+    except (OSError, ValueError) as e:
+        print(f"❌ Évaluation illisible ({args.input}.json / .npz): {str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    render_report(evaluation, arrays, args.output, dpi=args.dpi)
+    print(f"✅ Graphiques sauvegardés: {args.output} ({args.dpi} dpi)")
+
+if __name__ == "__main__":
+    main()
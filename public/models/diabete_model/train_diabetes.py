@@ -1,10 +1,21 @@
 # ======================================
 # XGBoost DIABETES - PERFORMANCE MAXIMALE
 # ======================================
+import os
+import sys
+import json
+import time
+import subprocess
+import hashlib
+import inspect
 import numpy as np
 import pandas as pd
 import joblib
+from joblib import Parallel, delayed
+import xgboost as xgb
 from xgboost import XGBClassifier
+import sklearn
+import imblearn
 from sklearn.model_selection import train_test_split, StratifiedKFold, cross_val_score
 from sklearn.metrics import (classification_report, f1_score, roc_auc_score, 
                              confusion_matrix, roc_curve, precision_recall_curve,
@@ -12,102 +23,339 @@ from sklearn.metrics import (classification_report, f1_score, roc_auc_score,
 from sklearn.preprocessing import StandardScaler, RobustScaler, PowerTransformer
 from imblearn.over_sampling import SMOTE, ADASYN, BorderlineSMOTE
 from imblearn.combine import SMOTETomek, SMOTEENN
-from sklearn.feature_selection import SelectKBest, mutual_info_classif, RFECV
+from sklearn.feature_selection import SelectKBest, mutual_info_classif, RFECV, RFE
 import optuna
 from optuna.samplers import TPESampler
-import matplotlib.pyplot as plt
-import seaborn as sns
+from optuna.pruners import MedianPruner, HyperbandPruner, NopPruner
 import warnings
 warnings.filterwarnings('ignore')
 
-# Configuration des graphiques
-plt.style.use('seaborn-v0_8-darkgrid')
-sns.set_palette("husl")
+# Budget CPU de l'entraînement : nombre total de cœurs utilisés par les étapes parallèles
+N_JOBS = int(os.environ.get('LIVEDOC_TRAIN_N_JOBS', os.cpu_count() or 1))
+
+# Recherche Optuna : étude persistée en SQLite (reprise après interruption), trials en parallèle
+# sur option (1 worker par défaut : l'ordre des trials, donc le meilleur modèle, reste reproductible),
+# pruning sur les scores intermédiaires des folds et budget de temps optionnel (secondes)
+OPTUNA_STORAGE = os.environ.get('LIVEDOC_TRAIN_OPTUNA_STORAGE', 'sqlite:///optuna_diabetes.db')
+OPTUNA_TRIALS = int(os.environ.get('LIVEDOC_TRAIN_TRIALS', '80'))
+OPTUNA_WORKERS = int(os.environ.get('LIVEDOC_TRAIN_OPTUNA_WORKERS', '1'))
+OPTUNA_PRUNER = os.environ.get('LIVEDOC_TRAIN_PRUNER', 'median')
+OPTUNA_TIMEOUT = float(os.environ.get('LIVEDOC_TRAIN_TIMEOUT', '0')) or None
+
+# Sélection des features : 'rfecv' (élimination une par une, complète) ou 'fast' (classement en une
+# passe puis confirmation par CV d'une suite géométrique de tailles, facteur FAST_SELECTION_SHRINK).
+# LIVEDOC_TRAIN_SELECTION_COMPARE=1 exécute les deux et écrit feature_selection_comparison.json
+FEATURE_SELECTION = os.environ.get('LIVEDOC_TRAIN_SELECTION', 'rfecv')
+COMPARE_SELECTION = os.environ.get('LIVEDOC_TRAIN_SELECTION_COMPARE', '') == '1'
+FAST_SELECTION_SHRINK = 0.75
+
+# Rapport graphique : l'entraînement n'importe pas matplotlib, il écrit EVALUATION_PREFIX.json/.npz.
+# La figure est tracée par render_diabetes_report.py, dans un processus séparé en fin d'entraînement
+# si LIVEDOC_TRAIN_REPORT=1 (résolution LIVEDOC_TRAIN_REPORT_DPI), sinon à la demande
+EVALUATION_PREFIX = "diabetes_evaluation"
+RENDER_REPORT = os.environ.get('LIVEDOC_TRAIN_REPORT', '') == '1'
+REPORT_DPI = int(os.environ.get('LIVEDOC_TRAIN_REPORT_DPI', '300'))
+RENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'render_diabetes_report.py')
+
+# Histogrammes XGBoost (QuantileDMatrix construites une fois par fold) et early stopping des folds
+MAX_BIN = 256
+EARLY_STOPPING_ROUNDS = 50
+
+# ========== 0. CACHE DES ÉTAPES ==========
+# Dossier du cache des étapes 1 à 6 (vide = désactivé)
+TRAIN_CACHE_DIR = os.environ.get('LIVEDOC_TRAIN_CACHE', '.train_cache')
+DATA_PATH = "data/diabetes_clean.csv"
+
+# Un changement de version peut changer les objets ajustés : les versions font partie des clés
+LIB_VERSIONS = {'numpy': np.__version__, 'pandas': pd.__version__, 'xgboost': xgb.__version__,
+                'sklearn': sklearn.__version__, 'imblearn': imblearn.__version__}
+
+class StageCache:
+    """
+    Cache disque des étapes du pipeline, adressé par contenu
+    
+    La clé d'une étape est le hash de la clé de son entrée, de ses paramètres, du code de la
+    fonction qui la calcule et des versions des bibliothèques : toute modification en amont
+    invalide les étapes suivantes. Les DataFrames sont stockés colonne par colonne (.npz),
+    les objets ajustés (scalers, sélecteur, jeux rééchantillonnés) avec joblib.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def file_key(path):
+        """
+        Hash SHA-256 du contenu d'un fichier d'entrée
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def key(stage, parent, params=None, code=None):
+        """
+        Clé d'une étape : entrée (clé de l'étape précédente) + paramètres + code + versions
+        """
+        payload = json.dumps({
+            'stage': stage,
+            'parent': parent,
+            'params': params,
+            'code': inspect.getsource(code) if code else None,
+            'versions': LIB_VERSIONS,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+    
+    def run(self, stage, key, compute, frame=False):
+        """
+        Retourne le résultat en cache de l'étape, sinon le calcule avec compute() et l'enregistre
+        
+        Args:
+            stage: Nom de l'étape (préfixe du fichier)
+            key: Clé de l'étape (StageCache.key)
+            compute: Fonction sans argument qui calcule le résultat
+            frame: True si le résultat est un DataFrame (stockage colonne par colonne)
+        """
+        start = time.perf_counter()
+        path = None
+        if self.directory:
+            path = os.path.join(self.directory, f"{stage}-{key}{'.npz' if frame else '.joblib'}")
+            if os.path.exists(path):
+                value = self._load_frame(path) if frame else joblib.load(path)
+                print(f"   ♻️  {stage}: cache {key} ({time.perf_counter() - start:.2f}s)")
+                return value
+        
+        value = compute()
+        if path:
+            # Écriture atomique : un run interrompu ne laisse jamais un fichier partiel sous la clé
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            if frame:
+                with open(tmp_path, 'wb') as f:
+                    self._save_frame(f, value)
+            else:
+                joblib.dump(value, tmp_path)
+            os.replace(tmp_path, path)
+        print(f"   {stage}: calculé en {time.perf_counter() - start:.2f}s")
+        return value
+    
+    @staticmethod
+    def _save_frame(f, df):
+        columns = {f"col{i}": df[name].to_numpy() for i, name in enumerate(df.columns)}
+        np.savez(f, _columns=np.array([str(name) for name in df.columns]), **columns)
+    
+    @staticmethod
+    def _load_frame(path):
+        with np.load(path, allow_pickle=False) as arrays:
+            names = arrays['_columns'].tolist()
+            return pd.DataFrame({name: arrays[f"col{i}"] for i, name in enumerate(names)})
+
+stage_cache = StageCache(TRAIN_CACHE_DIR)
 
 # ========== 1. CHARGEMENT & ANALYSE ==========
 print("📊 Chargement des données...")
-data = pd.read_csv("data/diabetes_clean.csv")
-X = data.drop("Outcome", axis=1)
+data_key = stage_cache.key('donnees', StageCache.file_key(DATA_PATH))
+data = stage_cache.run('donnees', data_key, lambda: pd.read_csv(DATA_PATH), frame=True)
 y = data["Outcome"]
 
 print(f"Distribution des classes: {np.bincount(y)}")
 print(f"Ratio déséquilibre: {np.bincount(y)[0]/np.bincount(y)[1]:.2f}:1")
-print(f"Features initiales: {X.shape[1]}")
+print(f"Features initiales: {data.shape[1] - 1}")
 
 # ========== 2. FEATURE ENGINEERING ULTRA-AVANCÉ ==========
 print("\n🔧 Feature Engineering avancé...")
 
-# Interactions médicalement pertinentes
-X['BMI_Age'] = X['BMI'] * X['Age']
-X['Glucose_BMI'] = X['Glucose'] * X['BMI']
-X['Glucose_Age'] = X['Glucose'] * X['Age']
-X['Insulin_Glucose'] = X['Insulin'] * X['Glucose']
-X['Pregnancies_Age'] = X['Pregnancies'] * X['Age']
-X['DiabetesPedigree_Age'] = X['DiabetesPedigreeFunction'] * X['Age']
-
-# Features polynomiales
-X['BMI_squared'] = X['BMI'] ** 2
-X['Glucose_squared'] = X['Glucose'] ** 2
-X['Age_squared'] = X['Age'] ** 2
-X['BMI_cubed'] = X['BMI'] ** 3
-
-# Ratios métaboliques
-X['Glucose_Insulin_ratio'] = X['Glucose'] / (X['Insulin'] + 1)
-X['BMI_BP_ratio'] = X['BMI'] / (X['BloodPressure'] + 1)
-X['Age_Pregnancies_ratio'] = X['Age'] / (X['Pregnancies'] + 1)
-X['Glucose_DiabetesPedigree'] = X['Glucose'] * X['DiabetesPedigreeFunction']
-
-# Transformations logarithmiques (stabiliser les distributions)
-X['log_Insulin'] = np.log1p(X['Insulin'])
-X['log_BMI'] = np.log1p(X['BMI'])
-X['log_Glucose'] = np.log1p(X['Glucose'])
-
-# Bins médicaux
-X['Age_group'] = pd.cut(X['Age'], bins=[0, 30, 50, 100], labels=[0, 1, 2]).astype(int)
-X['BMI_category'] = pd.cut(X['BMI'], bins=[0, 18.5, 25, 30, 100], labels=[0, 1, 2, 3]).astype(int)
-X['Glucose_level'] = pd.cut(X['Glucose'], bins=[0, 100, 125, 200], labels=[0, 1, 2]).astype(int)
-X['BP_category'] = pd.cut(X['BloodPressure'], bins=[0, 80, 90, 200], labels=[0, 1, 2]).astype(int)
-
-# Score de risque composite
-X['risk_score'] = (X['Glucose']/200 + X['BMI']/40 + X['Age']/100 + 
-                   X['DiabetesPedigreeFunction']*2) / 4
+def engineer_features(X):
+    """
+    Ajoute les features dérivées (interactions, polynômes, ratios, logs, bins, score de risque)
+    """
+    # Interactions médicalement pertinentes
+    X['BMI_Age'] = X['BMI'] * X['Age']
+    X['Glucose_BMI'] = X['Glucose'] * X['BMI']
+    X['Glucose_Age'] = X['Glucose'] * X['Age']
+    X['Insulin_Glucose'] = X['Insulin'] * X['Glucose']
+    X['Pregnancies_Age'] = X['Pregnancies'] * X['Age']
+    X['DiabetesPedigree_Age'] = X['DiabetesPedigreeFunction'] * X['Age']
+
+    # Features polynomiales
+    X['BMI_squared'] = X['BMI'] ** 2
+    X['Glucose_squared'] = X['Glucose'] ** 2
+    X['Age_squared'] = X['Age'] ** 2
+    X['BMI_cubed'] = X['BMI'] ** 3
+
+    # Ratios métaboliques
+    X['Glucose_Insulin_ratio'] = X['Glucose'] / (X['Insulin'] + 1)
+    X['BMI_BP_ratio'] = X['BMI'] / (X['BloodPressure'] + 1)
+    X['Age_Pregnancies_ratio'] = X['Age'] / (X['Pregnancies'] + 1)
+    X['Glucose_DiabetesPedigree'] = X['Glucose'] * X['DiabetesPedigreeFunction']
+
+    # Transformations logarithmiques (stabiliser les distributions)
+    X['log_Insulin'] = np.log1p(X['Insulin'])
+    X['log_BMI'] = np.log1p(X['BMI'])
+    X['log_Glucose'] = np.log1p(X['Glucose'])
+
+    # Bins médicaux
+    X['Age_group'] = pd.cut(X['Age'], bins=[0, 30, 50, 100], labels=[0, 1, 2]).astype(int)
+    X['BMI_category'] = pd.cut(X['BMI'], bins=[0, 18.5, 25, 30, 100], labels=[0, 1, 2, 3]).astype(int)
+    X['Glucose_level'] = pd.cut(X['Glucose'], bins=[0, 100, 125, 200], labels=[0, 1, 2]).astype(int)
+    X['BP_category'] = pd.cut(X['BloodPressure'], bins=[0, 80, 90, 200], labels=[0, 1, 2]).astype(int)
+
+    # Score de risque composite
+    X['risk_score'] = (X['Glucose']/200 + X['BMI']/40 + X['Age']/100 + 
+                       X['DiabetesPedigreeFunction']*2) / 4
+    return X
+
+features_key = stage_cache.key('features', data_key, code=engineer_features)
+X = stage_cache.run('features', features_key, lambda: engineer_features(data.drop("Outcome", axis=1)), frame=True)
 
 print(f"Features après engineering: {X.shape[1]}")
 
 # ========== 3. NORMALISATION MULTI-MÉTHODE ==========
 print("\n⚙️ Normalisation des features...")
 
-# PowerTransformer pour rendre les distributions plus gaussiennes
-power_transformer = PowerTransformer(method='yeo-johnson', standardize=True)
-X_power = power_transformer.fit_transform(X)
-
-# RobustScaler (résistant aux outliers)
-robust_scaler = RobustScaler()
-X_robust = robust_scaler.fit_transform(X)
+def fit_scalers(X):
+    """
+    Ajuste les deux normalisations et retourne (power_transformer, robust_scaler, X_scaled)
+    """
+    # PowerTransformer pour rendre les distributions plus gaussiennes
+    power_transformer = PowerTransformer(method='yeo-johnson', standardize=True)
+    X_power = power_transformer.fit_transform(X)
+    
+    # RobustScaler (résistant aux outliers)
+    robust_scaler = RobustScaler()
+    X_robust = robust_scaler.fit_transform(X)
+    
+    # Combinaison : moyenne des deux normalisations
+    X_scaled = (X_power + X_robust) / 2
+    X_scaled = pd.DataFrame(X_scaled, columns=X.columns)
+    return power_transformer, robust_scaler, X_scaled
 
-# Combinaison : moyenne des deux normalisations
-X_scaled = (X_power + X_robust) / 2
-X_scaled = pd.DataFrame(X_scaled, columns=X.columns)
+scalers_key = stage_cache.key('scalers', features_key, code=fit_scalers)
+power_transformer, robust_scaler, X_scaled = stage_cache.run('scalers', scalers_key, lambda: fit_scalers(X))
 
 # ========== 4. SPLIT STRATIFIÉ ==========
+SPLIT_PARAMS = {'test_size': 0.20, 'random_state': 42}
 X_train, X_test, y_train, y_test = train_test_split(
-    X_scaled, y, test_size=0.20, stratify=y, random_state=42
+    X_scaled, y, stratify=y, **SPLIT_PARAMS
 )
 
 # ========== 5. SÉLECTION RÉCURSIVE DES FEATURES ==========
 print("\n🎯 Sélection récursive des meilleures features...")
 
-# RFECV : sélection par élimination récursive avec validation croisée
-xgb_selector = XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss')
-rfecv = RFECV(estimator=xgb_selector, step=1, cv=5, scoring='f1', n_jobs=-1)
-rfecv.fit(X_train, y_train)
-
-X_train_selected = rfecv.transform(X_train)
-X_test_selected = rfecv.transform(X_test)
-
-selected_features = X.columns[rfecv.support_].tolist()
-print(f"Features sélectionnées: {len(selected_features)} / {X.shape[1]}")
-print(f"Score optimal: {rfecv.cv_results_['mean_test_score'].max():.4f}")
+def fit_rfecv(X_train, y_train):
+    """
+    RFECV : sélection par élimination récursive avec validation croisée
+    
+    Returns:
+        (sélecteur ajusté, durée en secondes, nombre de fits XGBoost)
+    """
+    start = time.perf_counter()
+    xgb_selector = XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss')
+    rfecv = RFECV(estimator=xgb_selector, step=1, cv=5, scoring='f1', n_jobs=N_JOBS)
+    rfecv.fit(X_train, y_train)
+    # Par fold : un fit par taille de 1 à n features, plus le RFE final sur toutes les données
+    n_features = X_train.shape[1]
+    n_fits = 5 * n_features + (n_features - rfecv.n_features_ + 1)
+    return rfecv, time.perf_counter() - start, n_fits
+
+def fit_fast_selection(X_train, y_train):
+    """
+    Sélection rapide : classement des features par importance (gain) d'un seul fit, puis
+    confirmation par CV 5-fold des sous-ensembles de tête de tailles n, n*0.75, n*0.75², ..., 1
+    
+    Le sélecteur retourné est un RFE ajusté en une élimination sur la taille retenue, selon le
+    classement évalué par la CV : mêmes support_, n_features_, feature_names_in_ et transform
+    que le RFECV pour le prédicteur, avec cv_results_ pour les tailles évaluées.
+    
+    Returns:
+        (sélecteur ajusté, durée en secondes, nombre de fits XGBoost)
+    """
+    start = time.perf_counter()
+    n_features = X_train.shape[1]
+    estimator = XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss', n_jobs=N_JOBS)
+    ranking = np.argsort(-estimator.fit(X_train, y_train).feature_importances_, kind='stable')
+    
+    sizes = []
+    size = float(n_features)
+    while size >= 1:
+        if int(round(size)) not in sizes:
+            sizes.append(int(round(size)))
+        size *= FAST_SELECTION_SHRINK
+    if 1 not in sizes:
+        sizes.append(1)
+    
+    mean_scores = []
+    std_scores = []
+    for size in sizes:
+        scores = cross_val_score(estimator, X_train.iloc[:, ranking[:size]], y_train, cv=5, scoring='f1')
+        mean_scores.append(scores.mean())
+        std_scores.append(scores.std())
+    # Meilleur score moyen, la plus petite taille en cas d'égalité
+    best_size = min(zip(sizes, mean_scores), key=lambda item: (-item[1], item[0]))[0]
+    
+    # Élimination selon le classement déjà évalué (rangs distincts), pas selon les importances
+    # d'un nouveau fit : threads et égalités (importances nulles) pourraient changer les features gardées
+    rank_scores = np.empty(n_features)
+    rank_scores[ranking] = np.arange(n_features, 0, -1)
+    selector = RFE(estimator=XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss'),
+                   n_features_to_select=best_size, step=n_features,
+                   importance_getter=lambda estimator: rank_scores)
+    selector.fit(X_train, y_train)
+    # Getter par défaut rétabli : le sélecteur est picklé pour le prédicteur (lambda non picklable)
+    selector.set_params(importance_getter='auto')
+    if not np.array_equal(np.flatnonzero(selector.support_), np.sort(ranking[:best_size])):
+        raise RuntimeError("La sélection rapide ne correspond pas au sous-ensemble évalué par la CV")
+    order = np.argsort(sizes)
+    selector.cv_results_ = {
+        'n_features': np.array(sizes)[order],
+        'mean_test_score': np.array(mean_scores)[order],
+        'std_test_score': np.array(std_scores)[order],
+    }
+    return selector, time.perf_counter() - start, 1 + 5 * len(sizes) + (2 if best_size < n_features else 1)
+
+selection_methods = {'rfecv': fit_rfecv, 'fast': fit_fast_selection}
+# Paramètres lus hors de la fonction de sélection : ils font partie de la clé de cache de l'étape
+selection_params = {'rfecv': SPLIT_PARAMS, 'fast': {'shrink': FAST_SELECTION_SHRINK, **SPLIT_PARAMS}}
+selection_runs = {}
+for mode in (selection_methods if COMPARE_SELECTION else [FEATURE_SELECTION]):
+    fit_selection = selection_methods[mode]
+    mode_key = stage_cache.key(f'selection_{mode}', scalers_key, selection_params[mode], code=fit_selection)
+    selection_runs[mode] = (mode_key,) + stage_cache.run(f'selection_{mode}', mode_key,
+                                                         lambda: fit_selection(X_train, y_train))
+
+selection_key, feature_selector, selection_time, selection_fits = selection_runs[FEATURE_SELECTION]
+
+if COMPARE_SELECTION:
+    comparison = {}
+    for mode, (_, selector, elapsed, n_fits) in selection_runs.items():
+        features = X.columns[selector.support_].tolist()
+        scores = selector.cv_results_['mean_test_score']
+        comparison[mode] = {
+            'seconds': elapsed,
+            'xgboost_fits': int(n_fits),
+            'n_features': len(features),
+            'cv_f1': float(np.max(scores)),
+            'selected_features': features,
+        }
+        print(f"  {mode:<6} {elapsed:7.2f}s  {n_fits:4d} fits  {len(features):2d} features  F1 CV={np.max(scores):.4f}")
+    rfecv_set = set(comparison['rfecv']['selected_features'])
+    fast_set = set(comparison['fast']['selected_features'])
+    comparison['jaccard'] = len(rfecv_set & fast_set) / len(rfecv_set | fast_set)
+    comparison['speedup'] = comparison['rfecv']['seconds'] / comparison['fast']['seconds']
+    with open("feature_selection_comparison.json", 'w', encoding='utf-8') as f:
+        json.dump(comparison, f, indent=2)
+    print(f"  Accélération x{comparison['speedup']:.1f}, recouvrement (Jaccard) {comparison['jaccard']:.2f}"
+          f" -> feature_selection_comparison.json")
+
+X_train_selected = feature_selector.transform(X_train)
+X_test_selected = feature_selector.transform(X_test)
+
+selected_features = X.columns[feature_selector.support_].tolist()
+print(f"Features sélectionnées ({FEATURE_SELECTION}): {len(selected_features)} / {X.shape[1]}")
+print(f"Score optimal: {feature_selector.cv_results_['mean_test_score'].max():.4f}")
 
 # ========== 6. ÉQUILIBRAGE AVANCÉ ==========
 print("\n⚖️ Équilibrage intelligent des classes...")
@@ -121,26 +369,130 @@ methods = {
     'SMOTEENN': SMOTEENN(random_state=42)
 }
 
+def evaluate_resampling(name, method, X, y, n_threads):
+    """
+    Rééchantillonne avec une méthode puis score le résultat en CV 3-fold
+    
+    Returns:
+        Dictionnaire : données rééchantillonnées, F1 moyen, durées (s), erreur éventuelle
+    """
+    start = time.perf_counter()
+    try:
+        X_res, y_res = method.fit_resample(X, y)
+    except ValueError as e:
+        # ex: ADASYN ne génère aucun échantillon sur des classes presque équilibrées
+        return {'name': name, 'error': str(e), 'resample_time': time.perf_counter() - start, 'cv_time': 0.0}
+    resample_time = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    temp_model = XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss', n_jobs=n_threads)
+    score = cross_val_score(temp_model, X_res, y_res, cv=3, scoring='f1').mean()
+    return {'name': name, 'X': X_res, 'y': y_res, 'score': score, 'error': None,
+            'resample_time': resample_time, 'cv_time': time.perf_counter() - start}
+
+def compare_resampling():
+    """
+    Évalue les méthodes en parallèle dans le budget CPU (threads XGBoost répartis entre elles)
+    """
+    n_parallel = max(1, min(len(methods), N_JOBS))
+    threads_per_method = max(1, N_JOBS // n_parallel)
+    start = time.perf_counter()
+    candidates = Parallel(n_jobs=n_parallel)(
+        delayed(evaluate_resampling)(name, method, X_train_selected, y_train, threads_per_method)
+        for name, method in methods.items()
+    )
+    print(f"  {len(methods)} méthodes évaluées en {time.perf_counter() - start:.1f}s "
+          f"({n_parallel} en parallèle x {threads_per_method} threads)")
+    return candidates
+
+# Les résultats (avec les jeux rééchantillonnés) sont en cache pour cette sélection de features
+resampling_key = stage_cache.key('reequilibrage', selection_key,
+                                 {name: repr(method) for name, method in methods.items()},
+                                 code=evaluate_resampling)
+candidates = stage_cache.run('reequilibrage', resampling_key, compare_resampling)
+
+# Les jeux rééchantillonnés sont gardés : la méthode retenue n'est pas ré-appliquée
+resampled = {}
 best_method = None
 best_score = 0
 
-for name, method in methods.items():
-    X_temp, y_temp = method.fit_resample(X_train_selected, y_train)
-    temp_model = XGBClassifier(n_estimators=100, random_state=42, eval_metric='logloss')
-    score = cross_val_score(temp_model, X_temp, y_temp, cv=3, scoring='f1').mean()
-    print(f"  {name}: F1={score:.4f}")
-    if score > best_score:
-        best_score = score
+for result in candidates:
+    name = result['name']
+    timing = f"rééchantillonnage {result['resample_time']:.2f}s, CV {result['cv_time']:.2f}s"
+    if result['error']:
+        print(f"  {name}: ignorée ({result['error']}) [{timing}]")
+        continue
+    resampled[name] = (result['X'], result['y'])
+    print(f"  {name}: F1={result['score']:.4f} [{timing}]")
+    if result['score'] > best_score:
+        best_score = result['score']
         best_method = name
 
 print(f"\n✅ Meilleure méthode: {best_method} (F1={best_score:.4f})")
 
 # Appliquer la meilleure méthode
-X_train_balanced, y_train_balanced = methods[best_method].fit_resample(X_train_selected, y_train)
+X_train_balanced, y_train_balanced = resampled[best_method]
 print(f"Distribution après équilibrage: {np.bincount(y_train_balanced)}")
 
 # ========== 7. OPTIMISATION BAYÉSIENNE POUSSÉE ==========
-print("\n🔍 Optimisation bayésienne Optuna (80 trials)...")
+print(f"\n🔍 Optimisation bayésienne Optuna ({OPTUNA_TRIALS} trials)...")
+
+# Folds fixés une fois : chaque trial est évalué sur les mêmes découpages
+X_cv = np.asarray(X_train_balanced)
+y_cv = np.asarray(y_train_balanced)
+cv = StratifiedKFold(n_splits=7, shuffle=True, random_state=42)
+cv_splits = list(cv.split(X_cv, y_cv))
+
+optuna_workers = max(1, min(OPTUNA_WORKERS, N_JOBS))
+threads_per_trial = max(1, N_JOBS // optuna_workers)
+
+# Quantification des features faite une seule fois par fold, partagée par tous les trials
+# (au lieu de re-binner X_train_balanced à chaque fit de chaque trial)
+start = time.perf_counter()
+fold_matrices = []
+for train_idx, valid_idx in cv_splits:
+    dtrain = xgb.QuantileDMatrix(X_cv[train_idx], y_cv[train_idx], max_bin=MAX_BIN, nthread=N_JOBS)
+    dvalid = xgb.QuantileDMatrix(X_cv[valid_idx], y_cv[valid_idx], ref=dtrain, nthread=N_JOBS)
+    fold_matrices.append((dtrain, dvalid, y_cv[valid_idx]))
+print(f"   QuantileDMatrix de {len(fold_matrices)} folds construites en {time.perf_counter() - start:.2f}s")
+
+def native_params(params, n_threads):
+    """
+    Paramètres XGBClassifier -> paramètres de xgb.train (n_estimators devient num_boost_round)
+    """
+    native = {k: v for k, v in params.items() if k not in ('n_estimators', 'random_state', 'n_jobs')}
+    native.update({'seed': params.get('random_state', 0), 'nthread': n_threads, 'max_bin': MAX_BIN})
+    return native
+
+def cross_validate(params, n_threads, trial=None):
+    """
+    CV sur les folds pré-quantifiés, avec early stopping sur le fold de validation
+    
+    Args:
+        params: Paramètres XGBClassifier (n_estimators = nombre maximal de rounds)
+        n_threads: Threads XGBoost
+        trial: Trial Optuna (optionnel) : la moyenne des folds déjà faits est rapportée au pruner
+        
+    Returns:
+        (F1 de chaque fold, meilleure itération de chaque fold)
+    """
+    booster_params = native_params(params, n_threads)
+    scores = []
+    best_iterations = []
+    for fold, (dtrain, dvalid, y_valid) in enumerate(fold_matrices):
+        # n_estimators est le maximum de rounds : l'early stopping sur le fold de validation s'arrête avant
+        booster = xgb.train(booster_params, dtrain, num_boost_round=params['n_estimators'],
+                            evals=[(dvalid, 'valid')], early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                            verbose_eval=False)
+        proba = booster.predict(dvalid, iteration_range=(0, booster.best_iteration + 1))
+        scores.append(float(f1_score(y_valid, (proba > 0.5).astype(int))))
+        best_iterations.append(int(booster.best_iteration))
+        if trial is not None:
+            # Moyenne des folds déjà faits : le pruner arrête les trials sans espoir
+            trial.report(np.mean(scores), fold)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+    return scores, best_iterations
 
 def objective(trial):
     params = {
@@ -163,23 +515,65 @@ def objective(trial):
         'grow_policy': trial.suggest_categorical('grow_policy', ['depthwise', 'lossguide']),
         'random_state': 42
     }
-    
-    model = XGBClassifier(**params)
-    cv = StratifiedKFold(n_splits=7, shuffle=True, random_state=42)
-    scores = cross_val_score(model, X_train_balanced, y_train_balanced, 
-                             cv=cv, scoring='f1', n_jobs=-1)
-    return scores.mean()
+    scores, best_iterations = cross_validate(params, threads_per_trial, trial)
+    # Gardés avec le trial (et dans le stockage) : le modèle final et le rapport de CV les réutilisent
+    trial.set_user_attr('fold_scores', scores)
+    trial.set_user_attr('best_iterations', best_iterations)
+    return np.mean(scores)
+
+pruners = {
+    'median': MedianPruner(n_startup_trials=10, n_warmup_steps=2),
+    'hyperband': HyperbandPruner(min_resource=1, max_resource=len(cv_splits)),
+    'none': NopPruner(),
+}
+
+# Une étude par jeu d'entraînement et par protocole d'évaluation : des données ou des folds
+# modifiés ne reprennent pas les trials d'une autre étude
+cv_protocol = f"folds={len(cv_splits)};max_bin={MAX_BIN};early_stopping={EARLY_STOPPING_ROUNDS}"
+data_hash = hashlib.sha256(X_cv.tobytes() + y_cv.tobytes() + cv_protocol.encode()).hexdigest()[:12]
+study_name = os.environ.get('LIVEDOC_TRAIN_STUDY', f"xgb_diabetes_{data_hash}")
+
+storage = None
+if OPTUNA_STORAGE != 'memory':
+    # Le heartbeat marque en échec les trials restés RUNNING après un arrêt brutal
+    storage = optuna.storages.RDBStorage(OPTUNA_STORAGE, heartbeat_interval=60, grace_period=120,
+                                         engine_kwargs={'connect_args': {'timeout': 60}})
 
 study = optuna.create_study(
+    study_name=study_name,
+    storage=storage,
+    load_if_exists=True,
     direction='maximize',
-    sampler=TPESampler(seed=42, n_startup_trials=20)
+    sampler=TPESampler(seed=42, n_startup_trials=20, constant_liar=optuna_workers > 1),
+    pruner=pruners[OPTUNA_PRUNER]
 )
-study.optimize(objective, n_trials=80, show_progress_bar=True)
+
+finished_states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+n_finished = len(study.get_trials(deepcopy=False, states=finished_states))
+remaining_trials = max(0, OPTUNA_TRIALS - n_finished)
+if n_finished:
+    print(f"↻ Reprise de l'étude {study_name} : {n_finished} trials déjà terminés, {remaining_trials} restants")
+
+start = time.perf_counter()
+study.optimize(objective, n_trials=remaining_trials, timeout=OPTUNA_TIMEOUT,
+               n_jobs=optuna_workers, show_progress_bar=True)
+n_pruned = len(study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.PRUNED,)))
+print(f"   {len(study.trials)} trials ({n_pruned} élagués) en {time.perf_counter() - start:.1f}s "
+      f"({optuna_workers} workers x {threads_per_trial} threads, pruner {OPTUNA_PRUNER})")
+
+n_complete = len(study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.COMPLETE,)))
+if not n_complete:
+    raise RuntimeError(
+        f"Aucun trial Optuna terminé pour l'étude {study_name} (LIVEDOC_TRAIN_TIMEOUT trop court, "
+        f"LIVEDOC_TRAIN_TRIALS nul ou trials tous élagués) : augmenter le budget et relancer, "
+        f"l'étude est reprise depuis {OPTUNA_STORAGE}."
+    )
 
 print(f"\n✅ Meilleur F1-score (CV): {study.best_value:.4f}")
 
 # ========== 8. MODÈLE FINAL AVEC EARLY STOPPING ==========
 print("\n🚀 Entraînement du modèle final...")
+best_trial = study.best_trial
 best_params = study.best_params
 
 # Retirer early_stopping_rounds des paramètres du modèle
@@ -192,12 +586,20 @@ best_params_clean.update({
     'random_state': 42
 })
 
-final_model = XGBClassifier(**best_params_clean)
-final_model.fit(
-    X_train_balanced, y_train_balanced,
-    eval_set=[(X_test_selected, y_test)],
-    verbose=False
-)
+# Scores par fold et itérations retenues par l'early stopping du meilleur trial
+# (recalculés seulement pour une étude reprise sans ces attributs)
+trial_fold_scores = best_trial.user_attrs.get('fold_scores')
+best_iterations = best_trial.user_attrs.get('best_iterations')
+if trial_fold_scores is None or best_iterations is None:
+    trial_fold_scores, best_iterations = cross_validate(best_params_clean, N_JOBS)
+
+# Nombre de rounds choisi par l'early stopping des folds (n_estimators n'était que le maximum)
+best_params_clean['n_estimators'] = int(np.ceil(np.mean(best_iterations))) + 1
+print(f"   Rounds: {best_params_clean['n_estimators']} (early stopping des folds: {best_iterations})")
+
+# Le jeu de test reste hors de l'entraînement : pas d'eval_set, les rounds viennent de la CV
+final_model = XGBClassifier(**best_params_clean, n_jobs=N_JOBS)
+final_model.fit(X_train_balanced, y_train_balanced, verbose=False)
 
 # ========== 9. CALIBRATION EXHAUSTIVE DU SEUIL ==========
 print("\n🎯 Calibration du seuil optimal...")
@@ -238,224 +640,77 @@ print(f"   Sensibilité (TP rate): {tp/(tp+fn):.4f}")
 print(f"   NPV (Negative Predictive Value): {tn/(tn+fn):.4f}")
 print(f"   PPV (Positive Predictive Value): {tp/(tp+fp):.4f}")
 
-# ========== 11. VISUALISATIONS COMPLÈTES ==========
-print("\n📊 Génération des visualisations...")
-
-fig = plt.figure(figsize=(20, 16))
-
-# 1. MATRICE DE CONFUSION - Style médical
-ax1 = plt.subplot(3, 3, 1)
-sns.heatmap(cm, annot=True, fmt='d', cmap='Blues', cbar=False, 
-            square=True, linewidths=2, linecolor='black',
-            annot_kws={'size': 16, 'weight': 'bold'})
-plt.title('Matrice de Confusion', fontsize=14, fontweight='bold', pad=15)
-plt.ylabel('Vraie Classe', fontsize=12, fontweight='bold')
-plt.xlabel('Classe Prédite', fontsize=12, fontweight='bold')
-plt.xticks([0.5, 1.5], ['Pas Diabète (0)', 'Diabète (1)'], rotation=0)
-plt.yticks([0.5, 1.5], ['Pas Diabète (0)', 'Diabète (1)'], rotation=0)
-
-# Annotations détaillées
-for i in range(2):
-    for j in range(2):
-        value = cm[i, j]
-        total = cm.sum()
-        percentage = (value / total) * 100
-        if i == 0 and j == 0:
-            label = f'TN\n{value}\n({percentage:.1f}%)'
-        elif i == 0 and j == 1:
-            label = f'FP\n{value}\n({percentage:.1f}%)'
-        elif i == 1 and j == 0:
-            label = f'FN\n{value}\n({percentage:.1f}%)'
-        else:
-            label = f'TP\n{value}\n({percentage:.1f}%)'
-        ax1.text(j+0.5, i+0.7, label, ha='center', va='center', 
-                fontsize=11, color='darkred' if i != j else 'darkgreen')
-
-# 2. MATRICE DE CONFUSION NORMALISÉE
-ax2 = plt.subplot(3, 3, 2)
-cm_normalized = cm.astype('float') / cm.sum(axis=1)[:, np.newaxis]
-sns.heatmap(cm_normalized, annot=True, fmt='.2%', cmap='RdYlGn', 
-            cbar_kws={'label': 'Pourcentage'}, square=True,
-            linewidths=2, linecolor='black')
-plt.title('Matrice de Confusion Normalisée', fontsize=14, fontweight='bold', pad=15)
-plt.ylabel('Vraie Classe', fontsize=12)
-plt.xlabel('Classe Prédite', fontsize=12)
-plt.xticks([0.5, 1.5], ['Pas Diabète', 'Diabète'], rotation=0)
-plt.yticks([0.5, 1.5], ['Pas Diabète', 'Diabète'], rotation=0)
-
-# 3. COURBE ROC
-ax3 = plt.subplot(3, 3, 3)
+# ========== 11. ÉVALUATION POUR LE RAPPORT ==========
+print(f"\n📊 Sauvegarde de l'évaluation: {EVALUATION_PREFIX}.json / .npz")
+
 fpr, tpr, _ = roc_curve(y_test, y_proba)
-roc_auc = auc(fpr, tpr)
-plt.plot(fpr, tpr, color='darkorange', lw=3, 
-         label=f'ROC (AUC = {roc_auc:.4f})')
-plt.plot([0, 1], [0, 1], color='navy', lw=2, linestyle='--', label='Hasard')
-plt.xlim([0.0, 1.0])
-plt.ylim([0.0, 1.05])
-plt.xlabel('Taux de Faux Positifs (1 - Spécificité)', fontsize=11, fontweight='bold')
-plt.ylabel('Taux de Vrais Positifs (Sensibilité)', fontsize=11, fontweight='bold')
-plt.title('Courbe ROC', fontsize=14, fontweight='bold', pad=15)
-plt.legend(loc="lower right", fontsize=10)
-plt.grid(alpha=0.3)
-
-# 4. COURBE PRECISION-RECALL
-ax4 = plt.subplot(3, 3, 4)
 precision, recall, _ = precision_recall_curve(y_test, y_proba)
-pr_auc = auc(recall, precision)
-plt.plot(recall, precision, color='green', lw=3,
-         label=f'PR (AUC = {pr_auc:.4f})')
-plt.scatter(recalls[best_idx], precisions[best_idx], color='red', s=200, 
-           zorder=5, label=f'Seuil optimal ({best_threshold:.3f})')
-plt.xlabel('Recall (Sensibilité)', fontsize=11, fontweight='bold')
-plt.ylabel('Precision', fontsize=11, fontweight='bold')
-plt.title('Courbe Precision-Recall', fontsize=14, fontweight='bold', pad=15)
-plt.legend(loc="best", fontsize=10)
-plt.grid(alpha=0.3)
-
-# 5. ÉVOLUTION DES MÉTRIQUES SELON LE SEUIL
-ax5 = plt.subplot(3, 3, 5)
-plt.plot(thresholds, f1_scores, 'b-', lw=2, label='F1-Score')
-plt.plot(thresholds, recalls, 'g-', lw=2, label='Recall')
-plt.plot(thresholds, precisions, 'r-', lw=2, label='Precision')
-plt.axvline(best_threshold, color='black', linestyle='--', lw=2, 
-           label=f'Seuil optimal ({best_threshold:.3f})')
-plt.xlabel('Seuil de Décision', fontsize=11, fontweight='bold')
-plt.ylabel('Score', fontsize=11, fontweight='bold')
-plt.title('Impact du Seuil sur les Métriques', fontsize=14, fontweight='bold', pad=15)
-plt.legend(loc="best", fontsize=10)
-plt.grid(alpha=0.3)
-
-# 6. IMPORTANCE DES FEATURES (Top 15)
-ax6 = plt.subplot(3, 3, 6)
-if hasattr(final_model, 'feature_importances_'):
-    feature_names = [selected_features[i] if i < len(selected_features) 
-                    else f"Feature_{i}" for i in range(len(final_model.feature_importances_))]
-    importance_df = pd.DataFrame({
-        'feature': feature_names,
-        'importance': final_model.feature_importances_
-    }).sort_values('importance', ascending=False).head(15)
-    
-    colors = plt.cm.viridis(np.linspace(0, 1, len(importance_df)))
-    plt.barh(range(len(importance_df)), importance_df['importance'], color=colors)
-    plt.yticks(range(len(importance_df)), importance_df['feature'])
-    plt.xlabel('Importance', fontsize=11, fontweight='bold')
-    plt.title('Top 15 Features Importantes', fontsize=14, fontweight='bold', pad=15)
-    plt.gca().invert_yaxis()
-    plt.grid(axis='x', alpha=0.3)
-
-# 7. DISTRIBUTION DES PROBABILITÉS
-ax7 = plt.subplot(3, 3, 7)
-plt.hist(y_proba[y_test == 0], bins=50, alpha=0.6, label='Pas Diabète', 
-         color='blue', edgecolor='black')
-plt.hist(y_proba[y_test == 1], bins=50, alpha=0.6, label='Diabète', 
-         color='red', edgecolor='black')
-plt.axvline(best_threshold, color='green', linestyle='--', lw=3, 
-           label=f'Seuil ({best_threshold:.3f})')
-plt.xlabel('Probabilité Prédite', fontsize=11, fontweight='bold')
-plt.ylabel('Fréquence', fontsize=11, fontweight='bold')
-plt.title('Distribution des Probabilités', fontsize=14, fontweight='bold', pad=15)
-plt.legend(fontsize=10)
-plt.grid(alpha=0.3)
-
-# 8. MÉTRIQUES PAR CLASSE
-ax8 = plt.subplot(3, 3, 8)
-metrics_data = {
-    'Classe 0': [cm_normalized[0, 0], precisions[best_idx] if y_pred_final[y_test==0].sum()>0 else 0, 
-                 tn/(tn+fp)],
-    'Classe 1': [cm_normalized[1, 1], precisions[best_idx], recalls[best_idx]]
+
+evaluation = {
+    'threshold': float(best_threshold),
+    'best_index': int(best_idx),
+    'confusion_matrix': cm.tolist(),
+    'metrics': {
+        'roc_auc': float(auc(fpr, tpr)),
+        'pr_auc': float(auc(recall, precision)),
+        'accuracy': float((tn+tp)/(tn+fp+fn+tp)),
+        'sensitivity': float(tp/(tp+fn)),
+        'specificity': float(tn/(tn+fp)),
+        'ppv': float(tp/(tp+fp)) if tp+fp else 0.0,
+        'npv': float(tn/(tn+fn)) if tn+fn else 0.0,
+        'f1_at_threshold': float(f1_scores[best_idx])
+    },
+    'selected_features': list(selected_features)
 }
-x = np.arange(3)
-width = 0.35
-labels = ['Recall', 'Precision', 'Spécificité/Sensibilité']
-
-bars1 = plt.bar(x - width/2, metrics_data['Classe 0'], width, 
-               label='Pas Diabète', color='skyblue', edgecolor='black')
-bars2 = plt.bar(x + width/2, metrics_data['Classe 1'], width, 
-               label='Diabète', color='salmon', edgecolor='black')
-
-plt.ylabel('Score', fontsize=11, fontweight='bold')
-plt.title('Comparaison des Métriques par Classe', fontsize=14, fontweight='bold', pad=15)
-plt.xticks(x, labels, rotation=15, ha='right')
-plt.legend(fontsize=10)
-plt.ylim([0, 1])
-plt.grid(axis='y', alpha=0.3)
-
-# Annotations des valeurs
-for bars in [bars1, bars2]:
-    for bar in bars:
-        height = bar.get_height()
-        plt.text(bar.get_x() + bar.get_width()/2., height,
-                f'{height:.2f}', ha='center', va='bottom', fontsize=9)
-
-# 9. RÉSUMÉ TEXTUEL
-ax9 = plt.subplot(3, 3, 9)
-ax9.axis('off')
-
-summary_text = f"""
-╔═══════════════════════════════════════╗
-║     RÉSUMÉ DES PERFORMANCES           ║
-╚═══════════════════════════════════════╝
-
-🎯 MATRICE DE CONFUSION
-   TN (Vrais Négatifs):    {tn:3d}
-   FP (Faux Positifs):     {fp:3d}
-   FN (Faux Négatifs):     {fn:3d}
-   TP (Vrais Positifs):    {tp:3d}
-
-📊 MÉTRIQUES GLOBALES
-   Accuracy:               {(tn+tp)/(tn+fp+fn+tp):.1%}
-   ROC-AUC:                {roc_auc_score(y_test, y_proba):.4f}
-   PR-AUC:                 {pr_auc:.4f}
-
-⚕️  MÉTRIQUES MÉDICALES
-   Sensibilité (Recall):   {tp/(tp+fn):.1%}
-   Spécificité:            {tn/(tn+fp):.1%}
-   PPV (Precision):        {tp/(tp+fp):.1%}
-   NPV:                    {tn/(tn+fn):.1%}
-
-🎚️  SEUIL DE DÉCISION
-   Seuil optimal:          {best_threshold:.4f}
-   F1-Score au seuil:      {f1_scores[best_idx]:.4f}
-
-⚠️  ANALYSE DES ERREURS
-   Taux FP:                {fp/(tn+fp):.1%}
-   Taux FN:                {fn/(tp+fn):.1%}
-"""
-
-ax9.text(0.1, 0.95, summary_text, transform=ax9.transAxes,
-        fontsize=10, verticalalignment='top', fontfamily='monospace',
-        bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.3))
-
-plt.tight_layout(pad=3.0)
-plt.savefig('diabetes_analysis_complete.png', dpi=300, bbox_inches='tight')
-print("✅ Graphiques sauvegardés: diabetes_analysis_complete.png")
-
-# ========== 12. VALIDATION CROISÉE FINALE ==========
-print("\n✨ Validation croisée finale (10-fold)...")
-
-# Créer un nouveau modèle sans early_stopping pour la cross-validation
-cv_model = XGBClassifier(**best_params_clean)
-
-cv_final = StratifiedKFold(n_splits=10, shuffle=True, random_state=42)
-cv_scores = cross_val_score(cv_model, X_train_balanced, y_train_balanced,
-                            cv=cv_final, scoring='f1', n_jobs=-1)
-print(f"F1-Score moyen: {cv_scores.mean():.4f} (+/- {cv_scores.std()*2:.4f})")
+with open(EVALUATION_PREFIX + ".json", "w", encoding="utf-8") as f:
+    json.dump(evaluation, f, indent=2, ensure_ascii=False)
+
+np.savez_compressed(
+    EVALUATION_PREFIX + ".npz",
+    y_test=np.asarray(y_test, dtype=np.int8), y_proba=y_proba.astype(np.float32),
+    roc_fpr=fpr, roc_tpr=tpr, pr_precision=precision, pr_recall=recall,
+    sweep_thresholds=thresholds, sweep_f1=np.array(f1_scores),
+    sweep_recall=np.array(recalls), sweep_precision=np.array(precisions),
+    feature_importances=getattr(final_model, 'feature_importances_', np.array([]))
+)
+
+# ========== 12. SCORES DES FOLDS DU MEILLEUR TRIAL ==========
+print(f"\n✨ Scores des folds du meilleur trial ({len(trial_fold_scores)}-fold, trial {best_trial.number})...")
+
+# Scores des folds du meilleur trial, sans ré-entraînement. Chaque fold est mesuré à l'itération
+# choisie par l'early stopping sur ce même fold, et le trial est le meilleur de l'étude : estimation
+# optimiste, pas une CV indépendante (l'évaluation non biaisée est celle du jeu de test)
+fold_scores = np.array(trial_fold_scores)
+print(f"F1 par fold (early stopping sur le fold): {np.round(fold_scores, 4).tolist()}")
+print(f"F1-Score moyen du trial (optimiste): {fold_scores.mean():.4f} (+/- {fold_scores.std()*2:.4f})")
 
 # ========== 13. SAUVEGARDE ==========
-print("\n💾 Sauvegarde des modèles et visualisations...")
+print("\n💾 Sauvegarde des modèles...")
 joblib.dump(final_model, "xgb_diabetes_ultimate.pkl")
 joblib.dump(power_transformer, "power_transformer.pkl")
 joblib.dump(robust_scaler, "robust_scaler.pkl")
-joblib.dump(rfecv, "feature_selector_rfecv.pkl")
+joblib.dump(feature_selector, "feature_selector_rfecv.pkl")
 joblib.dump({
     'threshold': best_threshold,
     'best_params': best_params_clean,
     'selected_features': selected_features,
-    'best_sampling_method': best_method
+    'feature_selection': FEATURE_SELECTION,
+    'best_sampling_method': best_method,
+    'trial_fold_scores': trial_fold_scores,
+    'best_iterations': best_iterations
 }, "model_config_ultimate.pkl")
 
 study.trials_dataframe().to_csv("optuna_trials_ultimate.csv", index=False)
 
+# Rendu du rapport dans un processus séparé : un échec du tracé n'invalide pas l'entraînement
+render_command = [sys.executable, RENDER_SCRIPT, '--input', EVALUATION_PREFIX, '--dpi', str(REPORT_DPI)]
+if RENDER_REPORT:
+    print(f"\n🖼️  Rendu du rapport graphique ({REPORT_DPI} dpi)...")
+    if subprocess.run(render_command).returncode != 0:
+        print("⚠️  Rendu du rapport en échec, l'évaluation reste disponible")
+else:
+    print(f"\n🖼️  Rapport graphique: {' '.join(render_command[1:])}")
+
 print("\n🎉 OPTIMISATION TERMINÉE AVEC SUCCÈS!")
 print(f"\n📈 Amélioration attendue:")
 print(f"   • F1-Score classe 0: 0.82-0.88")
@@ -6,72 +6,357 @@ Script pour charger le modèle XGBoost de maladie rénale et faire des prédicti
 import os
 import sys
 import numpy as np
-import pandas as pd
-import joblib
 import warnings
 import glob
 warnings.filterwarnings('ignore')
 
 # Configurer OpenMP pour XGBoost sur macOS AVANT d'importer xgboost
-libomp_paths = [
-    '/opt/homebrew/opt/libomp/lib/libomp.dylib',
-    '/usr/local/opt/libomp/lib/libomp.dylib',
-    '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
-    '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
-]
+# (le scan glob n'est fait que sur macOS, les chemins n'existent pas ailleurs)
+if sys.platform == 'darwin':
+    libomp_paths = [
+        '/opt/homebrew/opt/libomp/lib/libomp.dylib',
+        '/usr/local/opt/libomp/lib/libomp.dylib',
+        '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
+        '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
+    ]
 
-for pattern in libomp_paths:
-    matches = glob.glob(pattern)
-    if matches:
-        libomp_dir = os.path.dirname(matches[0])
-        if 'DYLD_LIBRARY_PATH' in os.environ:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
-        else:
-            os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
-        break
+    for pattern in libomp_paths:
+        matches = glob.glob(pattern)
+        if matches:
+            libomp_dir = os.path.dirname(matches[0])
+            if 'DYLD_LIBRARY_PATH' in os.environ:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + ':' + os.environ['DYLD_LIBRARY_PATH']
+            else:
+                os.environ['DYLD_LIBRARY_PATH'] = libomp_dir
+            break
 
 # Définir OMP_NUM_THREADS pour éviter les problèmes
 os.environ['OMP_NUM_THREADS'] = '1'
 
-class KidneyDiseasePredictor:
+# Code commun aux prédicteurs XGBoost (public/models/xgb_predictor_base.py)
+_MODELS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _MODELS_DIR not in sys.path:
+    sys.path.append(_MODELS_DIR)
+from xgb_predictor_base import XGBPredictorBase, is_dataframe
+
+class KidneyDiseasePredictor(XGBPredictorBase):
     """
     Classe pour charger et utiliser le modèle de prédiction de maladie rénale
     """
     
-    def __init__(self, model_dir):
+    # Ordre des colonnes du dataset : id,age,bp,sg,al,su,rbc,pc,pcc,ba,bgr,bu,sc,sod,pot,hemo,pcv,wc,rc,htn,dm,cad,appet,pe,ane
+    REQUIRED_COLS = ['age', 'bp', 'sg', 'al', 'su', 'rbc', 'pc', 'pcc', 'ba', 'bgr', 
+                     'bu', 'sc', 'sod', 'pot', 'hemo', 'pcv', 'wc', 'rc', 'htn', 'dm', 
+                     'cad', 'appet', 'pe', 'ane']
+    
+    # Valeurs par défaut des colonnes catégorielles (les colonnes numériques valent 0 par défaut)
+    CATEGORICAL_DEFAULTS = {
+        'rbc': 'normal', 'pc': 'normal',
+        'pcc': 'notpresent', 'ba': 'notpresent',
+        'htn': 'no', 'dm': 'no', 'cad': 'no', 'pe': 'no', 'ane': 'no',
+        'appet': 'good',
+    }
+    
+    # Mapping des noms de colonnes courts vers les noms longs attendus par le modèle
+    COLUMN_MAPPING = {
+        'al': 'albumin',
+        'ane': 'anemia',
+        'appet': 'appetite',
+        'ba': 'bacteria',
+    }
+    
+    # Colonnes catégorielles à encoder (essayer d'abord les noms longs, puis les noms courts)
+    CATEGORICAL_MAPPING = {
+        'bacteria': ['bacteria', 'ba'],
+        'anemia': ['anemia', 'ane'],
+        'appetite': ['appetite', 'appet'],
+        'albumin': ['albumin', 'al'],
+    }
+    
+    # Colonnes catégorielles standard (sans renommage)
+    STANDARD_CATEGORICAL_COLS = ['rbc', 'pc', 'pcc', 'htn', 'dm', 'cad', 'pe']
+    
+    # Valeurs par défaut des colonnes attendues par le transformer mais absentes des données
+    MISSING_COL_DEFAULTS = {
+        'rbc': 'normal', 'pc': 'normal',
+        'pcc': 'notpresent', 'bacteria': 'notpresent',
+        'htn': 'no', 'dm': 'no', 'cad': 'no', 'pe': 'no', 'anemia': 'no',
+        'appetite': 'good',
+    }
+    
+    # Artefacts dont le bundle est dérivé (leur empreinte est vérifiée au chargement du bundle)
+    BUNDLE_SOURCES = ['xgb_kidney_optimized.pkl', 'xgb_kidney_optimized.ubj', 'power_transformer_kidney.pkl',
+                      'robust_scaler_kidney.pkl', 'feature_selector_kidney.pkl', 'label_encoders_kidney.pkl',
+                      'model_config_kidney.pkl']
+    
+    def __init__(self, model_dir, n_threads=None, use_bundle=True):
         """
         Initialise le prédicteur
         
         Args:
             model_dir: Dossier contenant les fichiers du modèle
+            n_threads: Nombre de threads XGBoost (défaut: variable LIVEDOC_XGB_NTHREAD, sinon 1)
+            use_bundle: Si False, ignore le bundle et charge les artefacts séparés
         """
         self.model_dir = model_dir
         
-        # Charger le modèle
-        model_path = os.path.join(model_dir, "xgb_kidney_optimized.pkl")
-        self.model = joblib.load(model_path)
+        # Durée de chargement de chaque artefact en ms (rapport --startup-profile des scripts)
+        self.load_timings = {}
+        
+        # Bundle mmap unique (scripts/build_model_bundles.py) s'il est présent et à jour,
+        # sinon artefacts séparés
+        if not (use_bundle and self._load_bundle(os.path.join(model_dir, self.BUNDLE_NAME), n_threads)):
+            self._load_artifacts(n_threads)
+        
+        # Messages de debug vers stderr
+        print(f"✅ Modèle maladie rénale chargé depuis {model_dir}", file=sys.stderr)
+        print(f"   Threshold : {self.threshold}", file=sys.stderr)
+        if self.model_version is not None:
+            print(f"   Bundle : {self.BUNDLE_NAME} (version {self.model_version})", file=sys.stderr)
+    
+    def _load_artifacts(self, n_threads=None):
+        """
+        Charge le modèle, les scalers, le feature selector et la config depuis les fichiers séparés
+        """
+        model_dir = self.model_dir
+        self.model_version = None
+        
+        # Charger le modèle (format natif UBJSON si disponible, sinon pickle joblib)
+        self.model = self._load_xgb_model(os.path.join(model_dir, "xgb_kidney_optimized.pkl"))
+        
+        # Booster natif pour l'inférence
+        self._init_booster(n_threads)
         
         # Charger les scalers
-        self.power_transformer = joblib.load(os.path.join(model_dir, "power_transformer_kidney.pkl"))
-        self.robust_scaler = joblib.load(os.path.join(model_dir, "robust_scaler_kidney.pkl"))
+        self.power_transformer = self._load_artifact("power_transformer_kidney.pkl")
+        self.robust_scaler = self._load_artifact("robust_scaler_kidney.pkl")
         
         # Charger le feature selector
-        self.feature_selector = joblib.load(os.path.join(model_dir, "feature_selector_kidney.pkl"))
+        self.feature_selector = self._load_artifact("feature_selector_kidney.pkl")
         
         # Charger les label encoders
-        self.label_encoders = joblib.load(os.path.join(model_dir, "label_encoders_kidney.pkl"))
+        self.label_encoders = self._load_artifact("label_encoders_kidney.pkl")
         
         # Charger la config
         config_path = os.path.join(model_dir, "model_config_kidney.pkl")
         if os.path.exists(config_path):
-            self.config = joblib.load(config_path)
+            self.config = self._load_artifact(os.path.basename(config_path))
             self.threshold = self.config.get('threshold', 0.5)
         else:
             self.threshold = 0.5
         
-        # Messages de debug vers stderr
-        print(f"✅ Modèle maladie rénale chargé depuis {model_dir}", file=sys.stderr)
-        print(f"   Threshold : {self.threshold}", file=sys.stderr)
+        # Tables de correspondance valeur -> code compilées depuis les label encoders
+        self._label_tables = self._compile_label_tables()
+        
+        # Plan de preprocessing NumPy (encodage + scaling + feature selection) compilé une seule fois
+        # (l'ordre des colonnes n'est connu que si le transformer a feature_names_in_)
+        self._plan = None
+        self._input_specs = None
+        if hasattr(self.power_transformer, 'feature_names_in_'):
+            input_cols = list(self.power_transformer.feature_names_in_)
+            self._plan = self._compile_preprocessing_plan(input_cols)
+            self._input_specs = self._compile_input_specs(input_cols)
+    
+    def _bundle_extras(self):
+        """
+        Tables d'encodage et spécification des colonnes d'entrée (sans elles, pas de chemin NumPy)
+        """
+        if self._input_specs is None:
+            raise ValueError("Plan de preprocessing non compilé : impossible de créer le bundle")
+        return {
+            'label_tables': {key: {'classes': classes.tolist(), 'codes': codes.tolist(), 'unknown_code': unknown_code}
+                             for key, (classes, codes, unknown_code) in self._label_tables.items()},
+            'input_specs': [list(spec) for spec in self._input_specs],
+        }
+    
+    def _restore_bundle_extras(self, manifest):
+        self.label_encoders = None
+        self._label_tables = {key: (np.asarray(table['classes'], dtype=str),
+                                    np.asarray(table['codes'], dtype=np.float64),
+                                    float(table['unknown_code']))
+                              for key, table in manifest['label_tables'].items()}
+        self._input_specs = [tuple(spec) for spec in manifest['input_specs']]
+    
+    def _build_dataframe(self, records):
+        """
+        Construit le DataFrame d'entrée pour un ou plusieurs patients
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            DataFrame avec exactement les colonnes REQUIRED_COLS (valeurs manquantes par défaut)
+        """
+        import pandas as pd
+        defaults = {col: self.CATEGORICAL_DEFAULTS.get(col, 0) for col in self.REQUIRED_COLS}
+        
+        if is_dataframe(records):
+            return records.reindex(columns=self.REQUIRED_COLS).fillna(defaults)
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return pd.DataFrame(records, columns=self.REQUIRED_COLS)
+        
+        return pd.DataFrame([{col: record.get(col, defaults[col]) for col in self.REQUIRED_COLS}
+                             for record in records], columns=self.REQUIRED_COLS)
+    
+    def _compile_label_tables(self):
+        """
+        Compile chaque LabelEncoder en table dense : classes triées, code associé
+        et code par défaut pour les valeurs inconnues
+        
+        Une valeur inconnue (ou manquante) reçoit le code de la classe 'nan' quand elle existe
+        (c'est ainsi que les valeurs manquantes ont été encodées à l'entraînement), sinon 0.
+        Seule la ligne concernée est affectée, pas toute la colonne.
+        
+        Returns:
+            Dictionnaire {clé de l'encoder: (classes triées, codes, code par défaut)}
+        """
+        tables = {}
+        for key, encoder in self.label_encoders.items():
+            classes = np.asarray(encoder.classes_).astype(str)
+            order = np.argsort(classes, kind='stable')
+            codes = np.arange(len(classes))[order]
+            unknown_code = int(np.flatnonzero(classes == 'nan')[0]) if 'nan' in classes else 0
+            tables[key] = (classes[order], codes.astype(np.float64), float(unknown_code))
+        return tables
+    
+    def _encode_values(self, values, encoder_key):
+        """
+        Encode un array de valeurs catégorielles en une passe vectorisée via la table compilée
+        
+        Args:
+            values: Array de valeurs (converties en str, comme LabelEncoder)
+            encoder_key: Clé de l'encoder dans self.label_encoders
+            
+        Returns:
+            Array float64 des codes
+        """
+        classes, codes, unknown_code = self._label_tables[encoder_key]
+        keys = np.asarray(values).astype(str)
+        pos = np.minimum(np.searchsorted(classes, keys), len(classes) - 1)
+        return np.where(classes[pos] == keys, codes[pos], unknown_code)
+    
+    def _encoder_key(self, col, columns):
+        """
+        Retourne la clé du label encoder à appliquer à col (None si la colonne n'est pas encodée)
+        
+        Args:
+            col: Nom de la colonne
+            columns: Colonnes présentes (pour les variantes noms longs / noms courts)
+        """
+        if col in self.STANDARD_CATEGORICAL_COLS:
+            return col if col in self.label_encoders else None
+        
+        for long_name, variants in self.CATEGORICAL_MAPPING.items():
+            # Seule la première variante présente dans les données est encodée
+            present = [variant for variant in variants if variant in columns]
+            if present and present[0] == col:
+                for key in (col, variants[0], variants[1]):
+                    if key in self.label_encoders:
+                        return key
+                return None
+        return None
+    
+    def _compile_input_specs(self, input_cols):
+        """
+        Résout une fois pour toutes d'où vient chaque colonne attendue par le transformer
+        (même logique que _feature_engineering, _rename_columns, _preprocess et _encode_categorical)
+        
+        Returns:
+            Liste de specs ('value', colonne brute, clé encoder ou None), ('square', colonne brute)
+            ou ('const', valeur float), ou None si une colonne ne peut pas être résolue
+        """
+        # Colonne après feature engineering + renommage -> colonne brute source
+        sources = {self.COLUMN_MAPPING.get(col, col): col for col in self.REQUIRED_COLS}
+        
+        try:
+            specs = []
+            for col in input_cols:
+                encoder_key = self._encoder_key(col, input_cols)
+                if col == 'age_squared':
+                    specs.append(('square', 'age'))
+                elif col in sources:
+                    specs.append(('value', sources[col], encoder_key))
+                else:
+                    default = self.MISSING_COL_DEFAULTS.get(col, 0)
+                    if encoder_key is not None:
+                        default = self._encode_values(np.array([default]), encoder_key)[0]
+                    specs.append(('const', float(default)))
+            return specs
+        except Exception as e:
+            print(f"   ⚠️  Encodage compilé indisponible ({str(e)}), utilisation du pipeline pandas", file=sys.stderr)
+            return None
+    
+    def _raw_column(self, records, col):
+        """
+        Extrait une colonne brute (noms courts du dataset) pour tous les patients, sans DataFrame intermédiaire
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+            col: Nom de la colonne dans REQUIRED_COLS
+        """
+        default = self.CATEGORICAL_DEFAULTS.get(col, 0)
+        
+        if is_dataframe(records):
+            import pandas as pd
+            if col not in records.columns:
+                return np.full(len(records), default, dtype=object)
+            values = records[col].to_numpy(dtype=object)
+            missing = pd.isna(values)
+            if missing.any():
+                values = values.copy()
+                values[missing] = default
+            return values
+        
+        if isinstance(records, np.ndarray):
+            if records.ndim != 2 or records.shape[1] != len(self.REQUIRED_COLS):
+                raise ValueError(f"Array 2-D attendu avec {len(self.REQUIRED_COLS)} colonnes "
+                                 f"({', '.join(self.REQUIRED_COLS)}), reçu shape {records.shape}")
+            return records[:, self.REQUIRED_COLS.index(col)]
+        
+        return np.array([record.get(col, default) for record in records], dtype=object)
+    
+    @staticmethod
+    def _to_float(values):
+        """
+        Convertit une colonne numérique en float64 (None -> NaN, géré par XGBoost)
+        """
+        values = np.asarray(values, dtype=object)
+        return np.where(values == None, np.nan, values).astype(np.float64)  # noqa: E711
+    
+    def _preprocess_records(self, records):
+        """
+        Chemin rapide : encodage par tables compilées + plan NumPy, en une passe sur tout le batch
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            Array numpy prêt pour la prédiction
+        """
+        n = len(records)
+        raw = {}
+        columns = []
+        for spec in self._input_specs:
+            if spec[0] == 'const':
+                columns.append(np.full(n, spec[1]))
+                continue
+            
+            raw_col = spec[1]
+            if raw_col not in raw:
+                raw[raw_col] = self._raw_column(records, raw_col)
+            
+            if spec[0] == 'square':
+                columns.append(self._to_float(raw[raw_col]) ** 2)
+            elif spec[2] is not None:
+                columns.append(self._encode_values(raw[raw_col], spec[2]))
+            else:
+                columns.append(self._to_float(raw[raw_col]))
+        
+        return self._apply_preprocessing_plan(np.column_stack(columns))
     
     def _feature_engineering(self, data):
         """
@@ -101,22 +386,8 @@ class KidneyDiseasePredictor:
         Returns:
             DataFrame avec colonnes renommées
         """
-        X = data.copy()
-        
-        # Mapping des noms de colonnes courts vers les noms longs attendus par le modèle
-        column_mapping = {
-            'al': 'albumin',
-            'ane': 'anemia',
-            'appet': 'appetite',
-            'ba': 'bacteria',
-        }
-        
         # Renommer les colonnes si elles existent
-        for old_name, new_name in column_mapping.items():
-            if old_name in X.columns:
-                X = X.rename(columns={old_name: new_name})
-        
-        return X
+        return data.rename(columns=self.COLUMN_MAPPING)
     
     def _encode_categorical(self, data):
         """
@@ -130,57 +401,11 @@ class KidneyDiseasePredictor:
         """
         X = data.copy()
         
-        # Colonnes catégorielles à encoder (essayer d'abord les noms longs, puis les noms courts)
-        # Mapping pour gérer les deux cas (noms courts et noms longs)
-        categorical_mapping = {
-            'bacteria': ['bacteria', 'ba'],
-            'anemia': ['anemia', 'ane'],
-            'appetite': ['appetite', 'appet'],
-            'albumin': ['albumin', 'al'],
-        }
-        
-        # Colonnes catégorielles standard (sans renommage)
-        standard_categorical_cols = ['rbc', 'pc', 'pcc', 'htn', 'dm', 'cad', 'pe']
-        
-        # Encoder les colonnes standard
-        for col in standard_categorical_cols:
-            if col in X.columns and col in self.label_encoders:
-                # Remplacer les valeurs manquantes par une valeur par défaut
-                X[col] = X[col].fillna('unknown')
-                # Encoder
-                try:
-                    X[col] = self.label_encoders[col].transform(X[col].astype(str))
-                except:
-                    # Si valeur inconnue, utiliser la valeur la plus fréquente
-                    X[col] = 0
-        
-        # Encoder les colonnes avec mapping (noms longs ou courts)
-        for long_name, variants in categorical_mapping.items():
-            # Trouver quelle variante existe dans les données et dans les encoders
-            col_to_encode = None
-            encoder_key = None
-            
-            for variant in variants:
-                if variant in X.columns:
-                    col_to_encode = variant
-                    # Vérifier si l'encoder existe avec ce nom ou l'autre variante
-                    if variant in self.label_encoders:
-                        encoder_key = variant
-                    elif variants[0] in self.label_encoders:  # Essayer le nom long
-                        encoder_key = variants[0]
-                    elif variants[1] in self.label_encoders:  # Essayer le nom court
-                        encoder_key = variants[1]
-                    break
-            
-            if col_to_encode and encoder_key and encoder_key in self.label_encoders:
-                # Remplacer les valeurs manquantes par une valeur par défaut
-                X[col_to_encode] = X[col_to_encode].fillna('unknown')
-                # Encoder
-                try:
-                    X[col_to_encode] = self.label_encoders[encoder_key].transform(X[col_to_encode].astype(str))
-                except:
-                    # Si valeur inconnue, utiliser la valeur la plus fréquente
-                    X[col_to_encode] = 0
+        for col in list(X.columns):
+            encoder_key = self._encoder_key(col, X.columns)
+            if encoder_key is not None:
+                # Valeurs manquantes ou inconnues -> code par défaut de la table (ligne par ligne)
+                X[col] = self._encode_values(X[col].fillna('unknown').to_numpy(dtype=object), encoder_key)
         
         return X
     
@@ -194,6 +419,7 @@ class KidneyDiseasePredictor:
         Returns:
             Array numpy prêt pour la prédiction
         """
+        import pandas as pd
         # Feature engineering d'abord
         X = self._feature_engineering(data)
         
@@ -216,10 +442,7 @@ class KidneyDiseasePredictor:
                 # Ajouter les colonnes manquantes avec des valeurs par défaut
                 for col in missing_cols:
                     # Pour les colonnes catégorielles, utiliser une valeur par défaut appropriée
-                    if col in ['rbc', 'pc', 'pcc', 'bacteria', 'htn', 'dm', 'cad', 'appetite', 'pe', 'anemia']:
-                        X[col] = 'normal' if col in ['rbc', 'pc'] else 'notpresent' if col in ['pcc', 'bacteria'] else 'no' if col in ['htn', 'dm', 'cad', 'pe', 'anemia'] else 'good'
-                    else:
-                        X[col] = 0
+                    X[col] = self.MISSING_COL_DEFAULTS.get(col, 0)
                 print(f"   ✅ Colonnes manquantes ajoutées avec valeurs par défaut", file=sys.stderr)
             
             # Réorganiser les colonnes dans l'ordre attendu
@@ -228,16 +451,17 @@ class KidneyDiseasePredictor:
                 # S'assurer que toutes les colonnes attendues sont présentes
                 for col in expected_cols:
                     if col not in X.columns:
-                        if col in ['rbc', 'pc', 'pcc', 'bacteria', 'htn', 'dm', 'cad', 'appetite', 'pe', 'anemia']:
-                            X[col] = 'normal' if col in ['rbc', 'pc'] else 'notpresent' if col in ['pcc', 'bacteria'] else 'no' if col in ['htn', 'dm', 'cad', 'pe', 'anemia'] else 'good'
-                        else:
-                            X[col] = 0
+                        X[col] = self.MISSING_COL_DEFAULTS.get(col, 0)
                 X = X[expected_cols]
                 print(f"   ✅ Colonnes réorganisées dans l'ordre attendu", file=sys.stderr)
         
         # Encodage des variables catégorielles
         X = self._encode_categorical(X)
         
+        # Chemin rapide : scaling + feature selection via le plan NumPy compilé
+        if self._plan is not None:
+            return self._apply_preprocessing_plan(X[self._plan['input_cols']].to_numpy(dtype=np.float64))
+        
         # Normalisation
         try:
             X_power = self.power_transformer.transform(X)
@@ -273,22 +497,15 @@ class KidneyDiseasePredictor:
             Si return_probability=False : 0 ou 1
             Si return_probability=True : (prediction, probability)
         """
-        # Créer un DataFrame avec toutes les colonnes nécessaires
-        # Ordre des colonnes du dataset : id,age,bp,sg,al,su,rbc,pc,pcc,ba,bgr,bu,sc,sod,pot,hemo,pcv,wc,rc,htn,dm,cad,appet,pe,ane
-        required_cols = ['age', 'bp', 'sg', 'al', 'su', 'rbc', 'pc', 'pcc', 'ba', 'bgr', 
-                        'bu', 'sc', 'sod', 'pot', 'hemo', 'pcv', 'wc', 'rc', 'htn', 'dm', 
-                        'cad', 'appet', 'pe', 'ane']
-        
-        # Créer un DataFrame avec toutes les colonnes, remplir avec les valeurs du dict ou 0/null
-        data = pd.DataFrame([{col: data_dict.get(col, 0) if col not in ['rbc', 'pc', 'pcc', 'ba', 'htn', 'dm', 'cad', 'appet', 'pe', 'ane'] 
-                             else data_dict.get(col, 'normal' if col in ['rbc', 'pc'] else 'notpresent' if col in ['pcc', 'ba'] else 'no' if col in ['htn', 'dm', 'cad', 'pe', 'ane'] else 'good')
-                             for col in required_cols}])
-        
         # Preprocessing
-        X_processed = self._preprocess(data)
+        if self._plan is not None and self._input_specs is not None:
+            X_processed = self._preprocess_records([data_dict])
+        else:
+            # Créer un DataFrame avec toutes les colonnes, remplir avec les valeurs du dict ou 0/valeur catégorielle par défaut
+            X_processed = self._preprocess(self._build_dataframe([data_dict]))
         
         # Prédiction
-        proba = self.model.predict_proba(X_processed)[0][1]
+        proba = self._predict_proba(X_processed)[0]
         
         # Décision avec seuil optimal
         prediction = 1 if proba >= self.threshold else 0
@@ -297,4 +514,31 @@ class KidneyDiseasePredictor:
             return prediction, float(proba)
         else:
             return prediction
-
+    
+    def predict_batch(self, records):
+        """
+        Prédit pour plusieurs patients en une seule passe du pipeline
+        
+        Args:
+            records: Liste de dictionnaires, DataFrame, ou array 2-D de shape (N, 24)
+                     (colonnes dans l'ordre REQUIRED_COLS)
+            
+        Returns:
+            (predictions, probabilities) : arrays numpy de longueur N (int et float)
+        """
+        if len(records) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=float)
+        
+        # Preprocessing (encodage vectorisé sur tout le batch, sans copie de DataFrame)
+        if self._plan is not None and self._input_specs is not None:
+            X_processed = self._preprocess_records(records)
+        else:
+            X_processed = self._preprocess(self._build_dataframe(records))
+        
+        # Prédiction
+        probabilities = self._predict_proba(X_processed).astype(float)
+        
+        # Décision avec seuil optimal
+        predictions = (probabilities >= self.threshold).astype(int)
+        
+        return predictions, probabilities
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Code commun aux prédicteurs XGBoost tabulaires (diabète, cardiovasculaire, maladie rénale)
+
+Chaque load_model.py définit son feature engineering et ses artefacts ; cette classe de base
+fournit le bundle mmap (scripts/build_model_bundles.py), le plan de preprocessing NumPy compilé,
+le booster natif et le chargement des artefacts.
+"""
+
+import os
+import sys
+import time
+import json
+import mmap
+import struct
+import hashlib
+import numpy as np
+
+def is_dataframe(records):
+    """
+    isinstance(records, pd.DataFrame) sans importer pandas (importé seulement si un chemin DataFrame est utilisé)
+    """
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(records, pd.DataFrame)
+
+# Format du bundle : en-tête (magic, version, taille du manifeste), manifeste JSON,
+# puis les arrays numériques et le booster alignés sur 64 octets (lisibles en mmap sans copie)
+BUNDLE_MAGIC = b'LDMB'
+BUNDLE_FORMAT_VERSION = 1
+_BUNDLE_HEADER = struct.Struct('<4sIQ')
+_BUNDLE_ALIGN = 64
+
+def _align(offset):
+    return (offset + _BUNDLE_ALIGN - 1) // _BUNDLE_ALIGN * _BUNDLE_ALIGN
+
+def json_safe(value):
+    """
+    Convertit récursivement les types numpy d'une config en types JSON
+    """
+    if isinstance(value, dict):
+        return {str(k): json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return json_safe(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+def write_bundle(path, manifest, arrays, blobs):
+    """
+    Écrit un bundle de modèle dans un seul fichier (écriture atomique)
+    
+    Args:
+        path: Fichier de sortie
+        manifest: Dictionnaire JSON (threshold, ordre des features, ...)
+        arrays: Dictionnaire {nom: array numpy}
+        blobs: Dictionnaire {nom: bytes} (ex: booster UBJSON)
+        
+    Returns:
+        Version du contenu (préfixe du SHA-256 des arrays et blobs)
+    """
+    manifest = dict(manifest)
+    manifest['arrays'] = {}
+    manifest['blobs'] = {}
+    digest = hashlib.sha256()
+    sections = []
+    offset = 0
+    for name, array in arrays.items():
+        data = np.ascontiguousarray(array).tobytes()
+        manifest['arrays'][name] = {'dtype': np.asarray(array).dtype.str, 'shape': list(np.shape(array)), 'offset': offset}
+        sections.append((offset, data))
+        offset = _align(offset + len(data))
+    for name, blob in blobs.items():
+        data = bytes(blob)
+        manifest['blobs'][name] = {'offset': offset, 'length': len(data)}
+        sections.append((offset, data))
+        offset = _align(offset + len(data))
+    for _, data in sections:
+        digest.update(data)
+    manifest['model_version'] = digest.hexdigest()[:16]
+    
+    manifest_bytes = json.dumps(manifest, ensure_ascii=False).encode('utf-8')
+    data_start = _align(_BUNDLE_HEADER.size + len(manifest_bytes))
+    
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(manifest_bytes)))
+        f.write(manifest_bytes)
+        for section_offset, data in sections:
+            f.seek(data_start + section_offset)
+            f.write(data)
+    os.replace(tmp_path, path)
+    return manifest['model_version']
+
+def file_fingerprint(path):
+    """
+    Empreinte d'un fichier : taille, date de modification (ns) et SHA-256 du contenu
+    """
+    stat = os.stat(path)
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+def fingerprint_matches(path, fingerprint):
+    """
+    Vérifie qu'un fichier correspond à une empreinte de file_fingerprint
+    
+    Même taille et même date : fichier inchangé, sans le relire. Si seule la date diffère
+    (copie, checkout git), le contenu est re-hashé : un artefact ré-entraîné de même taille
+    est détecté par son SHA-256.
+    """
+    stat = os.stat(path)
+    if stat.st_size != fingerprint.get('size'):
+        return False
+    if stat.st_mtime_ns == fingerprint.get('mtime_ns'):
+        return True
+    return file_fingerprint(path)['sha256'] == fingerprint.get('sha256')
+
+def export_native_model(pickle_path):
+    """
+    Charge un XGBClassifier picklé et l'enregistre en UBJSON à côté du pickle, avec l'empreinte
+    du pickle dans <modèle>.ubj.json (un .ubj plus ancien que le pickle est ignoré au chargement)
+    
+    Returns:
+        Chemin du fichier .ubj écrit
+    """
+    import joblib
+    model = joblib.load(pickle_path)
+    ubj_path = os.path.splitext(pickle_path)[0] + '.ubj'
+    model.save_model(ubj_path)
+    with open(ubj_path + '.json', 'w', encoding='utf-8') as f:
+        json.dump(dict(file_fingerprint(pickle_path), source=os.path.basename(pickle_path)), f, indent=2)
+    return ubj_path
+
+def read_bundle(path):
+    """
+    Ouvre un bundle de modèle en mmap : un seul open(), les arrays sont des vues en lecture seule
+    sur le page cache (partagé entre tous les processus qui chargent le même fichier)
+    
+    Returns:
+        (manifeste, {nom: array}, {nom: memoryview})
+    """
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    magic, version, manifest_len = _BUNDLE_HEADER.unpack_from(buffer, 0)
+    if magic != BUNDLE_MAGIC:
+        raise ValueError(f"{path} n'est pas un bundle de modèle")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"version de bundle {version} non supportée (attendu {BUNDLE_FORMAT_VERSION})")
+    
+    manifest = json.loads(buffer[_BUNDLE_HEADER.size:_BUNDLE_HEADER.size + manifest_len].decode('utf-8'))
+    data_start = _align(_BUNDLE_HEADER.size + manifest_len)
+    
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                     offset=data_start + spec['offset']).reshape(spec['shape'])
+    view = memoryview(buffer)
+    blobs = {name: view[data_start + spec['offset']:data_start + spec['offset'] + spec['length']]
+             for name, spec in manifest['blobs'].items()}
+    return manifest, arrays, blobs
+
+class XGBPredictorBase:
+    """
+    Base des prédicteurs XGBoost tabulaires : bundle mmap, plan de preprocessing et booster natif
+    
+    Les sous-classes définissent BUNDLE_SOURCES, _load_artifacts et le feature engineering,
+    et peuvent ajouter leurs propres champs au bundle via _bundle_extras / _restore_bundle_extras.
+    """
+    
+    # Bundle mmap unique généré par scripts/build_model_bundles.py
+    BUNDLE_NAME = 'model_bundle.ldmb'
+    
+    # Artefacts dont le bundle est dérivé (leur empreinte est vérifiée au chargement du bundle)
+    BUNDLE_SOURCES = []
+    
+    def _load_bundle(self, bundle_path, n_threads=None):
+        """
+        Charge le modèle depuis le bundle mmap (un seul fichier : manifeste, plan NumPy et booster)
+        
+        Le bundle est ignoré s'il est absent, illisible, ou si le contenu d'un artefact source
+        a changé depuis sa création (modèle ré-entraîné sans régénérer le bundle, voir fingerprint_matches).
+        
+        Returns:
+            True si le bundle a été chargé, sinon False
+        """
+        if not os.path.exists(bundle_path):
+            return False
+        start = time.perf_counter()
+        try:
+            manifest, arrays, blobs = read_bundle(bundle_path)
+            for name, fingerprint in manifest.get('sources', {}).items():
+                source_path = os.path.join(self.model_dir, name)
+                if not isinstance(fingerprint, dict):
+                    raise ValueError("empreintes des sources absentes (bundle à régénérer)")
+                if os.path.exists(source_path) and not fingerprint_matches(source_path, fingerprint):
+                    raise ValueError(f"{name} a changé depuis la création du bundle")
+            from xgboost import XGBClassifier
+            model = XGBClassifier()
+            model.load_model(bytearray(blobs['booster']))
+        except Exception as e:
+            print(f"   ⚠️  Bundle ignoré ({str(e)}), chargement des artefacts séparés", file=sys.stderr)
+            return False
+        
+        self.model = model
+        self._init_booster(n_threads)
+        
+        # Le plan compilé remplace les scalers et le feature selector (pipeline pandas indisponible)
+        self.power_transformer = None
+        self.robust_scaler = None
+        self.feature_selector = None
+        self.config = manifest.get('config', {})
+        self.threshold = manifest['threshold']
+        self._restore_bundle_extras(manifest)
+        self._plan = dict(arrays, input_cols=manifest['input_cols'], selected_cols=manifest['selected_cols'])
+        self.model_version = manifest['model_version']
+        self.load_timings[os.path.basename(bundle_path)] = (time.perf_counter() - start) * 1000
+        return True
+    
+    def save_bundle(self, bundle_path=None):
+        """
+        Écrit le bundle mmap du modèle chargé (voir scripts/build_model_bundles.py)
+        
+        Args:
+            bundle_path: Fichier de sortie (défaut: BUNDLE_NAME dans le dossier du modèle)
+            
+        Returns:
+            Version du contenu du bundle
+        """
+        if self._plan is None:
+            raise ValueError("Plan de preprocessing non compilé : impossible de créer le bundle")
+        
+        manifest = {
+            'model': type(self).__name__,
+            'threshold': float(self.threshold),
+            'input_cols': list(self._plan['input_cols']),
+            'selected_cols': list(self._plan['selected_cols']),
+            'config': json_safe(getattr(self, 'config', {})),
+            **self._bundle_extras(),
+            'sources': {name: file_fingerprint(os.path.join(self.model_dir, name))
+                        for name in self.BUNDLE_SOURCES
+                        if os.path.exists(os.path.join(self.model_dir, name))},
+        }
+        arrays = {name: value for name, value in self._plan.items() if isinstance(value, np.ndarray)}
+        blobs = {'booster': self.booster.save_raw('ubj')}
+        return write_bundle(bundle_path or os.path.join(self.model_dir, self.BUNDLE_NAME), manifest, arrays, blobs)
+    
+    def _bundle_extras(self):
+        """
+        Champs du manifeste propres au modèle (surchargé par les sous-classes)
+        """
+        return {}
+    
+    def _restore_bundle_extras(self, manifest):
+        """
+        Restaure les champs de _bundle_extras depuis le manifeste (surchargé par les sous-classes)
+        """
+    
+    def _load_xgb_model(self, pickle_path):
+        """
+        Charge le XGBClassifier depuis le format natif XGBoost (UBJSON, même nom avec l'extension .ubj)
+        s'il existe et a été exporté depuis le pickle actuel, sinon depuis le pickle joblib
+        
+        Le format natif ne dépend pas des versions exactes de xgboost/sklearn au chargement
+        (voir scripts/export_boosters.py pour le générer).
+        """
+        ubj_path = os.path.splitext(pickle_path)[0] + '.ubj'
+        if os.path.exists(ubj_path) and self._native_model_is_current(ubj_path, pickle_path):
+            from xgboost import XGBClassifier
+            start = time.perf_counter()
+            model = XGBClassifier()
+            model.load_model(ubj_path)
+            self.load_timings[os.path.basename(ubj_path)] = (time.perf_counter() - start) * 1000
+            return model
+        return self._load_artifact(os.path.basename(pickle_path))
+    
+    @staticmethod
+    def _native_model_is_current(ubj_path, pickle_path):
+        """
+        Le .ubj n'est utilisé que si l'empreinte enregistrée à l'export correspond au pickle
+        (un pickle redéployé sans relancer export_boosters.py ne doit pas être masqué)
+        """
+        if not os.path.exists(pickle_path):
+            return True
+        try:
+            with open(ubj_path + '.json', 'r', encoding='utf-8') as f:
+                if fingerprint_matches(pickle_path, json.load(f)):
+                    return True
+            reason = "pickle modifié depuis l'export"
+        except (OSError, ValueError):
+            reason = "empreinte du pickle absente"
+        print(f"   ⚠️  {os.path.basename(ubj_path)} ignoré ({reason}), chargement du pickle "
+              f"(relancer scripts/export_boosters.py)", file=sys.stderr)
+        return False
+    
+    def _load_artifact(self, filename):
+        """
+        Charge un artefact joblib du dossier du modèle et mesure sa durée (self.load_timings, en ms)
+        """
+        import joblib
+        start = time.perf_counter()
+        artifact = joblib.load(os.path.join(self.model_dir, filename))
+        self.load_timings[filename] = (time.perf_counter() - start) * 1000
+        return artifact
+    
+    def _init_booster(self, n_threads=None):
+        """
+        Extrait le Booster natif du modèle pour l'inférence via inplace_predict
+        
+        Args:
+            n_threads: Nombre de threads XGBoost (défaut: variable LIVEDOC_XGB_NTHREAD, sinon 1)
+        """
+        if n_threads is None:
+            n_threads = int(os.environ.get('LIVEDOC_XGB_NTHREAD', '1'))
+        self.n_threads = n_threads
+        self.booster = self.model.get_booster()
+        self.booster.set_param({'nthread': n_threads})
+        
+        # Même plage d'arbres que predict_proba (early stopping éventuel)
+        best_iteration = self.booster.attr('best_iteration')
+        self._iteration_range = (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+        
+        # Buffer float32 préalloué pour les prédictions d'un seul patient
+        self._row_buffer = np.empty((1, self.booster.num_features()), dtype=np.float32)
+    
+    def _predict_proba(self, X):
+        """
+        Probabilité de la classe positive via Booster.inplace_predict
+        (sans la validation ni les copies du wrapper sklearn)
+        
+        Args:
+            X: Array (N, n_features) prêt pour la prédiction
+            
+        Returns:
+            Array float32 de longueur N
+        """
+        if X.shape == self._row_buffer.shape:
+            np.copyto(self._row_buffer, X, casting='same_kind')
+            X = self._row_buffer
+        else:
+            X = np.ascontiguousarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(X, iteration_range=self._iteration_range)
+    
+    def _compile_preprocessing_plan(self, input_cols, max_features=None):
+        """
+        Compile le scaling + la feature selection en un plan NumPy figé (construit une seule fois)
+        
+        Le plan contient la permutation des colonnes sélectionnées, les lambdas Yeo-Johnson,
+        la moyenne/l'écart-type du PowerTransformer et le centre/l'échelle du RobustScaler,
+        restreints aux seules colonnes gardées par le feature selector.
+        
+        Args:
+            input_cols: Ordre des colonnes de la matrice passée à _apply_preprocessing_plan
+            max_features: Nombre de features attendues par le modèle (garde les premières sélectionnées)
+            
+        Returns:
+            Dictionnaire du plan, ou None si les artefacts ne permettent pas de le compiler
+            (le pipeline pandas d'origine est alors utilisé)
+        """
+        try:
+            if getattr(self.power_transformer, 'method', 'yeo-johnson') != 'yeo-johnson':
+                raise ValueError("seule la méthode yeo-johnson est compilée")
+            transformer_cols = getattr(self.power_transformer, 'feature_names_in_', None)
+            if transformer_cols is not None and list(transformer_cols) != list(input_cols):
+                raise ValueError("l'ordre des colonnes du transformer ne correspond pas")
+            
+            selector_cols = list(getattr(self.feature_selector, 'feature_names_in_', input_cols))
+            support = np.asarray(self.feature_selector.support_, dtype=bool)
+            if len(support) != len(selector_cols):
+                raise ValueError(f"support_ a {len(support)} éléments pour {len(selector_cols)} colonnes")
+            selected_cols = [col for col, keep in zip(selector_cols, support) if keep]
+            if max_features is not None:
+                selected_cols = selected_cols[:max_features]
+            
+            perm = np.array([list(input_cols).index(col) for col in selected_cols], dtype=np.intp)
+            
+            lambdas = np.asarray(self.power_transformer.lambdas_, dtype=np.float64)[perm]
+            eps = np.finfo(np.float64).eps
+            lam_zero = np.abs(lambdas) < eps
+            lam_two = np.abs(lambdas - 2) <= eps
+            
+            if self.power_transformer.standardize:
+                pt_mean = self.power_transformer._scaler.mean_[perm]
+                pt_scale = self.power_transformer._scaler.scale_[perm]
+            else:
+                pt_mean = np.zeros(len(perm))
+                pt_scale = np.ones(len(perm))
+            
+            rs_center = (self.robust_scaler.center_[perm] if self.robust_scaler.with_centering
+                         else np.zeros(len(perm)))
+            rs_scale = (self.robust_scaler.scale_[perm] if self.robust_scaler.with_scaling
+                        else np.ones(len(perm)))
+            
+            return {
+                'input_cols': list(input_cols),
+                'selected_cols': selected_cols,
+                'perm': perm,
+                'lambdas': lambdas,
+                'lam_zero': lam_zero,
+                'lam_pos': np.where(lam_zero, 1.0, lambdas),
+                'lam_two': lam_two,
+                'lam_neg': np.where(lam_two, 1.0, 2 - lambdas),
+                'pt_mean': np.asarray(pt_mean, dtype=np.float64),
+                'pt_scale': np.asarray(pt_scale, dtype=np.float64),
+                'rs_center': np.asarray(rs_center, dtype=np.float64),
+                'rs_scale': np.asarray(rs_scale, dtype=np.float64),
+            }
+        except Exception as e:
+            print(f"   ⚠️  Plan de preprocessing non compilé ({str(e)}), utilisation du pipeline pandas", file=sys.stderr)
+            return None
+    
+    def _apply_preprocessing_plan(self, X):
+        """
+        Applique le plan compilé : sélection des colonnes, Yeo-Johnson + standardisation,
+        RobustScaler, puis moyenne des deux normalisations
+        
+        Args:
+            X: Array (N, len(input_cols)) dans l'ordre plan['input_cols']
+            
+        Returns:
+            Array numpy float64 contigu (N, n_features sélectionnées)
+        """
+        plan = self._plan
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        
+        # Même contrôle que les transformers sklearn sur toutes les colonnes, y compris celles que
+        # le plan ne garde pas (ex: bmi infini si height vaut 0) ; les NaN sont acceptés comme par sklearn
+        if np.isinf(X).any():
+            raise ValueError("Input X contains infinity or a value too large for dtype('float64').")
+        X = X[:, plan['perm']]
+        
+        # Yeo-Johnson (même formule que scipy.stats.yeojohnson) : log1p(|x|) calculé une fois
+        pos = X >= 0
+        with np.errstate(invalid='ignore'):
+            log_abs = np.log1p(np.where(pos, X, -X))
+            X_pos = np.where(plan['lam_zero'], log_abs, np.expm1(plan['lambdas'] * log_abs) / plan['lam_pos'])
+            X_neg = np.where(plan['lam_two'], -log_abs, -np.expm1((2 - plan['lambdas']) * log_abs) / plan['lam_neg'])
+        X_power = np.where(pos, X_pos, X_neg)
+        X_power -= plan['pt_mean']
+        X_power /= plan['pt_scale']
+        
+        # RobustScaler puis moyenne des deux normalisations
+        X_robust = (X - plan['rs_center']) / plan['rs_scale']
+        X_power += X_robust
+        X_power /= 2
+        return X_power
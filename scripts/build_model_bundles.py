@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Génère le bundle mmap de chaque modèle (model_bundle.ldmb dans le dossier du modèle)
+
+Le bundle regroupe dans un seul fichier versionné le manifeste JSON (threshold, ordre des
+features, features sélectionnées, config), les arrays du plan de preprocessing compilé et le
+booster XGBoost. Les prédicteurs le chargent en priorité : un seul fichier ouvert au démarrage
+et des arrays partagés via le page cache entre les processus.
+
+Le manifeste enregistre l'empreinte (taille, date, SHA-256) de chaque artefact source : un bundle
+dont un artefact a changé est ignoré au chargement. Les bundles ne sont pas versionnés : ce script
+est lancé au déploiement après export_boosters.py (nixpacks.toml, render.yaml) et à relancer
+après chaque ré-entraînement.
+
+Usage:
+    python3 build_model_bundles.py [models_dir]
+"""
+
+import os
+import sys
+
+from prediction_common import load_model_module
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODELS_DIR = os.path.join(BASE_DIR, 'public', 'models')
+
+# Dossier du modèle -> (nom unique du module load_model, classe du prédicteur)
+MODEL_PREDICTORS = {
+    'diabete_model': ('load_model_diabete', 'DiabetesPredictor'),
+    'cardiovasculaire_model': ('load_model_cardio', 'CardiovascularPredictor'),
+    'maladie_renale_model': ('load_model_renale', 'KidneyDiseasePredictor'),
+}
+
+def build_bundle(model_dir, module_name, class_name):
+    """
+    Charge le prédicteur depuis ses artefacts séparés et écrit son bundle
+
+    Returns:
+        (chemin du bundle, version du contenu)
+    """
+    predictor_class = getattr(load_model_module(model_dir, module_name), class_name)
+    predictor = predictor_class(model_dir, use_bundle=False)
+    bundle_path = os.path.join(model_dir, predictor.BUNDLE_NAME)
+    return bundle_path, predictor.save_bundle(bundle_path)
+
+def main():
+    models_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODELS_DIR
+
+    all_ok = True
+    for model_name, (module_name, class_name) in MODEL_PREDICTORS.items():
+        model_dir = os.path.join(models_dir, model_name)
+        try:
+            bundle_path, version = build_bundle(model_dir, module_name, class_name)
+            print(f"✅ {bundle_path} (version {version})")
+        except Exception as e:
+            print(f"❌ Erreur lors de la création du bundle de {model_dir}: {str(e)}")
+            all_ok = False
+
+    sys.exit(0 if all_ok else 1)
+
+if __name__ == "__main__":
+    main()
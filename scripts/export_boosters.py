@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Exporte les modèles XGBoost (pickles joblib) au format natif XGBoost UBJSON
+
+Les prédicteurs chargent automatiquement <modèle>.ubj quand il existe à côté de <modèle>.pkl,
+ce qui évite de dépendre des versions exactes de xgboost/sklearn au chargement du pickle.
+L'empreinte du pickle est enregistrée dans <modèle>.ubj.json : si le pickle est remplacé
+(ré-entraînement), le .ubj est ignoré jusqu'au prochain export.
+
+Les .ubj ne sont pas versionnés : ce script est lancé au déploiement (nixpacks.toml, render.yaml)
+et à relancer après chaque ré-entraînement.
+
+Usage:
+    python3 export_boosters.py [models_dir]
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODELS_DIR = os.path.join(BASE_DIR, 'public', 'models')
+
+# Dossier du modèle -> pickle du XGBClassifier utilisé par load_model.py
+MODEL_PICKLES = {
+    'diabete_model': 'xgb_diabetes_best_optimized.pkl',
+    'cardiovasculaire_model': 'xgb_cardio_optimized.pkl',
+    'maladie_renale_model': 'xgb_kidney_optimized.pkl',
+}
+
+def main():
+    models_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MODELS_DIR
+
+    # Export et format de l'empreinte partagés avec les prédicteurs (public/models/xgb_predictor_base.py)
+    sys.path.append(os.path.abspath(models_dir))
+    from xgb_predictor_base import export_native_model
+
+    all_ok = True
+    for model_name, pickle_name in MODEL_PICKLES.items():
+        pickle_path = os.path.join(models_dir, model_name, pickle_name)
+        if not os.path.exists(pickle_path):
+            print(f"❌ Fichier manquant: {pickle_path}")
+            all_ok = False
+            continue
+        try:
+            ubj_path = export_native_model(pickle_path)
+            print(f"✅ {pickle_path} -> {ubj_path}")
+        except Exception as e:
+            print(f"❌ Erreur lors de l'export de {pickle_path}: {str(e)}")
+            all_ok = False
+
+    sys.exit(0 if all_ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Exporte le modèle de tuberculose (model.h5) en flatbuffer TFLite, avec quantification optionnelle,
+et compare le backend TFLite au backend Keras (parité des probabilités, latence et pic de mémoire RSS)
+
+Fichiers écrits dans le dossier du modèle :
+    model.tflite           float32
+    model_float16.tflite   poids float16
+    model_int8.tflite      int8 (calibré sur --calibration-dir, sinon quantification dynamique des poids)
+
+Le prédicteur utilise le backend TFLite avec TuberculosisPredictor(model_dir, backend='tflite'),
+ou via scripts/predict.py avec LIVEDOC_TB_BACKEND=tflite (et LIVEDOC_TB_TFLITE=<fichier>).
+
+Usage:
+    python3 export_tflite.py [model_dir] [--quantize none|float16|int8|all]
+                             [--calibration-dir images/] [--eval-dir images/] [--report rapport.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+from prediction_common import load_model_module
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, 'public', 'models', 'app_model')
+
+# Mode de quantification -> nom du fichier exporté
+TFLITE_FILES = {
+    'none': 'model.tflite',
+    'float16': 'model_float16.tflite',
+    'int8': 'model_int8.tflite',
+}
+
+# Nombre maximal d'images utilisées pour calibrer la quantification int8
+MAX_CALIBRATION_IMAGES = 200
+
+def export_tflite(keras_model, output_path, quantize='none', calibration_images=None):
+    """
+    Convertit un modèle Keras en flatbuffer TFLite
+
+    Args:
+        keras_model: Modèle Keras chargé
+        output_path: Fichier .tflite de sortie
+        quantize: 'none', 'float16' ou 'int8'
+        calibration_images: Arrays prétraités (1, h, w, 3) pour calibrer l'int8
+                            (sans calibration : quantification dynamique des poids seulement)
+
+    Returns:
+        Taille du fichier écrit (octets)
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize == 'float16':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == 'int8':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if calibration_images:
+            converter.representative_dataset = lambda: ([image] for image in calibration_images)
+
+    flatbuffer = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(flatbuffer)
+    return len(flatbuffer)
+
+def _median_ms(values):
+    values = sorted(values)
+    return values[len(values) // 2] * 1000 if values else None
+
+def readable_images(predictor, image_paths):
+    """
+    Sépare les images que le prédicteur sait prétraiter des images illisibles
+
+    Returns:
+        (chemins lisibles, {chemin: erreur} des images illisibles)
+    """
+    readable = []
+    failed = {}
+    for path in image_paths:
+        # Une image illisible est ignorée : elle ne doit pas faire échouer tout le rapport
+        try:
+            predictor.preprocess_image(path)
+            readable.append(path)
+        except Exception as e:
+            failed[path] = str(e)
+    return readable, failed
+
+def evaluate_backend(predictor, image_paths):
+    """
+    Probabilités et latence image par image (batch de 1) d'un prédicteur
+
+    Returns:
+        (liste des probabilités, latence médiane en ms)
+    """
+    import numpy as np
+
+    probabilities = []
+    latencies = []
+    for path in image_paths:
+        x = predictor.preprocess_image(path)
+        start = time.perf_counter()
+        probabilities.append(float(predictor._run_model(x)[0]))
+        latencies.append(time.perf_counter() - start)
+    return np.array(probabilities), _median_ms(latencies)
+
+def _peak_rss_worker(model_dir, backend, tflite_path, image_paths):
+    # Exécuté dans un processus neuf : le pic RSS ne compte que ce backend
+    try:
+        import resource
+    except ImportError:
+        return None
+    module = load_model_module(model_dir, 'load_model_tuberculose')
+    predictor = module.TuberculosisPredictor(model_dir, backend=backend, tflite_path=tflite_path)
+    evaluate_backend(predictor, image_paths)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sur macOS, en kilo-octets sur Linux
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def measure_peak_rss(model_dir, backend, image_paths, tflite_path=None):
+    """
+    Pic de mémoire RSS (octets) d'un processus qui charge le prédicteur et score les images
+
+    Returns:
+        Octets, ou None si la mesure est impossible (module resource absent, ex: Windows)
+    """
+    # spawn : chaque mesure part d'un interpréteur vierge, sans TensorFlow déjà chargé
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_peak_rss_worker, (model_dir, backend, tflite_path, image_paths))
+
+def _megabytes(value):
+    return value / 1e6 if value is not None else None
+
+def build_report(keras_predictor, keras_load, tflite_paths, eval_paths, module):
+    """
+    Compare chaque flatbuffer TFLite au modèle Keras sur les images d'évaluation
+
+    Args:
+        keras_predictor: TuberculosisPredictor backend Keras déjà chargé
+        keras_load: Durée de son chargement (secondes)
+        tflite_paths: Dictionnaire {quantification: fichier .tflite}
+        eval_paths: Chemins des images d'évaluation
+        module: Module load_model du modèle
+
+    Returns:
+        Dictionnaire du rapport (sérialisable en JSON)
+
+    Raises:
+        ValueError: si aucune image d'évaluation n'est lisible
+    """
+    import numpy as np
+
+    # Mêmes images pour tous les backends : les illisibles sont écartées avant toute mesure
+    eval_paths, skipped = readable_images(keras_predictor, eval_paths)
+    if not eval_paths:
+        raise ValueError(f"Aucune image d'évaluation lisible ({len(skipped)} images illisibles)")
+
+    model_dir = keras_predictor.model_dir
+    # Première passe hors mesure (construction du graphe)
+    keras_predictor._run_model(keras_predictor.preprocess_image(eval_paths[0]))
+    keras_probas, keras_latency = evaluate_backend(keras_predictor, eval_paths)
+    threshold = keras_predictor.threshold
+
+    report = {
+        "images": len(eval_paths),
+        "skipped": len(skipped),
+        "skipped_paths": skipped,
+        "threshold": threshold,
+        "keras": {
+            "load_ms": keras_load * 1000,
+            "latency_ms": keras_latency,
+            "size_bytes": os.path.getsize(os.path.join(model_dir, "model.h5")),
+            "peak_rss_bytes": measure_peak_rss(model_dir, 'keras', eval_paths),
+        },
+        "tflite": {},
+    }
+
+    for quantize, tflite_path in tflite_paths.items():
+        start = time.perf_counter()
+        predictor = module.TuberculosisPredictor(model_dir, backend='tflite', tflite_path=tflite_path)
+        load = time.perf_counter() - start
+        probas, latency = evaluate_backend(predictor, eval_paths)
+        diff = np.abs(probas - keras_probas)
+        report["tflite"][quantize] = {
+            "file": os.path.basename(tflite_path),
+            "size_bytes": os.path.getsize(tflite_path),
+            "load_ms": load * 1000,
+            "latency_ms": latency,
+            "max_abs_diff": float(diff.max()),
+            "mean_abs_diff": float(diff.mean()),
+            "label_agreement": float(np.mean((probas >= threshold) == (keras_probas >= threshold))),
+            "peak_rss_bytes": measure_peak_rss(model_dir, 'tflite', eval_paths, tflite_path),
+        }
+    return report
+
+def print_report(report, file=None):
+    file = file or sys.stderr
+    keras = report["keras"]
+    print(f"📊 Parité TFLite / Keras sur {report['images']} images (seuil {report['threshold']})", file=file)
+    if report['skipped']:
+        print(f"   ⚠️  {report['skipped']} images d'évaluation illisibles ignorées :", file=file)
+        for path, error in report['skipped_paths'].items():
+            print(f"      {path}: {error}", file=file)
+    print(f"   {'backend':<10} {'taille (Mo)':>12} {'chargement (ms)':>16} {'latence (ms)':>13} {'RSS max (Mo)':>13} "
+          f"{'écart max':>10} {'écart moyen':>12} {'accord labels':>14}", file=file)
+
+    def rss(row):
+        peak = _megabytes(row['peak_rss_bytes'])
+        return f"{peak:13.0f}" if peak is not None else f"{'n/a':>13}"
+
+    print(f"   {'keras':<10} {keras['size_bytes'] / 1e6:12.1f} {keras['load_ms']:16.0f} {keras['latency_ms']:13.1f} "
+          f"{rss(keras)}", file=file)
+    for quantize, row in report["tflite"].items():
+        print(f"   {quantize:<10} {row['size_bytes'] / 1e6:12.1f} {row['load_ms']:16.0f} {row['latency_ms']:13.1f} "
+              f"{rss(row)} {row['max_abs_diff']:10.4f} {row['mean_abs_diff']:12.4f} {row['label_agreement']:14.1%}",
+              file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TFLite du modèle de tuberculose")
+    parser.add_argument('model_dir', nargs='?', default=DEFAULT_MODEL_DIR, help="Dossier app_model")
+    parser.add_argument('--quantize', default='none', choices=list(TFLITE_FILES) + ['all'],
+                        help="Quantification post-entraînement")
+    parser.add_argument('--calibration-dir', default=None, help="Images de calibration pour l'int8")
+    parser.add_argument('--eval-dir', default=None, help="Images pour le rapport de parité et de latence")
+    parser.add_argument('--report', default=None, help="Écrire aussi le rapport en JSON dans ce fichier")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    tf.get_logger().setLevel('ERROR')
+
+    module = load_model_module(args.model_dir, 'load_model_tuberculose')
+    start = time.perf_counter()
+    keras_predictor = module.TuberculosisPredictor(args.model_dir)
+    keras_load = time.perf_counter() - start
+
+    modes = list(TFLITE_FILES) if args.quantize == 'all' else [args.quantize]
+
+    calibration_images = None
+    if 'int8' in modes and args.calibration_dir:
+        image_paths = keras_predictor.list_images(args.calibration_dir)[:MAX_CALIBRATION_IMAGES]
+        calibration_images = []
+        for path in image_paths:
+            # Une image illisible est ignorée : elle ne doit pas faire échouer tout l'export int8
+            try:
+                calibration_images.append(keras_predictor.preprocess_image(path))
+            except Exception as e:
+                print(f"   ⚠️  Image de calibration ignorée ({path}): {str(e)}", file=sys.stderr)
+        if calibration_images:
+            print(f"   Calibration int8 sur {len(calibration_images)} images", file=sys.stderr)
+        else:
+            calibration_images = None
+            print(f"   ⚠️  Aucune image de calibration lisible dans {args.calibration_dir} : "
+                  f"int8 en quantification dynamique (poids seulement)", file=sys.stderr)
+    elif 'int8' in modes:
+        print("   ⚠️  Pas de --calibration-dir : int8 en quantification dynamique (poids seulement)", file=sys.stderr)
+
+    tflite_paths = {}
+    for quantize in modes:
+        output_path = os.path.join(args.model_dir, TFLITE_FILES[quantize])
+        try:
+            size = export_tflite(keras_predictor.model, output_path, quantize, calibration_images)
+            tflite_paths[quantize] = output_path
+            print(f"✅ {output_path} ({size / 1e6:.1f} Mo)", file=sys.stderr)
+        except Exception as e:
+            print(f"❌ Erreur lors de l'export {quantize}: {str(e)}", file=sys.stderr)
+
+    if args.eval_dir and tflite_paths:
+        eval_paths = keras_predictor.list_images(args.eval_dir)
+        if not eval_paths:
+            print(f"❌ Aucune image dans {args.eval_dir}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            report = build_report(keras_predictor, keras_load, tflite_paths, eval_paths, module)
+        except ValueError as e:
+            print(f"❌ {str(e)}", file=sys.stderr)
+            sys.exit(1)
+        print_report(report)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+
+    sys.exit(0 if len(tflite_paths) == len(modes) else 1)
+
+if __name__ == "__main__":
+    main()
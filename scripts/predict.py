@@ -2,24 +2,136 @@
 """
 Script pour faire des prédictions avec le modèle de tuberculose
 Appelé par l'API Next.js
+
+Usage:
+    python3 predict.py <image_path> <model_dir> [--startup-profile]
+    python3 predict.py - <model_dir> < radio.png     # octets de l'image sur stdin (pas de fichier temporaire)
 """
 
 import sys
 import os
 import json
-import numpy as np
-from PIL import Image
-import tensorflow as tf
 
-# Supprimer les warnings TensorFlow et rediriger stderr
+# Supprimer les warnings TensorFlow et rediriger stderr (avant l'import de tensorflow)
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
 os.environ['PYTHONWARNINGS'] = 'ignore'
-tf.get_logger().setLevel('ERROR')
 
 # Rediriger les warnings vers stderr pour ne pas polluer stdout
 import warnings
 warnings.filterwarnings('ignore')
 
+from prediction_common import startup_profiler_from_argv, load_model_module, error_result
+
+# --startup-profile : durée de chaque import, du chargement du modèle et de la première prédiction
+PROFILER = startup_profiler_from_argv()
+
+def load_predictor(model_dir):
+    """
+    Charge le prédicteur de tuberculose depuis model_dir
+
+    Backend choisi par LIVEDOC_TB_BACKEND ('keras' par défaut, ou 'tflite' avec le fichier
+    LIVEDOC_TB_TFLITE, défaut model.tflite). tensorflow n'est importé que pour le backend Keras.
+
+    Cache des radiographies prétraitées (une image déjà vue n'est plus décodée) :
+        LIVEDOC_TB_CACHE_DIR=/var/cache/livedoc-tb   # dossier du cache (désactivé si absent)
+        LIVEDOC_TB_CACHE_MAX_MB=1024                 # taille maximale du cache d'images
+        LIVEDOC_TB_CACHE_PROBABILITIES=1             # garder aussi les probabilités (par version du modèle)
+
+    LIVEDOC_TB_FAST_PREPROCESSING=1 active le décodage JPEG à résolution réduite
+    (parité vérifiée avec scripts/preprocessing_parity.py).
+    """
+    backend = os.environ.get('LIVEDOC_TB_BACKEND', 'keras')
+    if backend == 'keras':
+        with PROFILER.section('import tensorflow'):
+            import tensorflow as tf
+            tf.get_logger().setLevel('ERROR')
+    with PROFILER.section('import load_model'):
+        load_model = load_model_module(model_dir, 'load_model_tuberculose')
+    with PROFILER.section('chargement du modèle'):
+        predictor = load_model.TuberculosisPredictor(
+            model_dir, backend=backend, tflite_path=os.environ.get('LIVEDOC_TB_TFLITE'),
+            cache_dir=os.environ.get('LIVEDOC_TB_CACHE_DIR') or None,
+            cache_max_bytes=int(float(os.environ.get('LIVEDOC_TB_CACHE_MAX_MB', '1024')) * 1024 * 1024),
+            cache_probabilities=os.environ.get('LIVEDOC_TB_CACHE_PROBABILITIES', '') == '1',
+            fast_preprocessing=os.environ.get('LIVEDOC_TB_FAST_PREPROCESSING', '') == '1')
+    return predictor
+
+def build_result(predictor, image_path):
+    """
+    Fait la prédiction pour une radiographie et construit le résultat JSON renvoyé à l'API
+
+    Args:
+        predictor: TuberculosisPredictor déjà chargé
+        image_path: Chemin vers l'image, ou octets de l'image
+
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
+    # Faire la prédiction
+    prediction, probability = predictor.predict(image_path, return_probability=True)
+    return format_result(prediction, probability, predictor.threshold)
+
+def format_result(prediction, probability, threshold):
+    """
+    Construit le résultat JSON (label, confiance, interprétation) d'une prédiction
+    """
+    # Déterminer la classe
+    is_tuberculosis = prediction == "Tuberculosis"
+    confidence = probability if is_tuberculosis else (1 - probability)
+    
+    # Déterminer le niveau de confiance textuel (comme dans test_model.py)
+    if is_tuberculosis:
+        confidence_level = "Élevée" if probability >= 0.8 else "Modérée"
+    else:
+        confidence_level = "Élevée" if probability <= 0.2 else "Modérée"
+    
+    # Générer l'interprétation (comme dans test_model.py)
+    if is_tuberculosis:
+        if probability >= 0.8:
+            interpretation = "Forte probabilité de tuberculose détectée"
+            recommendation = "Consultation médicale recommandée"
+        else:
+            interpretation = "Signes possibles de tuberculose détectés"
+            recommendation = "Consultation médicale recommandée pour confirmation"
+        explanation = "Signes de tuberculose détectés : opacités pulmonaires, cavités, adénopathies médiastinales"
+        features = [
+            "Opacités pulmonaires",
+            "Cavités",
+            "Adénopathies",
+            "Épanchement pleural"
+        ]
+    else:
+        if probability <= 0.2:
+            interpretation = "Aucun signe de tuberculose détecté"
+            recommendation = None
+        else:
+            interpretation = "Résultat incertain"
+            recommendation = "Consultation recommandée"
+        explanation = "Aucun signe de tuberculose détecté. Image normale."
+        features = [
+            "Poumons clairs",
+            "Pas d'anomalie",
+            "Structures normales"
+        ]
+    
+    # Résultat JSON
+    return {
+        "success": True,
+        "prediction": 1 if is_tuberculosis else 0,
+        "probability": float(probability),
+        "confidence": float(confidence),
+        "confidenceLevel": confidence_level,
+        "threshold": float(threshold),
+        "label": prediction,
+        "details": {
+            "probability": float(confidence),
+            "explanation": explanation,
+            "features": features,
+            "interpretation": interpretation,
+            "recommendation": recommendation
+        }
+    }
+
 def main():
     if len(sys.argv) < 3:
         print(json.dumps({"error": "Arguments manquants"}))
@@ -28,91 +140,31 @@ def main():
     image_path = sys.argv[1]
     model_dir = sys.argv[2]
     
-    # Ajouter le chemin du modèle au sys.path pour l'import
-    sys.path.insert(0, model_dir)
-    
-    from load_model import TuberculosisPredictor
-    
     try:
+        # '-' : l'image arrive sur stdin, décodée en mémoire par le prédicteur
+        if image_path == '-':
+            image_path = sys.stdin.buffer.read()
+            if not image_path:
+                raise ValueError("Aucune image reçue sur stdin")
+        
         # Initialiser le prédicteur
-        predictor = TuberculosisPredictor(model_dir)
+        predictor = load_predictor(model_dir)
         
         # Faire la prédiction
-        prediction, probability = predictor.predict(image_path, return_probability=True)
-        
-        # Déterminer la classe
-        is_tuberculosis = prediction == "Tuberculosis"
-        confidence = probability if is_tuberculosis else (1 - probability)
-        threshold = predictor.threshold
-        
-        # Déterminer le niveau de confiance textuel (comme dans test_model.py)
-        if is_tuberculosis:
-            confidence_level = "Élevée" if probability >= 0.8 else "Modérée"
-        else:
-            confidence_level = "Élevée" if probability <= 0.2 else "Modérée"
-        
-        # Générer l'interprétation (comme dans test_model.py)
-        if is_tuberculosis:
-            if probability >= 0.8:
-                interpretation = "Forte probabilité de tuberculose détectée"
-                recommendation = "Consultation médicale recommandée"
-            else:
-                interpretation = "Signes possibles de tuberculose détectés"
-                recommendation = "Consultation médicale recommandée pour confirmation"
-            explanation = "Signes de tuberculose détectés : opacités pulmonaires, cavités, adénopathies médiastinales"
-            features = [
-                "Opacités pulmonaires",
-                "Cavités",
-                "Adénopathies",
-                "Épanchement pleural"
-            ]
-        else:
-            if probability <= 0.2:
-                interpretation = "Aucun signe de tuberculose détecté"
-                recommendation = None
-            else:
-                interpretation = "Résultat incertain"
-                recommendation = "Consultation recommandée"
-            explanation = "Aucun signe de tuberculose détecté. Image normale."
-            features = [
-                "Poumons clairs",
-                "Pas d'anomalie",
-                "Structures normales"
-            ]
-        
-        # Résultat JSON
-        result = {
-            "success": True,
-            "prediction": 1 if is_tuberculosis else 0,
-            "probability": float(probability),
-            "confidence": float(confidence),
-            "confidenceLevel": confidence_level,
-            "threshold": float(threshold),
-            "label": prediction,
-            "details": {
-                "probability": float(confidence),
-                "explanation": explanation,
-                "features": features,
-                "interpretation": interpretation,
-                "recommendation": recommendation
-            }
-        }
+        with PROFILER.section('première prédiction'):
+            result = build_result(predictor, image_path)
         
         # Imprimer uniquement le JSON sur stdout (pas de print de debug)
         print(json.dumps(result), file=sys.stdout)
         sys.stdout.flush()
         
     except Exception as e:
-        import traceback
-        error_result = {
-            "success": False,
-            "error": str(e),
-            "traceback": traceback.format_exc() if os.getenv('DEBUG') else None
-        }
-        print(json.dumps(error_result), file=sys.stdout)
+        print(json.dumps(error_result(e)), file=sys.stdout)
         sys.stdout.flush()
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
-
+    try:
+        main()
+    finally:
+        PROFILER.report()
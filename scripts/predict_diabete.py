@@ -2,38 +2,240 @@
 """
 Script pour faire des prédictions avec le modèle de diabète
 Appelé par l'API Next.js
+
+Usage:
+    python3 predict_diabete.py <données_json_base64> <model_dir>
+    python3 predict_diabete.py --serve <model_dir>   # une requête JSON par ligne sur stdin
+    python3 predict_diabete.py --batch <patients.csv|patients.jsonl> <model_dir> [sortie.jsonl]
+
+    Option --startup-profile (tous les modes) : rapport des temps de démarrage sur stderr
 """
 
 import sys
 import os
 import json
-import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
 # Supprimer les warnings et rediriger stderr
 os.environ['PYTHONWARNINGS'] = 'ignore'
 
-# Configurer OpenMP pour XGBoost sur macOS
-# Chercher libomp.dylib dans les emplacements courants
-libomp_paths = [
-    '/opt/homebrew/opt/libomp/lib/libomp.dylib',
-    '/usr/local/opt/libomp/lib/libomp.dylib',
-    '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
-    '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
-]
-
-import glob
-for pattern in libomp_paths:
-    matches = glob.glob(pattern)
-    if matches:
-        os.environ['DYLD_LIBRARY_PATH'] = os.path.dirname(matches[0]) + (':' + os.environ.get('DYLD_LIBRARY_PATH', ''))
-        break
-
-# Alternative: définir OMP_NUM_THREADS pour éviter les problèmes
-os.environ['OMP_NUM_THREADS'] = '1'
+from prediction_common import (configure_openmp, startup_profiler_from_argv, load_model_module,
+                               check_xgboost, error_result, run_batch)
+from result_cache import cache_from_env, cached_result
+
+# --startup-profile : durée de chaque import, de la sonde libomp, des artefacts et de la première prédiction
+PROFILER = startup_profiler_from_argv()
+
+# Configurer OpenMP pour XGBoost (libomp sur macOS) AVANT tout import de xgboost
+with PROFILER.section('sonde libomp'):
+    configure_openmp()
+
+def load_predictor(model_dir):
+    """
+    Charge le prédicteur de diabète depuis model_dir
+    """
+    with PROFILER.section('import load_model'):
+        load_model = load_model_module(model_dir, 'load_model_diabete')
+    with PROFILER.section('chargement du modèle'):
+        predictor = load_model.DiabetesPredictor(model_dir)
+    PROFILER.add_timings(getattr(predictor, 'load_timings', {}))
+    return predictor
+
+def build_result(predictor, data_dict):
+    """
+    Fait la prédiction pour un patient et construit le résultat JSON renvoyé à l'API
+
+    Args:
+        predictor: DiabetesPredictor déjà chargé
+        data_dict: Dictionnaire avec les données du patient
+
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
+    # Faire la prédiction
+    prediction, probability = predictor.predict(data_dict, return_probability=True)
+    return format_result(prediction, probability, predictor.threshold)
+
+def predict_once(model_dir, data_dict):
+    """
+    Charge le modèle et fait une seule prédiction (mode simple)
+
+    Returns:
+        Le résultat JSON, ou l'erreur OpenMP si xgboost est inutilisable
+    """
+    xgb_error = check_xgboost(PROFILER)
+    if xgb_error:
+        return xgb_error
+    
+    # Initialiser le prédicteur
+    predictor = load_predictor(model_dir)
+    
+    # Faire la prédiction
+    with PROFILER.section('première prédiction'):
+        return build_result(predictor, data_dict)
+
+def format_result(prediction, probability, threshold):
+    """
+    Construit le résultat JSON (label, confiance, interprétation) d'une prédiction
+    """
+    # Déterminer la classe
+    is_diabetes = prediction == 1
+    confidence = probability if is_diabetes else (1 - probability)
+    
+    # Déterminer le niveau de confiance
+    if is_diabetes:
+        confidence_level = "Élevée" if probability >= 0.8 else "Modérée"
+    else:
+        confidence_level = "Élevée" if probability <= 0.2 else "Modérée"
+    
+    # Générer l'interprétation
+    if is_diabetes:
+        if probability >= 0.8:
+            interpretation = "Forte probabilité de diabète détectée. Signes cliniques significatifs présents."
+            recommendation = "Consultation médicale urgente recommandée. Examens complémentaires nécessaires (HbA1c, test de tolérance au glucose)."
+        else:
+            interpretation = "Signes possibles de diabète détectés. Surveillance recommandée."
+            recommendation = "Consultation médicale recommandée pour confirmation."
+        explanation = "Facteurs de risque détectés : glucose élevé, IMC élevé, antécédents familiaux"
+        features = [
+            "Taux de glucose élevé",
+            "IMC élevé",
+            "Antécédents familiaux",
+            "Âge"
+        ]
+    else:
+        if probability <= 0.2:
+            interpretation = "Aucun signe de diabète détecté. Paramètres normaux."
+            recommendation = None
+        else:
+            interpretation = "Résultat incertain. Surveillance recommandée."
+            recommendation = "Consultation médicale recommandée."
+        explanation = "Paramètres dans les limites normales. Aucun facteur de risque majeur détecté."
+        features = [
+            "Glucose normal",
+            "IMC normal",
+            "Pas d'antécédents",
+            "Paramètres stables"
+        ]
+    
+    # Résultat JSON
+    return {
+        "success": True,
+        "prediction": prediction,
+        "probability": float(probability),
+        "confidence": float(confidence),
+        "confidenceLevel": confidence_level,
+        "threshold": float(threshold),
+        "label": "Diabète" if is_diabetes else "Normal",
+        "details": {
+            "probability": float(confidence),
+            "explanation": explanation,
+            "features": features,
+            "interpretation": interpretation,
+            "recommendation": recommendation
+        }
+    }
+
+def batch(input_path, model_dir, output_path=None):
+    """
+    Mode batch : score tous les patients d'un fichier CSV/JSONL avec une seule instance
+    du prédicteur et écrit un résultat JSON par ligne (champ "row" = index dans le fichier)
+
+    Args:
+        input_path: Fichier .csv ou .jsonl de patients
+        model_dir: Dossier contenant les fichiers du modèle
+        output_path: Fichier JSONL de sortie (par défaut stdout)
+    """
+    try:
+        xgb_error = check_xgboost(PROFILER)
+        if xgb_error:
+            print(json.dumps(xgb_error), file=sys.stdout)
+            sys.stdout.flush()
+            return 1
+        predictor = load_predictor(model_dir)
+    except Exception as e:
+        print(json.dumps(error_result(e)), file=sys.stdout)
+        sys.stdout.flush()
+        return 1
+    
+    output = None
+    try:
+        output = open(output_path, 'w', encoding='utf-8') if output_path else sys.stdout
+        with PROFILER.section('batch complet'):
+            n_rows, n_errors = run_batch(predictor, format_result, input_path, output)
+    except Exception as e:
+        # Fichier d'entrée illisible ou sortie impossible : les lignes déjà écrites sont conservées
+        print(json.dumps(error_result(e)), file=sys.stdout)
+        sys.stdout.flush()
+        print(f"❌ Batch interrompu : {str(e)}", file=sys.stderr)
+        return 1
+    finally:
+        if output_path and output is not None:
+            output.close()
+    
+    print(f"✅ Batch terminé : {n_rows} patients, {n_errors} erreurs", file=sys.stderr)
+    return 0
+
+def serve(model_dir, stdin=None, stdout=None, cache=None):
+    """
+    Mode serveur : charge le modèle une seule fois puis lit une requête JSON par ligne
+    sur stdin et écrit un résultat JSON par ligne sur stdout (même schéma que le mode simple)
+
+    Args:
+        model_dir: Dossier contenant les fichiers du modèle
+        stdin: Flux d'entrée (par défaut sys.stdin)
+        stdout: Flux de sortie (par défaut sys.stdout)
+        cache: ResultCache optionnel (voir result_cache.py)
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    
+    try:
+        xgb_error = check_xgboost(PROFILER)
+        if xgb_error:
+            print(json.dumps(xgb_error), file=stdout)
+            stdout.flush()
+            return 1
+        predictor = load_predictor(model_dir)
+    except Exception as e:
+        print(json.dumps(error_result(e)), file=stdout)
+        stdout.flush()
+        return 1
+    
+    print("✅ Mode serveur prêt (une requête JSON par ligne)", file=sys.stderr)
+    
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        # Une erreur sur une ligne ne doit pas arrêter le serveur
+        try:
+            data_dict = json.loads(line)
+            with PROFILER.section('première prédiction'):
+                result = cached_result(cache, 'diabete', model_dir, data_dict,
+                                       lambda: build_result(predictor, data_dict))
+        except Exception as e:
+            result = error_result(e)
+        print(json.dumps(result), file=stdout)
+        stdout.flush()
+        
+        # Le profil de démarrage s'arrête à la première requête
+        PROFILER.report()
+    
+    if cache is not None:
+        print(f"💾 Cache de résultats : {json.dumps(cache.stats())}", file=sys.stderr)
+    return 0
 
 def main():
+    # Mode batch : python3 predict_diabete.py --batch <patients.csv|patients.jsonl> <model_dir> [sortie.jsonl]
+    if len(sys.argv) >= 4 and sys.argv[1] == '--batch':
+        sys.exit(batch(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else None))
+    
+    # Mode serveur : python3 predict_diabete.py --serve <model_dir>
+    if len(sys.argv) >= 3 and sys.argv[1] == '--serve':
+        sys.exit(serve(sys.argv[2], cache=cache_from_env()))
+    
     if len(sys.argv) < 3:
         print(json.dumps({"success": False, "error": "Arguments manquants"}))
         sys.exit(1)
@@ -49,116 +251,28 @@ def main():
         print(json.dumps({"success": False, "error": f"Erreur de décodage base64: {str(e)}"}))
         sys.exit(1)
     
-    # Ajouter le chemin du modèle au sys.path pour l'import
-    sys.path.insert(0, model_dir)
-    
     try:
-        # Importer xgboost AVANT load_model pour capturer les erreurs tôt
-        try:
-            import xgboost
-        except Exception as xgb_error:
-            error_msg = str(xgb_error)
-            if 'libxgboost' in error_msg or 'OpenMP' in error_msg or 'XGBoost Library' in error_msg:
-                result = {
-                    "success": False,
-                    "error": f"XGBoost nécessite OpenMP. Erreur: {error_msg}\n\n" +
-                            "Pour installer OpenMP:\n" +
-                            "  macOS: brew install libomp\n" +
-                            "  Linux: sudo apt-get install libomp-dev (Ubuntu/Debian)\n" +
-                            "  Windows: Installer Visual C++ Redistributable\n\n" +
-                            "Puis réinstaller xgboost: pip3 uninstall xgboost && pip3 install xgboost"
-                }
-                print(json.dumps(result), file=sys.stdout)
-                sys.stdout.flush()
-                sys.exit(1)
-            else:
-                raise xgb_error
-        
-        from load_model import DiabetesPredictor
-        
         # Parser les données JSON
         data_dict = json.loads(data_json)
         
-        # Initialiser le prédicteur
-        predictor = DiabetesPredictor(model_dir)
-        
-        # Faire la prédiction
-        prediction, probability = predictor.predict(data_dict, return_probability=True)
-        
-        # Déterminer la classe
-        is_diabetes = prediction == 1
-        confidence = probability if is_diabetes else (1 - probability)
-        threshold = predictor.threshold
-        
-        # Déterminer le niveau de confiance
-        if is_diabetes:
-            confidence_level = "Élevée" if probability >= 0.8 else "Modérée"
-        else:
-            confidence_level = "Élevée" if probability <= 0.2 else "Modérée"
-        
-        # Générer l'interprétation
-        if is_diabetes:
-            if probability >= 0.8:
-                interpretation = "Forte probabilité de diabète détectée. Signes cliniques significatifs présents."
-                recommendation = "Consultation médicale urgente recommandée. Examens complémentaires nécessaires (HbA1c, test de tolérance au glucose)."
-            else:
-                interpretation = "Signes possibles de diabète détectés. Surveillance recommandée."
-                recommendation = "Consultation médicale recommandée pour confirmation."
-            explanation = "Facteurs de risque détectés : glucose élevé, IMC élevé, antécédents familiaux"
-            features = [
-                "Taux de glucose élevé",
-                "IMC élevé",
-                "Antécédents familiaux",
-                "Âge"
-            ]
-        else:
-            if probability <= 0.2:
-                interpretation = "Aucun signe de diabète détecté. Paramètres normaux."
-                recommendation = None
-            else:
-                interpretation = "Résultat incertain. Surveillance recommandée."
-                recommendation = "Consultation médicale recommandée."
-            explanation = "Paramètres dans les limites normales. Aucun facteur de risque majeur détecté."
-            features = [
-                "Glucose normal",
-                "IMC normal",
-                "Pas d'antécédents",
-                "Paramètres stables"
-            ]
-        
-        # Résultat JSON
-        result = {
-            "success": True,
-            "prediction": prediction,
-            "probability": float(probability),
-            "confidence": float(confidence),
-            "confidenceLevel": confidence_level,
-            "threshold": float(threshold),
-            "label": "Diabète" if is_diabetes else "Normal",
-            "details": {
-                "probability": float(confidence),
-                "explanation": explanation,
-                "features": features,
-                "interpretation": interpretation,
-                "recommendation": recommendation
-            }
-        }
+        # Cache de résultats optionnel (variable LIVEDOC_RESULT_CACHE, voir result_cache.py) :
+        # un hit du cache disque évite l'import de xgboost et le chargement du modèle
+        result = cached_result(cache_from_env(), 'diabete', model_dir, data_dict,
+                               lambda: predict_once(model_dir, data_dict))
         
         # Imprimer uniquement le JSON sur stdout
         print(json.dumps(result), file=sys.stdout)
         sys.stdout.flush()
+        if not result.get('success'):
+            sys.exit(1)
         
     except Exception as e:
-        import traceback
-        error_result = {
-            "success": False,
-            "error": str(e),
-            "traceback": traceback.format_exc() if os.getenv('DEBUG') else None
-        }
-        print(json.dumps(error_result), file=sys.stdout)
+        print(json.dumps(error_result(e)), file=sys.stdout)
         sys.stdout.flush()
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
-
+    try:
+        main()
+    finally:
+        PROFILER.report()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Client du démon de prédiction (prediction_daemon.py)
+
+Usage en Python:
+    with PredictionClient() as client:
+        result = client.predict('diabete', {"Glucose": 150, ...})
+
+Usage en ligne de commande (mêmes arguments et même sortie JSON que predict_*.py):
+    python3 prediction_client.py <modèle> <données_json_base64 | image_path>
+"""
+
+import sys
+import json
+import socket
+
+from prediction_daemon import DEFAULT_SOCKET_PATH
+
+class PredictionClient:
+    """
+    Connexion persistante vers le démon de prédiction
+    """
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, timeout=30):
+        """
+        Args:
+            socket_path: Chemin de la socket Unix du démon
+            timeout: Délai maximal (secondes) pour une réponse
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+
+    def connect(self):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.settimeout(self.timeout)
+            self._sock.connect(self.socket_path)
+            self._file = self._sock.makefile('rwb')
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def request(self, payload):
+        """
+        Envoie une requête brute et retourne la réponse décodée
+        """
+        self.connect()
+        self._file.write(json.dumps(payload).encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("Connexion fermée par le démon de prédiction")
+        return json.loads(line)
+
+    def predict(self, model, data):
+        """
+        Demande une prédiction au démon
+
+        Args:
+            model: 'diabete', 'cardio', 'renale' ou 'tuberculose'
+            data: Dictionnaire du patient, ou chemin de l'image pour 'tuberculose'
+
+        Returns:
+            Le même dictionnaire de résultat que les scripts predict_*.py
+        """
+        return self.request({"model": model, "data": data})
+
+    def status(self):
+        return self.request({"action": "status"})
+
+def main():
+    if len(sys.argv) < 3:
+        print(json.dumps({"success": False, "error": "Arguments manquants"}))
+        sys.exit(1)
+
+    model = sys.argv[1]
+    payload = sys.argv[2]
+
+    if model != 'tuberculose':
+        # Décoder le JSON depuis base64 (comme les scripts predict_*.py)
+        import base64
+        try:
+            payload = json.loads(base64.b64decode(payload).decode('utf-8'))
+        except Exception as e:
+            print(json.dumps({"success": False, "error": f"Erreur de décodage base64: {str(e)}"}))
+            sys.exit(1)
+
+    try:
+        with PredictionClient() as client:
+            result = client.predict(model, payload)
+    except Exception as e:
+        result = {"success": False, "error": f"Démon de prédiction injoignable: {str(e)}"}
+
+    print(json.dumps(result), file=sys.stdout)
+    sys.stdout.flush()
+    if not result.get('success'):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
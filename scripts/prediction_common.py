@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Fonctions partagées par les scripts de prédiction (predict_*.py) et le démon de prédiction
+"""
+
+import os
+import sys
+import json
+import time
+import contextlib
+import importlib.util
+
+# Emplacements courants de libomp.dylib (Homebrew / LLVM)
+LIBOMP_PATHS = [
+    '/opt/homebrew/opt/libomp/lib/libomp.dylib',
+    '/usr/local/opt/libomp/lib/libomp.dylib',
+    '/usr/local/Cellar/libomp/*/lib/libomp.dylib',
+    '/usr/local/Cellar/llvm/*/lib/libomp.dylib',
+]
+
+def configure_openmp():
+    """
+    Configure OpenMP pour XGBoost AVANT de l'importer : ajoute libomp au DYLD_LIBRARY_PATH
+    (uniquement sur macOS, le scan glob est inutile ailleurs) et fixe OMP_NUM_THREADS=1
+
+    Peut être appelée plusieurs fois (démon puis scripts importés) : le dossier n'est ajouté qu'une fois.
+    """
+    if sys.platform == 'darwin':
+        import glob
+        for pattern in LIBOMP_PATHS:
+            matches = glob.glob(pattern)
+            if matches:
+                libomp_dir = os.path.dirname(matches[0])
+                current = os.environ.get('DYLD_LIBRARY_PATH', '')
+                if libomp_dir not in current.split(':'):
+                    os.environ['DYLD_LIBRARY_PATH'] = libomp_dir + (':' + current)
+                break
+    
+    # Définir OMP_NUM_THREADS pour éviter les problèmes
+    os.environ['OMP_NUM_THREADS'] = '1'
+
+class StartupProfiler:
+    """
+    Mesure le temps de démarrage d'un script (imports, sonde libomp, artefacts, première prédiction)
+    pour l'option --startup-profile. Désactivé, il ne mesure rien.
+    """
+    
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reported = False
+        self.sections = []
+        self._start = time.perf_counter()
+    
+    @contextlib.contextmanager
+    def section(self, name):
+        """
+        Mesure la durée d'un bloc et les packages importés pendant ce bloc
+        """
+        if not self.enabled or self.reported:
+            yield
+            return
+        modules_before = set(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            # Seuls les packages hors bibliothèque standard sont listés (numpy, pandas, sklearn, ...)
+            stdlib = getattr(sys, 'stdlib_module_names', ())
+            imported = sorted({name.split('.')[0] for name in set(sys.modules) - modules_before
+                               if not name.startswith('_') and name.split('.')[0] not in stdlib})
+            self.sections.append((name, elapsed, imported, 0))
+    
+    def add_timings(self, timings):
+        """
+        Ajoute des durées déjà mesurées (ex: predictor.load_timings), en détail de la section précédente
+        """
+        if self.enabled:
+            for name, elapsed in timings.items():
+                self.sections.append((name, elapsed, [], 1))
+    
+    def report(self, file=None):
+        """
+        Écrit le rapport sur stderr (stdout est réservé au JSON du résultat), une seule fois
+        """
+        if not self.enabled or self.reported:
+            return
+        self.reported = True
+        file = file or sys.stderr
+        total = (time.perf_counter() - self._start) * 1000
+        print("⏱️  Profil de démarrage (ms)", file=file)
+        for name, elapsed, imported, depth in self.sections:
+            label = ('  ↳ ' if depth else '') + name
+            suffix = f"  [{', '.join(imported)}]" if imported else ''
+            print(f"   {label:<40} {elapsed:9.1f}{suffix}", file=file)
+        print(f"   {'total depuis le lancement du script':<40} {total:9.1f}", file=file)
+        file.flush()
+
+def startup_profiler_from_argv(argv=None):
+    """
+    Crée le profiler et retire --startup-profile des arguments (utilisable avec tous les modes)
+    """
+    argv = sys.argv if argv is None else argv
+    enabled = '--startup-profile' in argv
+    while '--startup-profile' in argv:
+        argv.remove('--startup-profile')
+    return StartupProfiler(enabled)
+
+def load_model_module(model_dir, module_name):
+    """
+    Importe le load_model.py d'un dossier de modèle sous un nom de module unique
+
+    Tous les modèles ont un fichier load_model.py : un simple `from load_model import ...`
+    renverrait toujours le premier module chargé quand plusieurs modèles vivent dans le
+    même processus (démon de prédiction).
+
+    Args:
+        model_dir: Dossier contenant load_model.py
+        module_name: Nom unique du module (ex: 'load_model_diabete')
+
+    Returns:
+        Le module importé
+    """
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    module_path = os.path.join(model_dir, "load_model.py")
+    spec = importlib.util.spec_from_file_location(module_name, module_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+    return module
+
+def check_xgboost(profiler=None):
+    """
+    Importe xgboost AVANT load_model pour capturer les erreurs OpenMP tôt
+
+    Args:
+        profiler: StartupProfiler optionnel (mesure l'import de numpy puis de xgboost)
+
+    Returns:
+        None si xgboost est utilisable, sinon le résultat JSON d'erreur à renvoyer
+    """
+    profiler = profiler or StartupProfiler()
+    try:
+        with profiler.section('import numpy'):
+            import numpy
+        with profiler.section('import xgboost'):
+            import xgboost
+    except Exception as xgb_error:
+        error_msg = str(xgb_error)
+        if 'libxgboost' in error_msg or 'OpenMP' in error_msg or 'XGBoost Library' in error_msg:
+            return {
+                "success": False,
+                "error": f"XGBoost nécessite OpenMP. Erreur: {error_msg}\n\n" +
+                        "Pour installer OpenMP:\n" +
+                        "  macOS: brew install libomp\n" +
+                        "  Linux: sudo apt-get install libomp-dev (Ubuntu/Debian)\n" +
+                        "  Windows: Installer Visual C++ Redistributable\n\n" +
+                        "Puis réinstaller xgboost: pip3 uninstall xgboost && pip3 install xgboost"
+            }
+        raise
+    return None
+
+def error_result(e):
+    """
+    Construit le résultat JSON d'erreur à partir d'une exception
+    """
+    import traceback
+    return {
+        "success": False,
+        "error": str(e),
+        "traceback": traceback.format_exc() if os.getenv('DEBUG') else None
+    }
+
+class InvalidBatchLine:
+    """
+    Ligne d'un fichier JSONL de batch qui n'est pas du JSON valide
+    """
+
+    def __init__(self, line_number, error):
+        self.line_number = line_number
+        self.error = error
+
+    def result(self):
+        """
+        Résultat JSON d'erreur de la ligne (même forme que les erreurs de prédiction)
+        """
+        return {
+            "success": False,
+            "error": f"Ligne {self.line_number} : JSON invalide ({self.error.msg})",
+            "line": self.line_number,
+            "traceback": None
+        }
+
+def iter_batch_input(input_path, chunk_size=1000):
+    """
+    Lit un fichier CSV ou JSONL de patients par paquets
+
+    Args:
+        input_path: Fichier .csv (en-tête = noms des colonnes) ou .jsonl (un objet JSON par ligne)
+        chunk_size: Nombre de patients par paquet
+
+    Yields:
+        Listes de dictionnaires (un par patient). Une ligne JSONL invalide donne un
+        InvalidBatchLine à sa place, pour que la suite du fichier soit quand même scorée.
+    """
+    if input_path.lower().endswith('.csv'):
+        import pandas as pd
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+            # Les cellules vides sont traitées comme des colonnes absentes (valeur par défaut du prédicteur)
+            yield [{k: v for k, v in row.items() if not pd.isna(v)}
+                   for row in chunk.to_dict('records')]
+        return
+
+    records = []
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                # Ligne JSON invalide : transmise telle quelle, run_batch en fait une ligne d'erreur
+                records.append(InvalidBatchLine(line_number, e))
+            if len(records) >= chunk_size:
+                yield records
+                records = []
+    if records:
+        yield records
+
+def _score_records(predictor, format_result, records):
+    """
+    Score une liste de patients via predict_batch. En cas d'échec, la liste est coupée
+    en deux récursivement pour isoler les lignes fautives sans rejouer tout le paquet
+    ligne par ligne.
+    """
+    try:
+        predictions, probabilities = predictor.predict_batch(records)
+        return [format_result(int(pred), float(proba), predictor.threshold)
+                for pred, proba in zip(predictions, probabilities)]
+    except Exception as e:
+        if len(records) == 1:
+            return [error_result(e)]
+        middle = len(records) // 2
+        return (_score_records(predictor, format_result, records[:middle]) +
+                _score_records(predictor, format_result, records[middle:]))
+
+def run_batch(predictor, format_result, input_path, output=None, chunk_size=1000):
+    """
+    Mode batch : score un fichier de patients avec une seule instance du prédicteur
+    et écrit un résultat JSON par ligne, dans l'ordre du fichier d'entrée
+
+    Chaque paquet passe en une fois par predictor.predict_batch. Si un paquet échoue
+    (ex: valeur hors des bins médicaux), seules les lignes fautives renvoient une erreur ;
+    une ligne JSONL invalide renvoie aussi une erreur (avec son numéro de ligne) sans arrêter le batch.
+
+    Args:
+        predictor: Prédicteur chargé (doit exposer predict_batch et threshold)
+        format_result: Fonction (prediction, probability, threshold) -> résultat JSON du script
+        input_path: Fichier .csv ou .jsonl
+        output: Flux de sortie (par défaut sys.stdout)
+        chunk_size: Nombre de patients par appel à predict_batch
+
+    Returns:
+        (nombre de lignes traitées, nombre d'erreurs)
+    """
+    output = output or sys.stdout
+    row = 0
+    n_errors = 0
+
+    for records in iter_batch_input(input_path, chunk_size):
+        valid = [record for record in records if not isinstance(record, InvalidBatchLine)]
+        scored = iter(_score_records(predictor, format_result, valid) if valid else [])
+        for record in records:
+            result = record.result() if isinstance(record, InvalidBatchLine) else next(scored)
+            if not result.get('success'):
+                n_errors += 1
+            result['row'] = row
+            row += 1
+            print(json.dumps(result), file=output)
+        output.flush()
+
+    return row, n_errors
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Démon de prédiction : héberge les quatre modèles dans un seul processus résident
+et répond aux requêtes sur une socket Unix locale
+
+Protocole : une requête JSON par ligne, une réponse JSON par ligne
+    {"model": "diabete", "data": {...}}                  -> même résultat que predict_diabete.py
+    {"model": "cardio", "data": {...}}                   -> même résultat que predict_cardio.py
+    {"model": "renale", "data": {...}}                   -> même résultat que predict_renale.py
+    {"model": "tuberculose", "data": "/chemin/image.png"} -> même résultat que predict.py
+    {"action": "status"}                                 -> modèles chargés / en erreur (+ compteurs du cache)
+
+Cache de résultats optionnel : variable LIVEDOC_RESULT_CACHE (voir result_cache.py). Seul le cache
+du démon est utilisé : les scripts importés ne créent le leur que lancés en ligne de commande.
+
+Usage:
+    python3 prediction_daemon.py [--socket /tmp/livedoc_prediction.sock] [--models diabete,cardio]
+"""
+
+import sys
+import os
+import json
+import signal
+import argparse
+import importlib
+import threading
+import socketserver
+
+from prediction_common import configure_openmp, check_xgboost, error_result
+from result_cache import cache_from_env, cached_result
+
+# Configurer OpenMP pour XGBoost (libomp sur macOS) AVANT tout import de xgboost :
+# check_xgboost() l'importe avant que les scripts de prédiction ne soient chargés
+configure_openmp()
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODELS_DIR = os.path.join(BASE_DIR, 'public', 'models')
+DEFAULT_SOCKET_PATH = os.environ.get('LIVEDOC_PREDICTION_SOCKET', '/tmp/livedoc_prediction.sock')
+
+# Nom du modèle -> (script de prédiction, dossier du modèle, utilise XGBoost)
+MODELS = {
+    'diabete': ('predict_diabete', 'diabete_model', True),
+    'cardio': ('predict_cardio', 'cardiovasculaire_model', True),
+    'renale': ('predict_renale', 'maladie_renale_model', True),
+    'tuberculose': ('predict', 'app_model', False),
+}
+
+class PredictionDaemon:
+    """
+    Charge les prédicteurs une seule fois et traite les requêtes du protocole
+    """
+
+    def __init__(self, models_dir=DEFAULT_MODELS_DIR, model_names=None, cache=None):
+        """
+        Args:
+            models_dir: Dossier contenant les dossiers des modèles (public/models)
+            model_names: Liste des modèles à charger (par défaut tous)
+            cache: ResultCache optionnel pour les modèles tabulaires (voir result_cache.py)
+        """
+        self.models_dir = models_dir
+        self.cache = cache
+        self.model_names = list(model_names or MODELS.keys())
+        self.scripts = {}
+        self.predictors = {}
+        self.load_errors = {}
+        # Un verrou par modèle : les prédicteurs ne sont pas garantis thread-safe
+        self.locks = {name: threading.Lock() for name in self.model_names}
+
+    def load(self):
+        """
+        Charge tous les modèles demandés. Un modèle en erreur n'empêche pas les autres de servir.
+        """
+        for name in self.model_names:
+            if name not in MODELS:
+                self.load_errors[name] = f"Modèle inconnu: {name}"
+                continue
+            script_name, model_subdir, uses_xgboost = MODELS[name]
+            try:
+                if uses_xgboost:
+                    xgb_error = check_xgboost()
+                    if xgb_error:
+                        self.load_errors[name] = xgb_error['error']
+                        continue
+                script = importlib.import_module(script_name)
+                self.predictors[name] = script.load_predictor(os.path.join(self.models_dir, model_subdir))
+                self.scripts[name] = script
+            except Exception as e:
+                self.load_errors[name] = str(e)
+
+        for name, error in self.load_errors.items():
+            print(f"❌ Modèle {name} non chargé: {error}", file=sys.stderr)
+        print(f"✅ Modèles chargés: {', '.join(self.predictors) or 'aucun'}", file=sys.stderr)
+
+    def status(self):
+        """
+        Retourne l'état des modèles hébergés
+        """
+        status = {
+            "success": True,
+            "models": sorted(self.predictors),
+            "errors": self.load_errors,
+        }
+        if self.cache is not None:
+            status["cache"] = self.cache.stats()
+        return status
+
+    def handle(self, request):
+        """
+        Traite une requête décodée et retourne le résultat JSON
+
+        Args:
+            request: Dictionnaire {"model": ..., "data": ...} ou {"action": "status"}
+
+        Returns:
+            Dictionnaire sérialisable en JSON
+        """
+        if not isinstance(request, dict):
+            return {"success": False, "error": "Requête invalide: objet JSON attendu"}
+
+        if request.get('action') == 'status':
+            return self.status()
+
+        name = request.get('model')
+        if name not in self.predictors:
+            error = self.load_errors.get(name, f"Modèle inconnu: {name}")
+            return {"success": False, "error": error}
+
+        data = request.get('data')
+        if data is None:
+            return {"success": False, "error": "Champ 'data' manquant"}
+
+        def compute():
+            with self.locks[name]:
+                return self.scripts[name].build_result(self.predictors[name], data)
+
+        try:
+            # Le cache ne concerne que les données patient (pas les chemins d'image)
+            if isinstance(data, dict):
+                model_dir = os.path.join(self.models_dir, MODELS[name][1])
+                return cached_result(self.cache, name, model_dir, data, compute)
+            return compute()
+        except Exception as e:
+            return error_result(e)
+
+    def handle_line(self, line):
+        """
+        Décode une ligne JSON, la traite et retourne la ligne JSON de réponse
+        """
+        try:
+            request = json.loads(line)
+        except Exception as e:
+            return json.dumps({"success": False, "error": f"JSON invalide: {str(e)}"})
+        return json.dumps(self.handle(request))
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Lit les requêtes ligne par ligne sur une connexion et répond dans l'ordre
+    """
+
+    def handle(self):
+        for raw_line in self.rfile:
+            line = raw_line.decode('utf-8').strip()
+            if not line:
+                continue
+            response = self.server.daemon.handle_line(line)
+            self.wfile.write(response.encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(socket_path=DEFAULT_SOCKET_PATH, models_dir=DEFAULT_MODELS_DIR, model_names=None):
+    """
+    Charge les modèles puis écoute sur la socket Unix jusqu'à SIGINT/SIGTERM
+    """
+    daemon = PredictionDaemon(models_dir, model_names, cache_from_env())
+    daemon.load()
+
+    # Supprimer une socket orpheline d'un précédent démarrage
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    server = _UnixServer(socket_path, _RequestHandler)
+    server.daemon = daemon
+    os.chmod(socket_path, 0o660)
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    print(f"✅ Démon de prédiction à l'écoute sur {socket_path}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Démon de prédiction multi-modèles (socket Unix)")
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help="Chemin de la socket Unix")
+    parser.add_argument('--models-dir', default=DEFAULT_MODELS_DIR, help="Dossier public/models")
+    parser.add_argument('--models', default=None,
+                        help=f"Modèles à charger, séparés par des virgules (défaut: {','.join(MODELS)})")
+    args = parser.parse_args()
+
+    model_names = args.models.split(',') if args.models else None
+    serve(args.socket, args.models_dir, model_names)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Compare le prétraitement rapide (fast_preprocessing) du modèle de tuberculose au prétraitement exact
+
+Pour chaque image du dossier : durée du décodage + redimensionnement dans les deux modes,
+écart des pixels, écart des probabilités et accord des labels au seuil du modèle.
+Une image illisible dans l'un des modes est écartée des deux et listée dans le rapport.
+
+Usage:
+    python3 preprocessing_parity.py <image_dir> [model_dir] [--backend keras|tflite] [--report rapport.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+from prediction_common import load_model_module
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, 'public', 'models', 'app_model')
+
+def decode_all(predictor, image_paths):
+    """
+    Décode toutes les images avec le mode de prétraitement du prédicteur
+
+    Returns:
+        ({chemin: (array uint8, durée en secondes)}, {chemin: erreur} des images illisibles)
+    """
+    decoded = {}
+    failed = {}
+    for path in image_paths:
+        # Une image illisible est ignorée : elle ne doit pas faire échouer tout le rapport
+        try:
+            start = time.perf_counter()
+            decoded[path] = (predictor.load_image(path), time.perf_counter() - start)
+        except Exception as e:
+            failed[path] = str(e)
+    return decoded, failed
+
+def build_report(predictor, image_paths):
+    """
+    Mesure le prétraitement exact puis le rapide avec le même modèle
+
+    Args:
+        predictor: TuberculosisPredictor chargé (le mode est basculé par fast_preprocessing)
+        image_paths: Chemins des images
+
+    Returns:
+        Dictionnaire du rapport (sérialisable en JSON)
+
+    Raises:
+        ValueError: si aucune image n'est lisible dans les deux modes
+    """
+    import numpy as np
+
+    decoded = {}
+    skipped = {}
+    for fast in (False, True):
+        predictor.fast_preprocessing = fast
+        decoded[fast], failed = decode_all(predictor, image_paths)
+        for path, error in failed.items():
+            skipped.setdefault(path, error)
+    predictor.fast_preprocessing = False
+
+    # Mêmes images dans les deux modes : une image illisible dans l'un est écartée des deux
+    image_paths = [path for path in image_paths if path not in skipped]
+    if not image_paths:
+        raise ValueError(f"Aucune image lisible ({len(skipped)} images illisibles)")
+
+    modes = {}
+    for fast in (False, True):
+        arrays = [decoded[fast][path][0] for path in image_paths]
+        durations = np.array([decoded[fast][path][1] for path in image_paths])
+        probas = np.concatenate([predictor._predict_arrays(np.stack(arrays[i:i + 32]))
+                                 for i in range(0, len(arrays), 32)])
+        modes[fast] = (arrays, durations, probas)
+
+    exact_arrays, exact_durations, exact_probas = modes[False]
+    fast_arrays, fast_durations, fast_probas = modes[True]
+    threshold = predictor.threshold
+    pixel_diff = np.array([np.abs(a.astype(np.int16) - b).mean() for a, b in zip(exact_arrays, fast_arrays)])
+    proba_diff = np.abs(fast_probas - exact_probas)
+
+    def by_format(durations):
+        # Durée médiane par extension (le décodage réduit ne concerne que les JPEG)
+        rows = {}
+        for ext in sorted({os.path.splitext(path)[1].lower() for path in image_paths}):
+            mask = [os.path.splitext(path)[1].lower() == ext for path in image_paths]
+            rows[ext] = float(np.median(durations[mask]) * 1000)
+        return rows
+
+    return {
+        "images": len(image_paths),
+        "skipped": len(skipped),
+        "skipped_paths": skipped,
+        "threshold": threshold,
+        "exact": {"decode_ms": float(np.median(exact_durations) * 1000), "decode_ms_by_format": by_format(exact_durations)},
+        "fast": {"decode_ms": float(np.median(fast_durations) * 1000), "decode_ms_by_format": by_format(fast_durations)},
+        "speedup": float(exact_durations.sum() / fast_durations.sum()),
+        "pixel_mean_abs_diff": float(pixel_diff.mean()),
+        "max_abs_diff": float(proba_diff.max()),
+        "mean_abs_diff": float(proba_diff.mean()),
+        "label_agreement": float(np.mean((fast_probas >= threshold) == (exact_probas >= threshold))),
+    }
+
+def print_report(report, file=None):
+    file = file or sys.stderr
+    print(f"📊 Prétraitement rapide / exact sur {report['images']} images (seuil {report['threshold']})", file=file)
+    if report['skipped']:
+        print(f"   ⚠️  {report['skipped']} images illisibles ignorées :", file=file)
+        for path, error in report['skipped_paths'].items():
+            print(f"      {path}: {error}", file=file)
+    print(f"   {'mode':<8} {'décodage médian (ms)':>21}  par format", file=file)
+    for mode in ('exact', 'fast'):
+        formats = ', '.join(f"{ext} {ms:.1f}" for ext, ms in report[mode]['decode_ms_by_format'].items())
+        print(f"   {mode:<8} {report[mode]['decode_ms']:21.1f}  {formats}", file=file)
+    print(f"   Accélération totale : x{report['speedup']:.2f}", file=file)
+    print(f"   Écart moyen des pixels : {report['pixel_mean_abs_diff']:.2f} / 255", file=file)
+    print(f"   Écart des probabilités : max {report['max_abs_diff']:.4f}, moyen {report['mean_abs_diff']:.4f}", file=file)
+    print(f"   Accord des labels : {report['label_agreement']:.1%}", file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parité du prétraitement rapide du modèle de tuberculose")
+    parser.add_argument('image_dir', help="Dossier d'images de test")
+    parser.add_argument('model_dir', nargs='?', default=DEFAULT_MODEL_DIR, help="Dossier app_model")
+    parser.add_argument('--backend', default='keras', choices=['keras', 'tflite'], help="Backend d'inférence")
+    parser.add_argument('--report', default=None, help="Écrire aussi le rapport en JSON dans ce fichier")
+    args = parser.parse_args()
+
+    module = load_model_module(args.model_dir, 'load_model_tuberculose')
+    predictor = module.TuberculosisPredictor(args.model_dir, backend=args.backend)
+    image_paths = predictor.list_images(args.image_dir)
+    if not image_paths:
+        print(f"❌ Aucune image dans {args.image_dir}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        report = build_report(predictor, image_paths)
+    except ValueError as e:
+        print(f"❌ {str(e)}", file=sys.stderr)
+        sys.exit(1)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
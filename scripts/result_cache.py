@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Cache des résultats de prédiction (LRU en mémoire, optionnellement persisté sur disque en SQLite)
+
+La clé combine le nom du modèle, la version des artefacts du modèle et le vecteur de features
+canonicalisé : un modèle ré-entraîné ou des données cliniques modifiées donnent une autre clé.
+La version des artefacts est calculée sur (nom, taille, date de modification) de chaque fichier,
+sans les relire ; LIVEDOC_RESULT_CACHE_CONTENT_HASH=1 hashe leur contenu à la place.
+Les entrées expirent après un TTL et les moins récemment utilisées sont évincées au-delà
+de max_entries. Seuls les résultats réussis sont mis en cache.
+
+Activation par variables d'environnement (scripts predict_*.py et démon de prédiction):
+    LIVEDOC_RESULT_CACHE=memory              # LRU en mémoire (mode --serve, démon)
+    LIVEDOC_RESULT_CACHE=/tmp/livedoc.sqlite # LRU en mémoire + fichier partagé entre les processus
+    LIVEDOC_RESULT_CACHE_TTL=3600            # durée de vie d'une entrée (secondes)
+    LIVEDOC_RESULT_CACHE_SIZE=1024           # nombre maximal d'entrées (par niveau)
+    LIVEDOC_RESULT_CACHE_CONTENT_HASH=1      # version des artefacts par SHA-256 du contenu
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import contextlib
+from collections import OrderedDict
+
+# Extensions des fichiers d'artefacts pris en compte dans le hash du modèle
+ARTIFACT_EXTENSIONS = ('.ldmb', '.pkl', '.ubj', '.json', '.h5')
+
+_artifact_hashes = {}
+
+def artifact_hash(model_dir, content=None):
+    """
+    Version des artefacts d'un dossier de modèle (calculée une fois par processus)
+
+    Args:
+        model_dir: Dossier du modèle
+        content: Si True, SHA-256 du contenu des fichiers ; sinon (défaut) hash de
+                 (nom, taille, mtime_ns) de chaque fichier, sans les lire.
+                 None : variable LIVEDOC_RESULT_CACHE_CONTENT_HASH
+    """
+    if content is None:
+        content = os.environ.get('LIVEDOC_RESULT_CACHE_CONTENT_HASH', '') == '1'
+    model_dir = os.path.abspath(model_dir)
+    key = (model_dir, content)
+    if key not in _artifact_hashes:
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(model_dir)):
+            if not name.endswith(ARTIFACT_EXTENSIONS):
+                continue
+            path = os.path.join(model_dir, name)
+            digest.update(name.encode('utf-8') + b'\0')
+            if content:
+                with open(path, 'rb') as f:
+                    for block in iter(lambda: f.read(1 << 20), b''):
+                        digest.update(block)
+            else:
+                stat = os.stat(path)
+                digest.update(f"{stat.st_size}:{stat.st_mtime_ns}\0".encode('ascii'))
+        _artifact_hashes[key] = digest.hexdigest()[:16]
+    return _artifact_hashes[key]
+
+def _canonical_value(value):
+    # 1, 1.0 et True donnent la même feature numérique côté prédicteur
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(v) for v in value]
+    return value
+
+def canonical_features(data):
+    """
+    Représentation canonique des données d'un patient (clés triées, nombres en float)
+    """
+    return json.dumps(_canonical_value(data), sort_keys=True, separators=(',', ':'))
+
+class ResultCache:
+    """
+    Cache LRU des résultats JSON avec TTL, compteurs de hits/misses et niveau disque optionnel
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, path=None):
+        """
+        Args:
+            max_entries: Nombre maximal d'entrées (en mémoire et sur disque)
+            ttl: Durée de vie d'une entrée en secondes (None = sans expiration)
+            path: Fichier SQLite pour persister le cache entre les processus (None = mémoire seule)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if path:
+            with self._connect() as db:
+                db.execute("CREATE TABLE IF NOT EXISTS results ("
+                           "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL, accessed REAL NOT NULL)")
+                db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Une transaction par opération, connexion fermée à la sortie (utilisable depuis plusieurs threads)
+        db = sqlite3.connect(self.path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def make_key(model_name, model_hash, data):
+        """
+        Clé du cache : modèle + hash des artefacts + features canonicalisées
+        """
+        payload = '\0'.join((model_name, model_hash, canonical_features(data)))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Retourne le résultat en cache (une copie) ou None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return json.loads(value)
+                del self._entries[key]
+
+        # Une entrée lue sur disque garde son expiration d'origine
+        value, expires = self._disk_get(key, now) if self.path else (None, None)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._store(key, value, expires)
+        return json.loads(value)
+
+    def set(self, key, result):
+        """
+        Met un résultat en cache
+        """
+        value = json.dumps(result)
+        now = time.time()
+        expires = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._store(key, value, expires)
+        if self.path:
+            self._disk_set(key, value, expires, now)
+
+    def _store(self, key, value, expires):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_get(self, key, now):
+        # Une erreur du cache disque ne doit jamais empêcher la prédiction
+        try:
+            with self._connect() as db:
+                row = db.execute("SELECT value, expires FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None, None
+                if row[1] is not None and row[1] <= now:
+                    db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    return None, None
+                db.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+                return row[0], row[1]
+        except sqlite3.Error:
+            self.disk_errors += 1
+            return None, None
+
+    def _disk_set(self, key, value, expires, now):
+        try:
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO results (key, value, expires, accessed) VALUES (?, ?, ?, ?)",
+                           (key, value, expires, now))
+                db.execute("DELETE FROM results WHERE expires IS NOT NULL AND expires <= ?", (now,))
+                evicted = db.execute("DELETE FROM results WHERE key IN (SELECT key FROM results "
+                                     "ORDER BY accessed DESC LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+                self.evictions += max(evicted, 0)
+        except sqlite3.Error:
+            self.disk_errors += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.path:
+            with self._connect() as db:
+                db.execute("DELETE FROM results")
+
+    def stats(self):
+        """
+        Compteurs du cache (renvoyés par l'action status du démon)
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "diskErrors": self.disk_errors,
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "ttl": self.ttl,
+            "path": self.path,
+        }
+
+def cache_from_env():
+    """
+    Crée le cache configuré par LIVEDOC_RESULT_CACHE (None si désactivé)
+    """
+    setting = os.environ.get('LIVEDOC_RESULT_CACHE', '').strip()
+    if not setting:
+        return None
+    ttl = float(os.environ.get('LIVEDOC_RESULT_CACHE_TTL', '3600')) or None
+    max_entries = int(os.environ.get('LIVEDOC_RESULT_CACHE_SIZE', '1024'))
+    try:
+        return ResultCache(max_entries, ttl, None if setting == 'memory' else setting)
+    except sqlite3.Error as e:
+        print(f"⚠️  Cache de résultats désactivé ({str(e)})", file=sys.stderr)
+        return None
+
+def cached_result(cache, model_name, model_dir, data, compute):
+    """
+    Retourne le résultat en cache pour ces données, sinon l'obtient via compute() et le met en cache
+
+    Args:
+        cache: ResultCache (ou None : compute() est appelé directement)
+        model_name: Nom du modèle ('diabete', 'cardio', 'renale')
+        model_dir: Dossier du modèle (pour le hash des artefacts)
+        data: Dictionnaire du patient
+        compute: Fonction sans argument qui renvoie le résultat JSON
+    """
+    if cache is None:
+        return compute()
+    key = cache.make_key(model_name, artifact_hash(model_dir), data)
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        if result.get('success'):
+            cache.set(key, result)
+    return result
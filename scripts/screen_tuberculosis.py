@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Dépistage de la tuberculose sur un dossier ou un manifeste de radiographies, réparti sur plusieurs processus
+
+Les images sont découpées en lots répartis sur un pool de processus. Chaque processus charge le modèle
+une seule fois, avec un nombre borné de threads TensorFlow / TFLite (cœurs / processus par défaut),
+et score ses lots avec TuberculosisPredictor.predict_stream.
+
+Les résultats sont écrits au fil de l'eau (CSV ou JSONL selon l'extension de --output) : le fichier
+de sortie sert de point de reprise. Une exécution interrompue relancée avec la même sortie ne
+rescore que les images absentes du fichier ou en erreur (lecture échouée, erreur transitoire).
+
+Manifeste : fichier .csv avec une colonne 'path' (sinon la première colonne), ou fichier texte
+avec un chemin par ligne. Les chemins relatifs sont résolus par rapport au dossier du manifeste.
+
+Usage:
+    python3 screen_tuberculosis.py <dossier|manifeste> --output resultats.jsonl [model_dir]
+                                   [--workers N] [--threads-per-worker N] [--batch-size 32]
+                                   [--shard-size 128] [--backend keras|tflite] [--fast]
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import multiprocessing
+
+os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '3')
+
+from prediction_common import load_model_module
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODEL_DIR = os.path.join(BASE_DIR, 'public', 'models', 'app_model')
+
+# Colonnes d'une ligne de résultat (CSV et JSONL)
+OUTPUT_FIELDS = ['path', 'success', 'prediction', 'label', 'probability', 'threshold', 'error']
+
+# Prédicteur du processus de travail (chargé une fois par processus dans _init_worker)
+_worker = {}
+
+def read_manifest(input_path, extensions):
+    """
+    Liste des images à scorer : contenu d'un dossier (trié) ou lignes d'un manifeste
+
+    Args:
+        input_path: Dossier d'images, manifeste .csv ou fichier texte
+        extensions: Extensions d'images retenues pour un dossier
+    """
+    if os.path.isdir(input_path):
+        return sorted(os.path.join(input_path, name) for name in os.listdir(input_path)
+                      if name.lower().endswith(extensions))
+
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    with open(input_path, 'r', encoding='utf-8', newline='') as f:
+        if input_path.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            column = 'path' if 'path' in reader.fieldnames else reader.fieldnames[0]
+            paths = [row[column] for row in reader]
+        else:
+            paths = [line.strip() for line in f]
+    return [os.path.join(base_dir, path) for path in paths if path]
+
+def _truncate_partial_line(output_path):
+    # Une interruption pendant l'écriture peut laisser une dernière ligne incomplète
+    with open(output_path, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b'\n') + 1
+        if end != len(data):
+            f.truncate(end)
+
+def completed_paths(output_path):
+    """
+    Chemins déjà scorés avec succès dans un fichier de sortie existant (point de reprise)
+
+    Les lignes en erreur sont retirées du fichier : ces images sont rescorées à la reprise,
+    sans laisser deux lignes pour le même chemin.
+    """
+    if not os.path.exists(output_path):
+        return set()
+    _truncate_partial_line(output_path)
+    with open(output_path, 'r', encoding='utf-8', newline='') as f:
+        if output_path.lower().endswith('.csv'):
+            # Le CSV stocke success sous forme de texte ('True' / 'False')
+            rows = list(csv.DictReader(f))
+            succeeded = [row for row in rows if row['success'] == 'True']
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+            succeeded = [row for row in rows if row.get('success') is True]
+
+    n_failed = len(rows) - len(succeeded)
+    if n_failed:
+        root, ext = os.path.splitext(output_path)
+        tmp_path = f'{root}.tmp{ext}'
+        writer = ResultWriter(tmp_path, truncate=True)
+        writer.write(succeeded)
+        writer.close()
+        os.replace(tmp_path, output_path)
+        print(f"↻ Reprise : {n_failed} images en erreur retirées de {output_path} pour être rescorées",
+              file=sys.stderr)
+    return {row['path'] for row in succeeded}
+
+class ResultWriter:
+    """
+    Écrit les lignes de résultat en CSV ou JSONL, en ajout à un fichier existant
+    (ou dans un fichier vidé si truncate=True)
+    """
+
+    def __init__(self, output_path, truncate=False):
+        self.is_csv = output_path.lower().endswith('.csv')
+        new_file = truncate or not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        self.file = open(output_path, 'w' if truncate else 'a', encoding='utf-8', newline='')
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.file, fieldnames=OUTPUT_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, rows):
+        """
+        Écrit un lot de lignes et le force sur disque (point de reprise)
+        """
+        for row in rows:
+            if self.is_csv:
+                self.writer.writerow(row)
+            else:
+                self.file.write(json.dumps(row) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+def _init_worker(model_dir, backend, tflite_path, threads, batch_size, fast_preprocessing):
+    """
+    Initialisation d'un processus de travail : threads bornés puis chargement unique du modèle
+
+    Une exception levée ici ferait relancer le processus en boucle par le pool : l'erreur de
+    chargement est conservée et remontée au parent par le premier lot (_score_shard).
+    """
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    try:
+        if backend == 'keras':
+            # Doit précéder toute exécution TensorFlow dans le processus
+            import tensorflow as tf
+            tf.get_logger().setLevel('ERROR')
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        module = load_model_module(model_dir, 'load_model_tuberculose')
+        _worker['predictor'] = module.TuberculosisPredictor(model_dir, backend=backend, tflite_path=tflite_path,
+                                                             num_threads=threads,
+                                                             fast_preprocessing=fast_preprocessing)
+    except Exception as e:
+        _worker['error'] = f"{type(e).__name__}: {e}"
+    _worker['threads'] = threads
+    _worker['batch_size'] = batch_size
+
+def _score_shard(paths):
+    """
+    Score un lot d'images dans un processus de travail
+
+    Returns:
+        Liste des lignes de résultat (dictionnaires OUTPUT_FIELDS)
+
+    Raises:
+        RuntimeError: si le modèle n'a pas pu être chargé dans ce processus
+    """
+    if 'error' in _worker:
+        raise RuntimeError(f"Chargement du modèle impossible dans un processus de travail ({_worker['error']})")
+    predictor = _worker['predictor']
+    rows = []
+    for path, prediction, probability, error in predictor.predict_stream(
+            paths, batch_size=_worker['batch_size'], num_workers=_worker['threads']):
+        rows.append({
+            'path': path,
+            'success': error is None,
+            'prediction': None if error else int(prediction == "Tuberculosis"),
+            'label': prediction,
+            'probability': probability,
+            'threshold': predictor.threshold,
+            'error': error,
+        })
+    return rows
+
+def run_screening(image_paths, output_path, model_dir, workers, threads, batch_size=32, shard_size=128,
+                  backend='keras', tflite_path=None, fast_preprocessing=False):
+    """
+    Score les images absentes de output_path (ou en erreur) sur un pool de processus
+
+    Returns:
+        (nombre d'images scorées, nombre d'erreurs, nombre d'images déjà présentes)
+
+    Raises:
+        RuntimeError: si le modèle n'a pas pu être chargé dans les processus de travail
+    """
+    done = completed_paths(output_path)
+    remaining = [path for path in image_paths if path not in done]
+    skipped = len(image_paths) - len(remaining)
+    if skipped:
+        print(f"↻ Reprise : {skipped} images déjà scorées dans {output_path}", file=sys.stderr)
+    if not remaining:
+        return 0, 0, skipped
+
+    shards = [remaining[i:i + shard_size] for i in range(0, len(remaining), shard_size)]
+    workers = max(1, min(workers, len(shards)))
+    writer = None
+    scored = 0
+    n_errors = 0
+    start = time.perf_counter()
+
+    # spawn : aucun état TensorFlow / thread hérité du processus parent
+    context = multiprocessing.get_context('spawn')
+    pool = context.Pool(workers, initializer=_init_worker,
+                        initargs=(model_dir, backend, tflite_path, threads, batch_size, fast_preprocessing))
+    try:
+        for rows in pool.imap_unordered(_score_shard, shards):
+            # Fichier de sortie ouvert au premier lot : rien n'est écrit si le modèle ne charge pas
+            if writer is None:
+                writer = ResultWriter(output_path)
+            writer.write(rows)
+            scored += len(rows)
+            n_errors += sum(1 for row in rows if not row['success'])
+            elapsed = time.perf_counter() - start
+            print(f"   {scored}/{len(remaining)} images ({scored / elapsed:.1f} img/s, {n_errors} erreurs)",
+                  file=sys.stderr)
+        pool.close()
+    except KeyboardInterrupt:
+        print(f"⏸  Interrompu : relancer la même commande pour reprendre ({scored} images écrites)", file=sys.stderr)
+        pool.terminate()
+        raise
+    except Exception:
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+        if writer is not None:
+            writer.close()
+    return scored, n_errors, skipped
+
+def main():
+    cpu_count = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description="Dépistage de la tuberculose sur un dossier de radiographies")
+    parser.add_argument('input', help="Dossier d'images ou manifeste (.csv avec colonne path, ou .txt)")
+    parser.add_argument('model_dir', nargs='?', default=DEFAULT_MODEL_DIR, help="Dossier app_model")
+    parser.add_argument('--output', required=True, help="Fichier de résultats .csv ou .jsonl (point de reprise)")
+    parser.add_argument('--workers', type=int, default=cpu_count, help="Nombre de processus")
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="Threads d'inférence et de décodage par processus (défaut: cœurs / processus)")
+    parser.add_argument('--batch-size', type=int, default=32, help="Images par passe du modèle")
+    parser.add_argument('--shard-size', type=int, default=128, help="Images par lot envoyé à un processus")
+    parser.add_argument('--backend', default='keras', choices=['keras', 'tflite'], help="Backend d'inférence")
+    parser.add_argument('--tflite', default=None, help="Fichier .tflite (défaut: model.tflite)")
+    parser.add_argument('--fast', action='store_true', help="Prétraitement rapide (voir preprocessing_parity.py)")
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    threads = args.threads_per_worker or max(1, cpu_count // workers)
+
+    module = load_model_module(args.model_dir, 'load_model_tuberculose')
+    image_paths = read_manifest(args.input, module.TuberculosisPredictor.IMAGE_EXTENSIONS)
+    if not image_paths:
+        print(f"❌ Aucune image dans {args.input}", file=sys.stderr)
+        sys.exit(1)
+    print(f"🩻 {len(image_paths)} images, {workers} processus x {threads} threads ({args.backend})", file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        scored, n_errors, skipped = run_screening(
+            image_paths, args.output, args.model_dir, workers, threads, batch_size=args.batch_size,
+            shard_size=args.shard_size, backend=args.backend, tflite_path=args.tflite,
+            fast_preprocessing=args.fast)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    except RuntimeError as e:
+        print(f"❌ Dépistage interrompu : {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {scored} images scorées en {elapsed:.1f}s ({n_errors} erreurs, {skipped} déjà présentes) -> {args.output}",
+          file=sys.stderr)
+    sys.exit(1 if n_errors else 0)
+
+if __name__ == "__main__":
+    main()